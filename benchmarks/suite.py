@@ -0,0 +1,433 @@
+"""
+benchmarks.suite : timings for the composition and config pipelines, with
+JSON results and a comparison against a stored baseline. Runs offline;
+LilyPond rendering is only timed when lilypond is installed.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from typing import Any, Callable, NamedTuple
+
+DEFAULT_BASELINE_FILE: str = os.path.join("benchmarks", "baseline.json")
+DEFAULT_REPEAT: int = 5
+DEFAULT_THRESHOLD: float = 0.25
+SEED: int = 20240601
+STAVES: int = 6
+parser = argparse.ArgumentParser(
+    prog="benchmarks.suite",
+    description="benchmarks flagday's composition and config pipelines"
+)
+subparsers = parser.add_subparsers(dest="command", required=True)
+run_parser = subparsers.add_parser("run", help="run benchmarks")
+run_parser.add_argument("-o", "--output-file", help="JSON results file")
+run_parser.add_argument(
+    "-k", "--filter", help="only run benchmarks whose name contains this"
+)
+run_parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+run_parser.add_argument(
+    "--quick", action="store_true", help="only the smallest sizes"
+)
+compare_parser = subparsers.add_parser(
+    "compare", help="compare results against a baseline"
+)
+compare_parser.add_argument("results")
+compare_parser.add_argument(
+    "-b", "--baseline", default=DEFAULT_BASELINE_FILE
+)
+compare_parser.add_argument(
+    "-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+    help="flag medians this much slower than the baseline (0.25 = 25%%)"
+)
+
+
+class Benchmark(NamedTuple):
+    """
+    A benchmark: setup(size) does any untimed preparation and returns the
+    function to time.
+    """
+    name: str
+    setup: Callable[[int], Callable[[], Any]]
+    sizes: tuple[int, ...]
+    requires: str | None = None
+
+
+class Comparison(NamedTuple):
+    key: str
+    baseline: float
+    current: float
+    ratio: float
+    regressed: bool
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(
+    *sizes: int, requires: str | None = None
+) -> Callable[[Callable[[int], Callable[[], Any]]], Any]:
+    """
+    Register a setup function as a benchmark, named after the function, run
+    at each size. requires names an executable the benchmark needs.
+    """
+    def register(setup: Callable[[int], Callable[[], Any]]) -> Any:
+        name = setup.__name__.replace("__", ".")
+        BENCHMARKS[name] = Benchmark(name, setup, sizes, requires)
+        return setup
+    return register
+
+
+def random_rows(count: int) -> list[list[int]]:
+    rng = random.Random(SEED)
+    return [rng.sample(range(12), 12) for _ in range(count)]
+
+
+def clear_memos() -> None:
+    """
+    Forget the staves, leaves and ringtones maker memoizes, so a timed run
+    builds them rather than timing cache hits left by the warm-up run.
+    """
+    from flagday.composition import maker
+    maker.metered_leaves.cache_clear()
+    maker._series_rtttl.cache_clear()
+    maker.staff_source.cache_clear()
+
+
+def fleet_roster(count: int) -> list[dict[str, str]]:
+    return [
+        {
+            "owner": f"flagday device {i}",
+            "owner_short": f"f{i:03}"[:5],
+            "ringtone": "P1:d=16,o=5,b=160:8c#5,2c#5,8b4.,2d5,2p.",
+        }
+        for i in range(count)
+    ]
+
+
+@benchmark(10, 100)
+def series__timepoints(size: int) -> Callable[[], Any]:
+    from flagday.composition.series import (
+        generate_babbitt_timepoint_set,
+        generate_pitch_octave_series,
+    )
+    rows = random_rows(size)
+
+    def run() -> None:
+        for row in rows:
+            generate_babbitt_timepoint_set(row)
+            generate_pitch_octave_series(row, starting_octave=5)
+    return run
+
+
+@benchmark(100, 1000)
+def rows__timepoints(size: int) -> Callable[[], Any]:
+    from flagday.composition.rows import (
+        babbitt_timepoints,
+        pitch_octave_series,
+        rotate_series,
+    )
+    rows = random_rows(size)
+
+    def run() -> None:
+        for row in rows:
+            for rotation in range(STAVES):
+                current = rotate_series(row, rotation * 2)
+                babbitt_timepoints(current)
+                pitch_octave_series(current, starting_octave=5)
+    return run
+
+
+@benchmark(1, 10)
+def staff__metered(size: int) -> Callable[[], Any]:
+    import abjad
+    from flagday.composition.maker import make_staff_and_voice
+    rows = [abjad.PitchClassSegment(row) for row in random_rows(size)]
+
+    def run() -> None:
+        clear_memos()
+        for row in rows:
+            for rotation in range(STAVES):
+                make_staff_and_voice(row, rotation, metered=True)
+    return run
+
+
+@benchmark(1, 10)
+def staff__meter_rewrite(size: int) -> Callable[[], Any]:
+    import abjad
+    from flagday.composition.maker import make_staff_and_voice
+    rows = [abjad.PitchClassSegment(row) for row in random_rows(size)]
+
+    def run() -> None:
+        for row in rows:
+            for rotation in range(STAVES):
+                staff = make_staff_and_voice(row, rotation)
+                meter = abjad.Meter(abjad.meter.make_best_guess_rtc((3, 4)))
+                meter.rewrite([staff], maximum_dot_count=1)
+    return run
+
+
+@benchmark(1, 10)
+def score__make(size: int) -> Callable[[], Any]:
+    from flagday.composition.maker import make_score_from_series
+    rows = random_rows(size)
+
+    def run() -> None:
+        clear_memos()
+        for row in rows:
+            make_score_from_series(row)
+    return run
+
+
+@benchmark(1, 10)
+def rtttl__from_notes(size: int) -> Callable[[], Any]:
+    import abjad
+    from flagday.composition.maker import make_series_notes, rtttl_from_notes
+    notes = [
+        make_series_notes(abjad.PitchClassSegment(row).rotate(rotation * 2))
+        for row in random_rows(size) for rotation in range(STAVES)
+    ]
+
+    def run() -> None:
+        for staff_notes in notes:
+            rtttl_from_notes(staff_notes)
+    return run
+
+
+@benchmark(10, 1000)
+def rtttl__make_ringtones(size: int) -> Callable[[], Any]:
+    from flagday.composition.ringtone import make_ringtones
+    rows = random_rows(size)
+
+    def run() -> None:
+        for row in rows:
+            make_ringtones(row, 160, 5)
+    return run
+
+
+@benchmark(1, 100)
+def config__composition_load(size: int) -> Callable[[], Any]:
+    from flagday.config.composition import (
+        CompositionConfig,
+        DEFAULT_COMPOSITION_CONFIG_FILE,
+    )
+
+    def run() -> None:
+        for _ in range(size):
+            CompositionConfig.load_from_file(DEFAULT_COMPOSITION_CONFIG_FILE)
+    return run
+
+
+@benchmark(1, 100)
+def config__base_load(size: int) -> Callable[[], Any]:
+    from flagday.config.device import load_base_config
+
+    def run() -> None:
+        for _ in range(size):
+            load_base_config()
+    return run
+
+
+@benchmark(10, 100)
+def config__generate_and_dump(size: int) -> Callable[[], Any]:
+    import yaml
+    from flagday.config.device import generate_device_config, load_base_config
+    base_config = load_base_config()
+    roster = fleet_roster(size)
+
+    def run() -> None:
+        for entry in roster:
+            yaml.dump(generate_device_config(base_config, **entry))
+    return run
+
+
+@benchmark(10, 100)
+def config__merge(size: int) -> Callable[[], Any]:
+    from flagday.config.device import load_base_config, merge_configs
+    base_config = load_base_config()
+    layers = [
+        {"owner": entry["owner"], "owner_short": entry["owner_short"]}
+        for entry in fleet_roster(size)
+    ]
+
+    def run() -> None:
+        for layer in layers:
+            merge_configs(base_config, layer)
+    return run
+
+
+@benchmark(10, 100, 1000)
+def config__fleet(size: int) -> Callable[[], Any]:
+    from flagday.config.device import load_base_config
+    from flagday.config.fleet import generate_fleet_configs
+    base_config = load_base_config()
+    roster = fleet_roster(size)
+
+    def run() -> None:
+        with tempfile.TemporaryDirectory() as output_dir:
+            generate_fleet_configs(base_config, roster, output_dir, jobs=1)
+    return run
+
+
+@benchmark(1)
+def render__format(size: int) -> Callable[[], Any]:
+    import abjad
+    from flagday.composition.maker import make_score_from_series
+    scores = [make_score_from_series(row) for row in random_rows(size)]
+
+    def run() -> None:
+        clear_memos()
+        for score in scores:
+            abjad.lilypond(score, site_comments=True)
+    return run
+
+
+@benchmark(1, requires="lilypond")
+def render__lilypond(size: int) -> Callable[[], Any]:
+    from flagday.composition.maker import (
+        make_score_from_series,
+        prepare_lilypond_file,
+    )
+    from flagday.composition.render import format_lilypond_file, run_lilypond
+    sources = [
+        format_lilypond_file(prepare_lilypond_file(
+            make_score_from_series(row)
+        ))
+        for row in random_rows(size)
+    ]
+
+    def run() -> None:
+        with tempfile.TemporaryDirectory() as output_dir:
+            for i, source in enumerate(sources):
+                run_lilypond(source, os.path.join(output_dir, f"flagday_{i}"))
+    return run
+
+
+def time_benchmark(
+    bench: Benchmark, size: int, repeat: int = DEFAULT_REPEAT
+) -> dict[str, Any]:
+    """
+    Time one benchmark at one size: one untimed warm-up run, then repeat
+    timed runs.
+
+    :return: min, median and mean run times in seconds, and the run count
+    :rtype: dict[str, Any]
+    """
+    run = bench.setup(size)
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "runs": repeat,
+    }
+
+
+def run_benchmarks(
+    name_filter: str | None = None,
+    repeat: int = DEFAULT_REPEAT,
+    quick: bool = False,
+) -> dict[str, Any]:
+    """
+    Run every registered benchmark (optionally only those matching a name
+    filter, or only at their smallest size), skipping any whose required
+    executable isn't installed.
+
+    :return: results keyed by "name[size]", plus environment metadata
+    :rtype: dict[str, Any]
+    """
+    results: dict[str, Any] = {}
+    skipped = []
+    for bench in BENCHMARKS.values():
+        if name_filter and name_filter not in bench.name:
+            continue
+        if bench.requires and shutil.which(bench.requires) is None:
+            skipped.append(bench.name)
+            continue
+        for size in bench.sizes[:1] if quick else bench.sizes:
+            key = f"{bench.name}[{size}]"
+            results[key] = time_benchmark(bench, size, repeat)
+            print(
+                f"{key:40} {results[key]['median'] * 1000:10.2f} ms",
+                file=sys.stderr
+            )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now(datetime.UTC).isoformat(),
+            "skipped": skipped,
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[Comparison]:
+    """
+    Compare median run times for every benchmark in both result sets.
+
+    :param threshold: the slowdown, as a fraction of the baseline median,
+        beyond which a benchmark counts as regressed
+    :type threshold: float
+    :return: one comparison per benchmark in both results, by key
+    :rtype: list[Comparison]
+    """
+    comparisons = []
+    for key in sorted(baseline["results"].keys() & current["results"].keys()):
+        before = baseline["results"][key]["median"]
+        after = current["results"][key]["median"]
+        ratio = after / before if before else float("inf")
+        comparisons.append(
+            Comparison(key, before, after, ratio, ratio > 1 + threshold)
+        )
+    return comparisons
+
+
+def print_comparisons(comparisons: list[Comparison]) -> None:
+    print(f"{'benchmark':40} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for c in comparisons:
+        flag = "  REGRESSED" if c.regressed else ""
+        print(
+            f"{c.key:40} {c.baseline * 1000:10.2f}ms "
+            f"{c.current * 1000:10.2f}ms {c.ratio:7.2f}{flag}"
+        )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    match args.command:
+        case "run":
+            results = run_benchmarks(args.filter, args.repeat, args.quick)
+            if args.output_file is None:
+                json.dump(results, sys.stdout, indent=2)
+                print()
+            else:
+                with open(args.output_file, "w") as fh:
+                    json.dump(results, fh, indent=2)
+                    fh.write("\n")
+        case "compare":
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+            with open(args.results) as fh:
+                current = json.load(fh)
+            comparisons = compare_results(baseline, current, args.threshold)
+            print_comparisons(comparisons)
+            if any(c.regressed for c in comparisons):
+                sys.exit(1)
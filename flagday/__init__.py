@@ -2,4 +2,34 @@
 Contains the flagday project.
 """
 
+import importlib.util
+import sys
+
+from types import ModuleType
+
 __copyright__ = "© 2026 María Dolores A. Matienzo unless otherwise specified."
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return a module that is only actually imported on first attribute
+    access, so heavy dependencies (abjad, in particular) don't slow down
+    code paths and CLIs that never use them.
+
+    :param name: the absolute module name
+    :type name: str
+    :return: the (possibly not yet loaded) module
+    :rtype: ModuleType
+    :raises: ModuleNotFoundError
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,387 @@
+"""
+flagday.composition.batch : render many series/bpm variants of the score in
+one run, across a process pool.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+import yaml
+
+from flagday.composition import maker
+from flagday.composition.fonts import FontEmbedder
+from flagday.composition.pool import DEFAULT_BATCH_SIZE, LilyPondPool
+from flagday.composition.ringtone import make_ringtones
+from flagday.config.composition import (
+    CompositionConfig,
+    DEFAULT_COMPOSITION_CONFIG_FILE,
+)
+
+DEFAULT_BATCH_OUTPUT_DIR: str = os.path.join(os.getcwd(), "output", "batch")
+MANIFEST_FILE: str = "manifest.json"
+DEFAULT_FACTOR: int = 2
+parser = argparse.ArgumentParser(
+    prog="flagday.composition.batch",
+    description="builds many score variants for flagday"
+)
+parser.add_argument("-c", "--config", default=DEFAULT_COMPOSITION_CONFIG_FILE)
+parser.add_argument(
+    "-v", "--variants",
+    help="YAML or JSONL list of composition configs to render"
+)
+parser.add_argument(
+    "-b", "--bpm", type=int, nargs="+", help="sweep over these bpms"
+)
+parser.add_argument(
+    "--starting-octave", type=int, nargs="+",
+    help="sweep over these starting octaves"
+)
+parser.add_argument(
+    "--factor", type=int, nargs="+", help="sweep over these rotation factors"
+)
+parser.add_argument(
+    "-o", "--output", default="all",
+    choices=["all", "ly", "midi", "pdf", "rtttl"]
+)
+parser.add_argument("--embed-fonts", action=argparse.BooleanOptionalAction)
+parser.add_argument("-d", "--output-dir", default=DEFAULT_BATCH_OUTPUT_DIR)
+parser.add_argument("-j", "--jobs", type=int, help="worker processes")
+parser.add_argument(
+    "--lilypond-workers", type=int,
+    help="build sources here and engrave them with this many pooled "
+         "lilypond workers, several scores per lilypond run"
+)
+parser.add_argument(
+    "--lilypond-batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+    help="most scores per lilypond run, with --lilypond-workers"
+)
+
+
+class Variant(NamedTuple):
+    """
+    One score to render: a composition config plus a rotation factor.
+    """
+    name: str
+    series: tuple[int, ...]
+    bpm: int
+    starting_octave: int
+    factor: int = DEFAULT_FACTOR
+
+
+class VariantResult(NamedTuple):
+    """
+    The outcome of rendering a single variant in a batch.
+    """
+    variant: Variant
+    files: list[str]
+    error: str | None
+
+
+def variant_name(bpm: int, starting_octave: int, factor: int) -> str:
+    return f"b{bpm}-o{starting_octave}-f{factor}"
+
+
+def load_variants(filename: str) -> list[Variant]:
+    """
+    Load variants from a YAML list or JSONL file of composition configs,
+    i.e. mappings with series, bpm, starting_octave and optionally factor and
+    name.
+
+    :param filename: path to a .yaml/.yml or .jsonl file
+    :type filename: str
+    :return: the variants, named by index unless a name is given
+    :rtype: list[Variant]
+    """
+    with open(filename, encoding="utf8") as file:
+        if Path(filename).suffix.lower() == ".jsonl":
+            entries = [json.loads(line) for line in file if line.strip()]
+        else:
+            entries = yaml.safe_load(file) or []
+    if not isinstance(entries, list):
+        raise ValueError(f"variants {filename} is not a list of configs")
+    return [
+        Variant(
+            name=str(entry.get("name", f"variant_{i}")),
+            series=tuple(entry["series"]),
+            bpm=int(entry["bpm"]),
+            starting_octave=int(entry["starting_octave"]),
+            factor=int(entry.get("factor", DEFAULT_FACTOR)),
+        )
+        for i, entry in enumerate(entries)
+    ]
+
+
+def sweep_variants(
+    cfg: CompositionConfig,
+    bpms: Iterable[int] | None = None,
+    starting_octaves: Iterable[int] | None = None,
+    factors: Iterable[int] | None = None,
+) -> list[Variant]:
+    """
+    The cartesian product of bpms, starting octaves and rotation factors over
+    a composition config's series; each defaults to the config's own value.
+    """
+    return [
+        Variant(
+            variant_name(bpm, octave, factor),
+            tuple(cfg.series),
+            bpm,
+            octave,
+            factor
+        )
+        for bpm, octave, factor in itertools.product(
+            bpms or [cfg.bpm],
+            starting_octaves or [cfg.starting_octave],
+            factors or [DEFAULT_FACTOR],
+        )
+    ]
+
+
+def render_variant(
+    variant: Variant,
+    output: str,
+    output_dir: str,
+    embed_fonts: bool = False,
+) -> VariantResult:
+    """
+    Build and render one variant into its own directory. Everything the score
+    needs is built here from the variant alone, so variants can run in any
+    process without sharing state.
+    """
+    variant_dir = os.path.join(output_dir, variant.name)
+    try:
+        os.makedirs(variant_dir, exist_ok=True)
+        ringtones = make_ringtones(
+            variant.series, variant.bpm, variant.starting_octave, variant.factor
+        )
+        if output == "rtttl":
+            maker.write_outputs(
+                None, output, ringtones=ringtones, output_dir=variant_dir
+            )
+        else:
+            source = maker.make_lilypond_source(
+                variant.series,
+                bpm=variant.bpm,
+                starting_octave=variant.starting_octave,
+                factor=variant.factor,
+            )
+            maker.write_outputs(
+                source,
+                output,
+                embed_fonts=embed_fonts,
+                ringtones=ringtones,
+                output_dir=variant_dir,
+            )
+    except Exception as e:
+        return VariantResult(variant, [], f"{type(e).__name__}: {e}")
+    return VariantResult(variant, _variant_files(variant_dir, output), None)
+
+
+def _variant_files(variant_dir: str, output: str) -> list[str]:
+    return [
+        os.path.join(variant_dir, name)
+        for name in maker.OUTPUT_ARTIFACTS[output]
+        if os.path.exists(os.path.join(variant_dir, name))
+    ]
+
+
+def engrave_variants(
+    variants: list[Variant],
+    output: str,
+    output_dir: str,
+    embed_fonts: bool = False,
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[VariantResult]:
+    """
+    Render variants to midi, pdf or all by building their sources here and
+    engraving them with a LilyPondPool, so LilyPond starts once per batch of
+    variants rather than once per variant. Sources are submitted as they're
+    built, so LilyPond runs while later variants are still being built, and
+    each PDF goes on to a FontEmbedder as soon as it's engraved.
+
+    :param workers: concurrent lilypond processes
+    :type workers: int
+    :param batch_size: most variants per lilypond process
+    :type batch_size: int
+    :return: one result per variant, in order
+    :rtype: list[VariantResult]
+    """
+    pending = []
+    embedding = FontEmbedder(maker.RES_DIR) if embed_fonts \
+        else contextlib.nullcontext()
+    with LilyPondPool(workers, batch_size) as pool, embedding as embedder:
+        for variant in variants:
+            variant_dir = os.path.join(output_dir, variant.name)
+            try:
+                os.makedirs(variant_dir, exist_ok=True)
+                source = maker.make_lilypond_source(
+                    variant.series,
+                    bpm=variant.bpm,
+                    starting_octave=variant.starting_octave,
+                    factor=variant.factor,
+                )
+                if output == "all":
+                    maker.write_outputs(source, "ly", output_dir=variant_dir)
+                    maker.write_outputs(
+                        None,
+                        "rtttl",
+                        ringtones=make_ringtones(
+                            variant.series,
+                            variant.bpm,
+                            variant.starting_octave,
+                            variant.factor
+                        ),
+                        output_dir=variant_dir
+                    )
+                future = pool.submit(
+                    source, os.path.join(variant_dir, "flagday")
+                )
+            except Exception as e:
+                pending.append((variant, None, f"{type(e).__name__}: {e}"))
+            else:
+                pending.append((variant, future, None))
+        engraved = []
+        for variant, future, error in pending:
+            variant_dir = os.path.join(output_dir, variant.name)
+            if future is not None:
+                try:
+                    error = future.result().error
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            if future is not None and error is None and embed_fonts:
+                future = embedder.submit(
+                    os.path.join(variant_dir, "flagday.pdf")
+                )
+            else:
+                future = None
+            engraved.append((variant, future, error))
+        results = []
+        for variant, future, error in engraved:
+            variant_dir = os.path.join(output_dir, variant.name)
+            if future is not None:
+                try:
+                    future.result()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            results.append(VariantResult(
+                variant,
+                _variant_files(variant_dir, output) if error is None else [],
+                error
+            ))
+    return results
+
+
+def write_manifest(results: Iterable[VariantResult], output_dir: str) -> str:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path, "w") as fh:
+        json.dump(
+            [
+                {
+                    **result.variant._asdict(),
+                    "files": result.files,
+                    "error": result.error,
+                }
+                for result in results
+            ],
+            fh,
+            indent=2
+        )
+        fh.write("\n")
+    return path
+
+
+def render_variants(
+    variants: list[Variant],
+    output: str = "all",
+    output_dir: str = DEFAULT_BATCH_OUTPUT_DIR,
+    embed_fonts: bool = False,
+    jobs: int | None = None,
+    lilypond_workers: int | None = None,
+    lilypond_batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[VariantResult]:
+    """
+    Render every variant into output_dir/<name> using a process pool (or,
+    with lilypond_workers, engrave_variants) and write a manifest of what
+    was produced. Failures for individual variants are reported in the
+    results rather than stopping the batch.
+
+    :param variants: variants to render, with unique names
+    :type variants: list[Variant]
+    :param output: the maker output to produce for each variant
+    :type output: str
+    :param output_dir: directory to hold the variant directories and manifest
+    :type output_dir: str
+    :param jobs: number of worker processes; defaults to os.cpu_count()
+    :type jobs: int | None
+    :param lilypond_workers: engrave midi/pdf outputs with this many pooled
+        lilypond workers instead
+    :type lilypond_workers: int | None
+    :return: one result per variant, in order
+    :rtype: list[VariantResult]
+    :raises: ValueError
+    """
+    names = [variant.name for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("variant names must be unique")
+    os.makedirs(output_dir, exist_ok=True)
+    if lilypond_workers is not None and output in ("midi", "pdf", "all"):
+        results = engrave_variants(
+            variants,
+            output,
+            output_dir,
+            embed_fonts,
+            lilypond_workers,
+            lilypond_batch_size
+        )
+    elif jobs == 1:
+        results = [
+            render_variant(variant, output, output_dir, embed_fonts)
+            for variant in variants
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(
+                    render_variant, variant, output, output_dir, embed_fonts
+                )
+                for variant in variants
+            ]
+            results = [f.result() for f in futures]
+    write_manifest(results, output_dir)
+    return results
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.variants is not None:
+        variants = load_variants(args.variants)
+    else:
+        variants = sweep_variants(
+            CompositionConfig.load_from_file(args.config),
+            bpms=args.bpm,
+            starting_octaves=args.starting_octave,
+            factors=args.factor,
+        )
+    results = render_variants(
+        variants,
+        output=args.output,
+        output_dir=args.output_dir,
+        embed_fonts=args.embed_fonts,
+        jobs=args.jobs,
+        lilypond_workers=args.lilypond_workers,
+        lilypond_batch_size=args.lilypond_batch_size,
+    )
+    failures = [r for r in results if r.error is not None]
+    for failure in failures:
+        print(f"{failure.variant.name}: {failure.error}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,133 @@
+"""
+flagday.composition.cache : a content-addressed cache for maker outputs.
+"""
+
+import hashlib
+import os
+import shutil
+
+from pathlib import Path
+from typing import Iterable
+
+import flagday
+
+DEFAULT_CACHE_DIR: str = os.path.join(os.getcwd(), "tmp", "cache")
+DEFAULT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+
+def hash_files(paths: Iterable[str | Path]) -> str:
+    """
+    Hash the names and contents of files (recursing into directories) in a
+    stable order.
+
+    :return: a hex sha256 digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        if path.is_dir():
+            digest.update(hash_files(
+                p for p in path.rglob("*") if p.is_file()
+            ).encode("utf-8"))
+        elif path.is_file():
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def code_files() -> list[Path]:
+    """
+    The flagday source files, which stand in for the flagday version: any
+    code change invalidates the cache.
+    """
+    return sorted(Path(flagday.__file__).parent.rglob("*.py"))
+
+
+def cache_key(
+    *parts: str,
+    include_files: Iterable[str | Path] = (),
+) -> str:
+    """
+    Compute a content address from strings (e.g. the config values and the
+    generated .ly text), the include files and the flagday code.
+
+    :return: a hex sha256 digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(hash_files(include_files).encode("utf-8"))
+    digest.update(hash_files(code_files()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    A directory of build artifacts grouped by cache key, evicting the least
+    recently used entries once the total size exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def fetch(self, key: str, artifacts: Iterable[str]) -> bool:
+        """
+        Copy cached artifacts to their output paths.
+
+        :param key: the cache key
+        :type key: str
+        :param artifacts: output paths; matched to cache entries by filename
+        :type artifacts: Iterable[str]
+        :return: whether every artifact was in the cache
+        :rtype: bool
+        """
+        entry = self.cache_dir / key
+        artifacts = list(artifacts)
+        cached = [entry / os.path.basename(a) for a in artifacts]
+        if not all(c.is_file() for c in cached):
+            return False
+        for c, a in zip(cached, artifacts):
+            os.makedirs(os.path.dirname(a) or ".", exist_ok=True)
+            shutil.copyfile(c, a)
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, artifacts: Iterable[str]) -> None:
+        """
+        Copy freshly built artifacts into the cache, then evict old entries.
+        Missing artifacts (e.g. a failed LilyPond run) are not cached.
+        """
+        artifacts = list(artifacts)
+        if not all(os.path.isfile(a) for a in artifacts):
+            return
+        entry = self.cache_dir / key
+        tmp_entry = self.cache_dir / f".{key}.{os.getpid()}"
+        tmp_entry.mkdir(parents=True, exist_ok=True)
+        for a in artifacts:
+            shutil.copyfile(a, tmp_entry / os.path.basename(a))
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = [
+            e for e in self.cache_dir.iterdir()
+            if e.is_dir() and not e.name.startswith(".")
+        ]
+        sizes = {
+            e: sum(f.stat().st_size for f in e.iterdir() if f.is_file())
+            for e in entries
+        }
+        total = sum(sizes.values())
+        for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= sizes[e]
+            shutil.rmtree(e, ignore_errors=True)
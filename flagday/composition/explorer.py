@@ -0,0 +1,323 @@
+"""
+flagday.composition.explorer : vectorized tone row metrics and a
+multi-process search of the row space. Needs the `explore` extra (NumPy).
+"""
+
+import argparse
+import math
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterator, NamedTuple, TextIO
+
+import numpy as np
+
+from flagday.composition.ringtone import (
+    TIMEPOINT_DENOMINATOR,
+    encode_rtttl,
+    encode_rtttl_notes,
+)
+from flagday.config.composition import DEFAULT_BPM, DEFAULT_STARTING_OCTAVE
+from flagday.config.device import DEVICE_CONFIG_MAX_LENGTH
+
+ROW_LENGTH: int = 12
+CHUNK_SIZE: int = 1 << 20
+RINGTONE_TITLE: str = "P1"
+parser = argparse.ArgumentParser(
+    prog="flagday.composition.explorer",
+    description="searches tone rows for ringtone-friendly series"
+)
+parser.add_argument("-f", "--output-file", help="CSV output; default stdout")
+parser.add_argument(
+    "--sample", type=int, help="search this many random rows instead of all"
+)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--start", type=int, default=0, help="first row rank")
+parser.add_argument("--stop", type=int, help="last row rank (exclusive)")
+parser.add_argument("-b", "--bpm", type=int, default=DEFAULT_BPM)
+parser.add_argument(
+    "--starting-octave", type=int, default=DEFAULT_STARTING_OCTAVE
+)
+parser.add_argument(
+    "--max-rtttl-bytes", type=int, default=DEVICE_CONFIG_MAX_LENGTH["ringtone"]
+)
+parser.add_argument("--min-duration", type=int, help="in sixteenths")
+parser.add_argument("--max-duration", type=int, help="in sixteenths")
+parser.add_argument("--min-octave-span", type=int)
+parser.add_argument("--max-octave-span", type=int)
+parser.add_argument("--min-interval-classes", type=int)
+parser.add_argument("-j", "--jobs", type=int, help="worker processes")
+
+
+class RowConstraints(NamedTuple):
+    """
+    Bounds on row metrics; None means unbounded.
+    """
+    max_rtttl_bytes: int | None = DEVICE_CONFIG_MAX_LENGTH["ringtone"]
+    min_duration: int | None = None
+    max_duration: int | None = None
+    min_octave_span: int | None = None
+    max_octave_span: int | None = None
+    min_interval_classes: int | None = None
+
+
+class RowMetrics(NamedTuple):
+    """
+    Per-row metrics, one array element per row.
+    """
+    rtttl_bytes: np.ndarray
+    duration: np.ndarray
+    octave_span: np.ndarray
+    interval_classes: np.ndarray
+
+
+def unrank_permutations(
+    start: int, stop: int, n: int = ROW_LENGTH
+) -> np.ndarray:
+    """
+    The permutations of range(n) with lexicographic ranks start..stop-1,
+    one per row, decoded from their factorial-base (Lehmer) digits.
+    """
+    ranks = np.arange(start, stop, dtype=np.int64)
+    remaining = np.tile(np.arange(n, dtype=np.int8), (len(ranks), 1))
+    rows = np.empty((len(ranks), n), dtype=np.int8)
+    index = np.arange(len(ranks))
+    for i in range(n):
+        digits = (ranks // math.factorial(n - 1 - i)) % (n - i)
+        rows[:, i] = remaining[index, digits]
+        columns = np.arange(n - i - 1)
+        remaining = np.where(
+            columns < digits[:, None], remaining[:, :-1], remaining[:, 1:]
+        )
+    return rows
+
+
+def random_rows(count: int, seed: int, n: int = ROW_LENGTH) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.tile(np.arange(n, dtype=np.int8), (count, 1))
+    return rng.permuted(rows, axis=1)
+
+
+def batch_timepoint_intervals(rows: np.ndarray) -> np.ndarray:
+    """
+    rows.timepoint_intervals for every row at once.
+    """
+    length = rows.shape[1]
+    intervals = (np.roll(rows, -1, axis=1).astype(np.int16) - rows) % length
+    intervals[intervals == 0] = length
+    return intervals
+
+
+def batch_octave_numbers(
+    rows: np.ndarray,
+    starting_octave: int = 4,
+    min_octave: int = 4,
+    max_octave: int = 7,
+) -> np.ndarray:
+    """
+    rows.octave_numbers for every row at once.
+    """
+    current = rows.astype(np.int16)
+    following = np.roll(current, -1, axis=1)
+    interval = np.where(
+        following >= current, current + following, following - current
+    )
+    up = interval >= rows.shape[1]
+    down = interval < 0
+    octave = np.full(len(rows), starting_octave, dtype=np.int8)
+    octaves = np.empty(rows.shape, dtype=np.int8)
+    for j in range(rows.shape[1]):
+        octave = np.where(
+            up[:, j],
+            np.where(octave >= max_octave, min_octave, octave + 1),
+            np.where(
+                down[:, j],
+                np.where(octave <= min_octave, max_octave, octave - 1),
+                octave
+            )
+        ).astype(np.int8)
+        octaves[:, j] = octave
+    return octaves
+
+
+def batch_interval_classes(rows: np.ndarray) -> np.ndarray:
+    """
+    The number of distinct interval classes (1-6) between adjacent pitch
+    classes of each row, e.g. 6 for a row using every interval class.
+    """
+    intervals = np.abs(np.diff(rows.astype(np.int16), axis=1)) % 12
+    classes = np.minimum(intervals, 12 - intervals)
+    present = np.zeros((len(rows), 7), dtype=bool)
+    present[np.arange(len(rows))[:, None], classes] = True
+    return present[:, 1:].sum(axis=1)
+
+
+def _rtttl_length_tables(length: int) -> tuple[np.ndarray, np.ndarray]:
+    chars = np.zeros((length + 1, 12), dtype=np.int16)
+    tokens = np.zeros((length + 1, 12), dtype=np.int16)
+    for interval in range(1, length + 1):
+        for pc in range(12):
+            notes = encode_rtttl_notes(
+                [pc], [DEFAULT_STARTING_OCTAVE],
+                [(interval, TIMEPOINT_DENOMINATOR)]
+            )
+            chars[interval, pc] = sum(len(t) for t in notes)
+            tokens[interval, pc] = len(notes)
+    return chars, tokens
+
+
+def batch_rtttl_bytes(
+    rows: np.ndarray, bpm: int = DEFAULT_BPM, title: str = RINGTONE_TITLE
+) -> np.ndarray:
+    """
+    The byte length of each row's titled ringtone, i.e.
+    len(f"P1:{rtttl}") for the RTTTL make_ringtones would produce, without
+    encoding any of them. Octaves are always one digit, so every staff's
+    rotation of a row has the same length.
+    """
+    chars, tokens = _rtttl_length_tables(rows.shape[1])
+    intervals = batch_timepoint_intervals(rows)
+    # header and final rest, which every ringtone shares
+    fixed = len(f"{title}:") + len(encode_rtttl([], [], [], bpm))
+    # each note token brings its own comma
+    return (
+        fixed
+        + chars[intervals, rows].sum(axis=1)
+        + tokens[intervals, rows].sum(axis=1)
+    )
+
+
+def row_metrics(
+    rows: np.ndarray,
+    bpm: int = DEFAULT_BPM,
+    starting_octave: int = DEFAULT_STARTING_OCTAVE,
+) -> RowMetrics:
+    octaves = batch_octave_numbers(rows, starting_octave=starting_octave)
+    return RowMetrics(
+        rtttl_bytes=batch_rtttl_bytes(rows, bpm),
+        duration=batch_timepoint_intervals(rows).sum(axis=1),
+        octave_span=octaves.max(axis=1) - octaves.min(axis=1),
+        interval_classes=batch_interval_classes(rows),
+    )
+
+
+def constraint_mask(
+    metrics: RowMetrics, constraints: RowConstraints
+) -> np.ndarray:
+    mask = np.ones(len(metrics.duration), dtype=bool)
+    bounds = [
+        (metrics.rtttl_bytes, None, constraints.max_rtttl_bytes),
+        (metrics.duration, constraints.min_duration, constraints.max_duration),
+        (metrics.octave_span, constraints.min_octave_span,
+         constraints.max_octave_span),
+        (metrics.interval_classes, constraints.min_interval_classes, None),
+    ]
+    for values, minimum, maximum in bounds:
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+    return mask
+
+
+def _search_chunk(
+    chunk: tuple[int, int, int | None],
+    constraints: RowConstraints,
+    bpm: int,
+    starting_octave: int,
+) -> tuple[np.ndarray, RowMetrics]:
+    start, stop, seed = chunk
+    if seed is None:
+        rows = unrank_permutations(start, stop)
+    else:
+        rows = random_rows(stop - start, seed)
+    metrics = row_metrics(rows, bpm, starting_octave)
+    mask = constraint_mask(metrics, constraints)
+    return rows[mask], RowMetrics(*(m[mask] for m in metrics))
+
+
+def explore_rows(
+    constraints: RowConstraints,
+    start: int = 0,
+    stop: int | None = None,
+    sample: int | None = None,
+    seed: int = 0,
+    bpm: int = DEFAULT_BPM,
+    starting_octave: int = DEFAULT_STARTING_OCTAVE,
+    jobs: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[tuple[np.ndarray, RowMetrics]]:
+    """
+    Search the 12-tone row space (by rank, or a random sample) across a
+    process pool, yielding the matching rows and their metrics chunk by
+    chunk so callers can stream them to disk.
+
+    :param constraints: bounds on row metrics
+    :type constraints: RowConstraints
+    :param start: first row rank to search
+    :type start: int
+    :param stop: row rank to stop before; defaults to 12!
+    :type stop: int | None
+    :param sample: search this many random rows instead of ranks
+    :type sample: int | None
+    :return: (rows, metrics) for each chunk, in order
+    :rtype: Iterator[tuple[np.ndarray, RowMetrics]]
+    """
+    if sample is not None:
+        start, stop = 0, sample
+    elif stop is None:
+        stop = math.factorial(ROW_LENGTH)
+    chunks = [
+        (s, min(s + chunk_size, stop), None if sample is None else seed + i)
+        for i, s in enumerate(range(start, stop, chunk_size))
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(
+            partial(
+                _search_chunk,
+                constraints=constraints,
+                bpm=bpm,
+                starting_octave=starting_octave
+            ),
+            chunks
+        )
+
+
+def write_rows(
+    fh: TextIO, rows: np.ndarray, metrics: RowMetrics
+) -> None:
+    for row, *values in zip(rows.tolist(), *(m.tolist() for m in metrics)):
+        fh.write(" ".join(map(str, row)) + "," + ",".join(map(str, values)))
+        fh.write("\n")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    constraints = RowConstraints(
+        max_rtttl_bytes=args.max_rtttl_bytes,
+        min_duration=args.min_duration,
+        max_duration=args.max_duration,
+        min_octave_span=args.min_octave_span,
+        max_octave_span=args.max_octave_span,
+        min_interval_classes=args.min_interval_classes,
+    )
+    fh = sys.stdout if args.output_file is None \
+        else open(args.output_file, "w", buffering=1)
+    fh.write("series," + ",".join(RowMetrics._fields) + "\n")
+    matches = 0
+    for rows, metrics in explore_rows(
+        constraints,
+        start=args.start,
+        stop=args.stop,
+        sample=args.sample,
+        seed=args.seed,
+        bpm=args.bpm,
+        starting_octave=args.starting_octave,
+        jobs=args.jobs,
+    ):
+        write_rows(fh, rows, metrics)
+        matches += len(rows)
+    if fh is not sys.stdout:
+        fh.close()
+    print(f"{matches} matching rows", file=sys.stderr)
@@ -0,0 +1,229 @@
+"""
+flagday.composition.fonts : re-embed fonts in LilyPond PDFs built with
+gs-never-embed-fonts, running batches of PDFs through in-process Ghostscript
+(no process to start per PDF) on a background thread.
+"""
+
+import functools
+import os
+import queue
+import tempfile
+import threading
+
+from concurrent.futures import Future
+from typing import Sequence
+
+from flagday.composition.profiling import stage
+
+# SAFER locks the device's OutputFile, so each PDF gets its own instance
+# with its OutputFile set on the command line
+GHOSTSCRIPT_ARGS: list[str] = [
+    "gs", "-q", "-dNOPAUSE", "-dBATCH", "-dSAFER", "-sDEVICE=pdfwrite",
+]
+DEFAULT_LINGER: float = 0.05
+# libgs only allows one instance per process
+_ghostscript_lock = threading.Lock()
+
+
+class FontEmbeddingError(RuntimeError):
+    """
+    Raised when Ghostscript fails to re-embed a PDF's fonts; the PDF is left
+    as LilyPond wrote it.
+    """
+    pass
+
+
+@functools.cache
+def _font_names(font_dir: str, mtime_ns: int) -> tuple[str, ...]:
+    return tuple(sorted(
+        name for name in os.listdir(font_dir)
+        if os.path.isfile(os.path.join(font_dir, name))
+    ))
+
+
+def font_names(res_dir: str) -> tuple[str, ...]:
+    """
+    The fonts in a LilyPond font-ps-resdir (one file per font, named after
+    it, under Font/), cached until the directory changes.
+    """
+    font_dir = os.path.join(res_dir, "Font")
+    try:
+        mtime_ns = os.stat(font_dir).st_mtime_ns
+    except FileNotFoundError:
+        return ()
+    return _font_names(font_dir, mtime_ns)
+
+
+def preload_fonts(names: Sequence[str]) -> str:
+    """
+    PostScript loading fonts into global VM, where they outlive the
+    save/restore around each PDF a Ghostscript instance runs.
+    """
+    finds = " ".join(f"/{name} findfont pop" for name in names)
+    return f"currentglobal true setglobal {finds} setglobal"
+
+
+def moved_aside(pdf: str) -> str:
+    """
+    Move a PDF to a unique name beside it, for Ghostscript to read from
+    while writing the PDF's own path, so concurrent builds into the same
+    directory don't collide.
+    """
+    directory, name = os.path.split(pdf)
+    fd, path = tempfile.mkstemp(
+        prefix=f"{os.path.splitext(name)[0]}.",
+        suffix=".nofonts.pdf",
+        dir=directory or "."
+    )
+    os.close(fd)
+    os.replace(pdf, path)
+    return path
+
+
+def permitted_files(res_dir: str, pdf: str) -> list[str]:
+    """
+    The Ghostscript arguments letting an instance in SAFER mode read the
+    fonts in res_dir, and read and write the PDF's directory, where it's
+    moved aside and written back.
+    """
+    pdf_dir = os.path.join(os.path.dirname(os.path.abspath(pdf)), "")
+    args = [
+        f"--permit-file-read={os.path.join(os.path.abspath(path), '')}"
+        for path in [res_dir, os.path.join(res_dir, "Font")]
+    ]
+    return args + [
+        f"--permit-file-read={pdf_dir}", f"--permit-file-write={pdf_dir}"
+    ]
+
+
+def ghostscript_args(res_dir: str, pdf: str, source: str) -> list[str]:
+    """
+    The arguments for an instance re-embedding the fonts in source, a PDF
+    moved aside from pdf, into pdf: the resdir's fonts are loaded first,
+    then source runs through pdfwrite. The paths are absolute, as the
+    permitted directories are.
+    """
+    args = [
+        *GHOSTSCRIPT_ARGS,
+        f"-sOutputFile={os.path.abspath(pdf)}",
+        *permitted_files(res_dir, pdf),
+        f"-I{res_dir}",
+        f"-I{os.path.join(res_dir, 'Font')}",
+    ]
+    names = font_names(res_dir)
+    if names:
+        args += ["-c", preload_fonts(names)]
+    return args + ["-f", os.path.abspath(source)]
+
+
+def embed_fonts(pdfs: Sequence[str], res_dir: str) -> list[str | None]:
+    """
+    Re-embed the fonts in several PDFs in place with in-process Ghostscript,
+    one instance per PDF: SAFER mode won't let an instance change its
+    OutputFile, so each one is started with its PDF's. A PDF Ghostscript
+    fails on is restored as it was.
+
+    :param pdfs: LilyPond PDFs built with gs-never-embed-fonts
+    :type pdfs: Sequence[str]
+    :param res_dir: LilyPond's font-ps-resdir
+    :type res_dir: str
+    :return: for each PDF, None, or the error if it failed
+    :rtype: list[str | None]
+    """
+    # loads libgs, so only import it when actually embedding
+    import ghostscript
+
+    sources = [moved_aside(pdf) for pdf in pdfs]
+    errors: list[str | None] = [None] * len(pdfs)
+    with _ghostscript_lock, stage("ghostscript"):
+        for i, (pdf, source) in enumerate(zip(pdfs, sources)):
+            try:
+                # runs the PDF, and exiting finishes it
+                ghostscript.Ghostscript(
+                    *ghostscript_args(res_dir, pdf, source)
+                ).exit()
+            except Exception as e:
+                errors[i] = f"{type(e).__name__}: {e}"
+    for pdf, source, error in zip(pdfs, sources, errors):
+        if error is None:
+            os.remove(source)
+        else:
+            os.replace(source, pdf)
+    return errors
+
+
+class FontEmbedder:
+    """
+    A background thread embedding fonts in submitted PDFs while other stages
+    carry on, taking every PDF queued at the time (waiting up to linger
+    seconds for more) through one embed_fonts call.
+
+    Use it as a context manager, or call shutdown() when done.
+    """
+
+    def __init__(self, res_dir: str, linger: float = DEFAULT_LINGER) -> None:
+        self.res_dir = res_dir
+        self.linger = linger
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> FontEmbedder:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def submit(self, pdf: str) -> Future:
+        """
+        Queue a PDF to have its fonts embedded in place.
+
+        :return: a future for the PDF's path
+        :rtype: Future
+        :raises: RuntimeError
+        """
+        if self._shutdown:
+            raise RuntimeError("the FontEmbedder has been shut down")
+        future: Future = Future()
+        self._queue.put((pdf, future))
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        if not self._shutdown:
+            self._shutdown = True
+            self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def _work(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.linger)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            batch = [
+                (pdf, future) for pdf, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            try:
+                errors = embed_fonts([pdf for pdf, _ in batch], self.res_dir)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (pdf, future), error in zip(batch, errors):
+                if error is None:
+                    future.set_result(pdf)
+                else:
+                    future.set_exception(FontEmbeddingError(error))
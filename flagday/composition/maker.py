@@ -1,20 +1,59 @@
 import argparse
 import copy
+import functools
 import os
 import re
+import sys
 
+from fractions import Fraction
 from pathlib import Path
-from typing import List, Sequence
+from typing import Iterator, Sequence
 
-import abjad
-import ghostscript
+from flagday import lazy_import
 
+from flagday.composition.cache import (
+    BuildCache,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_BYTES,
+    cache_key,
+)
+from flagday.composition.profiling import (
+    CPROFILE_ENV,
+    REPORT_FORMATS,
+    cprofile_at_exit,
+    env_report_format,
+    report_at_exit,
+    stage,
+)
+from flagday.composition.render import (
+    embed_fonts_in_pdf,
+    format_staff,
+    iter_lilypond_source,
+    render_all,
+    run_lilypond,
+    run_lilypond_stream,
+    write_lilypond_stream,
+)
+from flagday.composition.rhythm import logical_ties, metered_durations
+from flagday.composition.ringtone import (
+    FINAL_REST,
+    encode_rtttl,
+    make_ringtones,
+)
+from flagday.composition.rows import (
+    babbitt_timepoints,
+    octave_numbers,
+    rotate_series,
+    staff_starting_octaves,
+)
 from flagday.composition.series import (
     SeriesSeq,
     generate_babbitt_timepoint_set,
     generate_pitch_octave_series,
     generate_random_series,
+    pitch_class_numbers,
 )
+from flagday.composition.watch import DEFAULT_DEBOUNCE, watch_paths
 from flagday.config.composition import (
     CompositionConfig,
     DEFAULT_BPM,
@@ -22,11 +61,20 @@ from flagday.config.composition import (
     DEFAULT_STARTING_OCTAVE
 )
 
+abjad = lazy_import("abjad")
 INCLUDES_DIR = os.path.join(os.getcwd(), 'stylesheets')
 OUTPUT_DIR = os.path.join(os.getcwd(), 'output')
 RES_DIR = os.path.join(OUTPUT_DIR, 'resdir')
 PREAMBLE_FILE = os.path.join(INCLUDES_DIR, 'preamble.ily')
-ringtones: List[str] = []
+OUTPUT_ARTIFACTS: dict[str, list[str]] = {
+    "ly": ["flagday.ly"],
+    "midi": ["flagday.midi"],
+    "pdf": ["flagday.pdf"],
+    "rtttl": ["flagday.rtttl"],
+    "all": ["flagday.ly", "flagday.midi", "flagday.pdf", "flagday.rtttl"],
+}
+# staves (and their leaves and RTTTL) kept for repeated builds in one process
+STAFF_MEMO_SIZE: int = 256
 parser = argparse.ArgumentParser(
     prog="flagday.composition.maker",
     description="builds scores, etc. for flagday"
@@ -36,6 +84,48 @@ parser.add_argument(
     '-o', '--output', type=str, choices=["all", "ly", "midi", "pdf", "rtttl"]
 )
 parser.add_argument('--embed-fonts', action=argparse.BooleanOptionalAction)
+parser.add_argument(
+    '--fast', action='store_true',
+    help="with -o rtttl, compute ringtones without building a score"
+)
+parser.add_argument(
+    '--stream', action='store_true',
+    help="format the score staff by staff, piping it straight into LilyPond"
+)
+parser.add_argument(
+    '--cache', action=argparse.BooleanOptionalAction, default=True,
+    help="reuse outputs from the build cache when inputs are unchanged"
+)
+parser.add_argument(
+    '--rebuild', action='store_true',
+    help="ignore cached outputs, but refresh the cache"
+)
+parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+parser.add_argument(
+    '--cache-size', type=int, default=DEFAULT_CACHE_MAX_BYTES,
+    help="maximum cache size in bytes"
+)
+parser.add_argument(
+    '--watch', action='store_true',
+    help="rebuild whenever the config or stylesheets change"
+)
+parser.add_argument(
+    '--debounce', type=float, default=DEFAULT_DEBOUNCE,
+    help="with --watch, wait for this many seconds of quiet before rebuilding"
+)
+parser.add_argument(
+    '--profile', nargs='?', const="table", choices=REPORT_FORMATS,
+    default=env_report_format(),
+    help="report per-stage wall/CPU time and peak memory on exit "
+         "(default table; also $FLAGDAY_PROFILE)"
+)
+parser.add_argument(
+    '--profile-output', help="write the profile report here, not stderr"
+)
+parser.add_argument(
+    '--cprofile', default=os.environ.get(CPROFILE_ENV) or None,
+    help="dump cProfile stats to this file (also $FLAGDAY_CPROFILE)"
+)
 
 
 def make_series_notes(
@@ -53,11 +143,12 @@ def make_series_notes(
     if not isinstance(series, abjad.PitchClassSegment):
         series = abjad.PitchClassSegment(series)
 
-    pitch_series = generate_pitch_octave_series(
-        series, starting_octave=abjad.Octave(starting_octave)
-    )
-    pitch_list = abjad.makers.make_pitches(pitch_series)
-    durations = generate_babbitt_timepoint_set(series)
+    with stage("series"):
+        pitch_series = generate_pitch_octave_series(
+            series, starting_octave=abjad.Octave(starting_octave)
+        )
+        pitch_list = abjad.makers.make_pitches(pitch_series)
+        durations = generate_babbitt_timepoint_set(series)
     notes = abjad.makers.make_notes(
         pitch_list, durations, increase_monotonic=True,
     )
@@ -68,12 +159,81 @@ def make_series_notes(
     return notes
 
 
+def make_metered_series_notes(
+    series: SeriesSeq,
+    starting_octave: int = DEFAULT_STARTING_OCTAVE,
+) -> Sequence[abjad.Note | abjad.Rest]:
+    """
+    make the notes of make_series_notes already rewritten to the meter, with
+    the splits, ties and dots computed arithmetically from the timepoints
+    (see flagday.composition.rhythm) instead of by abjad.Meter.rewrite
+
+    :param series: a series, e.g. a tone row
+    :type series: SeriesSeq
+    :return: tied notes followed by the final rest
+    :rtype: Sequence[abjad.Note | abjad.Rest]
+    """
+    leaves: list[abjad.Note | abjad.Rest] = []
+    for pitch, duration, tied in metered_leaves(
+        tuple(pitch_class_numbers(series)), starting_octave
+    ):
+        duration = abjad.Duration(duration.numerator, duration.denominator)
+        if pitch is None:
+            leaves.append(abjad.Rest.from_duration(duration))
+            continue
+        note = abjad.Note.from_duration_and_pitch(duration, pitch)
+        if tied:
+            abjad.attach(abjad.Tie(), note)
+        leaves.append(note)
+    return leaves
+
+
+@functools.lru_cache(maxsize=STAFF_MEMO_SIZE)
+def metered_leaves(
+    series: tuple[int, ...],
+    starting_octave: int = DEFAULT_STARTING_OCTAVE,
+) -> tuple[tuple[abjad.NamedPitch | None, Fraction, bool], ...]:
+    """
+    the leaves of make_metered_series_notes as (pitch, duration, tied)
+    triples, memoized on the series and starting octave; abjad components
+    can only belong to one staff, so it's these that are reused rather than
+    the notes themselves
+
+    :param series: pitch class numbers, e.g. a rotated tone row
+    :type series: tuple[int, ...]
+    :return: each leaf's pitch (None for the final rest), written duration
+        and whether it's tied to the next leaf
+    :rtype: tuple[tuple[abjad.NamedPitch | None, Fraction, bool], ...]
+    """
+    with stage("series"):
+        pitches = generate_pitch_octave_series(
+            series, starting_octave=starting_octave
+        )
+        note_ties = logical_ties([
+            Fraction(*tp.pair()) for tp in babbitt_timepoints(series)
+        ])
+    with stage("meter"):
+        metered = iter(metered_durations(
+            [tie for ties in note_ties for tie in ties]
+            + [[Fraction(*FINAL_REST)]]
+        ))
+    leaves: list[tuple[abjad.NamedPitch | None, Fraction, bool]] = []
+    for pitch, ties in zip(pitches, note_ties, strict=True):
+        for _ in ties:
+            durations = next(metered)
+            for i, duration in enumerate(durations):
+                leaves.append((pitch, duration, i < len(durations) - 1))
+    leaves.extend((None, duration, False) for duration in next(metered))
+    return tuple(leaves)
+
+
 def make_staff_and_voice(
         series: abjad.PitchClassSegment,
         offset: int = 0,
         factor: int = 2,
         bpm: int = DEFAULT_BPM,
-        starting_octave: int = DEFAULT_STARTING_OCTAVE
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        metered: bool = False
 ) -> abjad.Staff:
     """
     iteratively create staves and voices, with instrument name annotation
@@ -84,14 +244,24 @@ def make_staff_and_voice(
     :type offset: int
     :param factor: multiplication factor for series rotation
     :type factor: int
+    :param metered: use make_metered_series_notes, e.g. to skip the meter
+        rewrite
+    :type metered: bool
     :return: the combined staff
     :rtype: abjad.Staff
     """
     current_series = series.rotate(offset * factor)
     voice = abjad.Voice(name=f"Voice_{offset}", simultaneous=False)
-    notes = make_series_notes(current_series, starting_octave=starting_octave)
-    rtttl = rtttl_from_notes(notes, bpm)
-    ringtones.append(f"P{offset + 1}:{rtttl}")  # fixme: globals :(
+    if metered:
+        notes = make_metered_series_notes(
+            current_series, starting_octave=starting_octave
+        )
+    else:
+        notes = make_series_notes(
+            current_series, starting_octave=starting_octave
+        )
+    with stage("rtttl"):
+        rtttl = rtttl_from_series(current_series, bpm, starting_octave)
     voice.extend(notes)
     staff = abjad.Staff([voice], name=f"Staff_{offset}", simultaneous=False)
     string = r"""
@@ -148,10 +318,41 @@ def rtttl_from_notes(
     return f'd=16,o=5,b={bpm}:' + ','.join(rtttl)
 
 
-def make_score_from_series(
+def rtttl_from_series(
         series: SeriesSeq,
         bpm: int = DEFAULT_BPM,
         starting_octave: int = DEFAULT_STARTING_OCTAVE
+) -> str:
+    """
+    Generate the same RTTTL string as rtttl_from_notes(make_series_notes(...))
+    arithmetically from the series, without copying or iterating notes
+
+    :param series: a series, e.g. a tone row
+    :type series: SeriesSeq
+    :return: the RTTTL string
+    :rtype: str
+    """
+    return _series_rtttl(
+        tuple(pitch_class_numbers(series)), bpm, starting_octave
+    )
+
+
+@functools.lru_cache(maxsize=STAFF_MEMO_SIZE)
+def _series_rtttl(pcs: tuple[int, ...], bpm: int, starting_octave: int) -> str:
+    return encode_rtttl(
+        pcs,
+        octave_numbers(pcs, starting_octave=starting_octave),
+        [tp.pair() for tp in babbitt_timepoints(pcs)],
+        bpm
+    )
+
+
+def make_score_from_series(
+        series: SeriesSeq,
+        bpm: int = DEFAULT_BPM,
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        factor: int = 2,
+        rewrite_meter: bool = False
 ) -> abjad.Score:
     """
     given an input series, make 6 different staves to be combined into a score
@@ -159,93 +360,449 @@ def make_score_from_series(
 
     :param series: input series, e.g. a tone row
     :type series: SeriesSeq
+    :param factor: multiplication factor for series rotation
+    :type factor: int
+    :param rewrite_meter: build plain notes and rewrite them with abjad.Meter
+        rather than building them already metered; the output is the same
+    :type rewrite_meter: bool
     :return: the completed score, rebalanced into time signature and meter
     :rtype: Score
     """
+    with stage("score"):
+        return abjad.Score(
+            list(iter_score_staves(
+                series, bpm, starting_octave, factor, rewrite_meter
+            )),
+            name="score"
+        )
+
+
+def iter_score_staves(
+        series: SeriesSeq,
+        bpm: int = DEFAULT_BPM,
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        factor: int = 2,
+        rewrite_meter: bool = False
+) -> Iterator[abjad.Staff]:
+    """
+    build the staves of make_score_from_series one at a time, so they can be
+    formatted (e.g. by render.iter_lilypond_source) and dropped as they come
+
+    :param series: input series, e.g. a tone row
+    :type series: SeriesSeq
+    :return: each staff, rebalanced into time signature and meter
+    :rtype: Iterator[abjad.Staff]
+    """
     if not isinstance(series, abjad.PitchClassSegment):
         series = abjad.PitchClassSegment(series)
 
-    # construct the score, attaching the indicators
+    for i, octave in enumerate(staff_starting_octaves(starting_octave, 6)):
+        yield make_score_staff(series, i, factor, bpm, octave, rewrite_meter)
+
+
+def make_score_staff(
+        series: abjad.PitchClassSegment,
+        offset: int = 0,
+        factor: int = 2,
+        bpm: int = DEFAULT_BPM,
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        rewrite_meter: bool = False
+) -> abjad.Staff:
+    """
+    build one staff of the score: make_staff_and_voice, plus the time
+    signature and metronome mark on the first staff, rebalanced into meter
+
+    :param series: input series, e.g. a tone row
+    :type series: abjad.PitchClassSegment
+    :param offset: the staff's index in the score
+    :type offset: int
+    :param starting_octave: the staff's own starting octave
+    :type starting_octave: int
+    :return: the staff
+    :rtype: abjad.Staff
+    """
+    with stage("staff"):
+        staff = make_staff_and_voice(
+            series, offset, factor, bpm, starting_octave,
+            metered=not rewrite_meter
+        )
+        if offset == 0:
+            # attach the indicators to the score's first note
+            first_note = abjad.select.note(staff, 0)  # pyright: ignore[reportAttributeAccessIssue] # noqa: E501
+            abjad.attach(abjad.TimeSignature((3, 4)), first_note)
+            abjad.attach(
+                abjad.MetronomeMark(abjad.Duration(1, 4), bpm), first_note
+            )
+
+        if rewrite_meter:
+            # rewrite the meter so we don't get double-dotted quarter notes :(
+            with stage("meter"):
+                meter = abjad.Meter(abjad.meter.make_best_guess_rtc((3, 4)))
+                meter.rewrite([staff], maximum_dot_count=1)
+    return staff
+
+
+@functools.lru_cache(maxsize=STAFF_MEMO_SIZE)
+def staff_source(
+        series: tuple[int, ...],
+        offset: int,
+        starting_octave: int,
+        bpm: int | None = None,
+        rewrite_meter: bool = False
+) -> str:
+    """
+    the formatted LilyPond source of one staff of the score, memoized on its
+    (already rotated) series and starting octave, so repeated builds in one
+    process (e.g. --watch, or batch sweeps) only build and format the staves
+    that changed
+
+    :param series: the staff's rotated series, as pitch class numbers
+    :type series: tuple[int, ...]
+    :param offset: the staff's index in the score, which names it
+    :type offset: int
+    :param bpm: the tempo, for the first staff's metronome mark; it doesn't
+        change any other staff
+    :type bpm: int | None
+    :return: the staff's source, as render.format_staff returns it
+    :rtype: str
+    """
+    staff = make_score_staff(
+        abjad.PitchClassSegment(series),
+        offset,
+        factor=0,
+        bpm=DEFAULT_BPM if bpm is None else bpm,
+        starting_octave=starting_octave,
+        rewrite_meter=rewrite_meter
+    )
     score = abjad.Score(name="score")
-    current_octave = starting_octave
-    for i in range(6):
-        current_octave += i
-        if current_octave > 7:
-            current_octave = 4
-        score.append(make_staff_and_voice(series, i, 2, bpm, current_octave))
-    first_note = abjad.select.note(score, 0)  # pyright: ignore[reportAttributeAccessIssue] # noqa: E501
-    abjad.attach(abjad.TimeSignature((3, 4)), first_note)
-    abjad.attach(abjad.MetronomeMark(abjad.Duration(1, 4), bpm), first_note)
+    prepare_lilypond_file(score)
+    return format_staff(score, staff)
+
+
+def iter_staff_sources(
+        series: SeriesSeq,
+        bpm: int = DEFAULT_BPM,
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        factor: int = 2,
+        rewrite_meter: bool = False
+) -> Iterator[str]:
+    """
+    the formatted staves of make_score_from_series, from staff_source
+
+    :param series: input series, e.g. a tone row
+    :type series: SeriesSeq
+    :return: each staff's source, for render.iter_lilypond_source
+    :rtype: Iterator[str]
+    """
+    pcs = pitch_class_numbers(series)
+    for i, octave in enumerate(staff_starting_octaves(starting_octave, 6)):
+        yield staff_source(
+            tuple(rotate_series(pcs, i * factor)),
+            i,
+            octave,
+            bpm if i == 0 else None,
+            rewrite_meter
+        )
+
 
-    # rewrite the meter so we don't get double-dotted quarter notes :(
-    meter = abjad.Meter(abjad.meter.make_best_guess_rtc((3, 4)))
-    meter.rewrite(score[:], maximum_dot_count=1)
+def make_lilypond_source(
+        series: SeriesSeq,
+        bpm: int = DEFAULT_BPM,
+        starting_octave: int = DEFAULT_STARTING_OCTAVE,
+        factor: int = 2,
+        rewrite_meter: bool = False,
+        embed_fonts: bool = False
+) -> str:
+    """
+    the source of prepare_lilypond_file(make_score_from_series(...)), as
+    render.format_lilypond_file would format it, put together from memoized
+    staves
 
-    return score
+    :param series: input series, e.g. a tone row
+    :type series: SeriesSeq
+    :return: the LilyPond source
+    :rtype: str
+    """
+    score = abjad.Score(name="score")
+    return "".join(iter_lilypond_source(
+        prepare_lilypond_file(score, embed_fonts),
+        score,
+        iter_staff_sources(series, bpm, starting_octave, factor, rewrite_meter)
+    ))
 
 
 def prepare_lilypond_file(score: abjad.Score, embed_fonts: bool = False) -> abjad.LilyPondFile:
-    layout_block = abjad.Block("layout")
-    midi_block = abjad.Block("midi")
-    score_block = abjad.Block("score", [score, midi_block, layout_block])
-    parts = [rf'\include "{PREAMBLE_FILE}"', score_block]
-    if embed_fonts:
-        parts.append(rf"""
-            #(ly:set-option 'font-ps-resdir '{RES_DIR})
-            #(ly:set-option 'gs-never-embed-fonts ##t)
-        """)
-    lilypond_file = abjad.LilyPondFile(parts)
+    with stage("prepare_lilypond_file"):
+        layout_block = abjad.Block("layout")
+        midi_block = abjad.Block("midi")
+        score_block = abjad.Block("score", [score, midi_block, layout_block])
+        parts = [rf'\include "{PREAMBLE_FILE}"', score_block]
+        if embed_fonts:
+            parts.append(rf"""
+                #(ly:set-option 'font-ps-resdir '{RES_DIR})
+                #(ly:set-option 'gs-never-embed-fonts ##t)
+            """)
+        lilypond_file = abjad.LilyPondFile(parts)
     return lilypond_file
 
 def make_pdf(
-    ly: abjad.LilyPondFile,
+    ly: abjad.LilyPondFile | str,
     output: str=f"{OUTPUT_DIR}/flagday.pdf",
     embed_fonts: bool=False
 ) -> None:
-    abjad.persist.as_pdf(ly, output)
-    if embed_fonts:
-        pdf_no_fonts = os.path.join(OUTPUT_DIR, "flagday.nofonts.pdf")
-        os.rename(output, pdf_no_fonts)
-        ghostscript.Ghostscript(*[
-            "gs", "-q", "-dBATCH", "-dNOPAUSE", "-sDEVICE=pdfwrite",
-            f"-sOutputFile={output}",
-            f"-I ${RES_DIR}", f"-I ${RES_DIR}/Font", pdf_no_fonts
-        ])
+    with stage("pdf"):
+        if isinstance(ly, str):
+            run_lilypond(ly, output.removesuffix(".pdf"))
+        else:
+            with stage("lilypond"):
+                abjad.persist.as_pdf(ly, output)
+        if embed_fonts:
+            embed_fonts_in_pdf(output, RES_DIR)
 
-if __name__ == "__main__":
-    args = parser.parse_args()
-    cfg_path = Path(args.config)
-    if cfg_path.is_file():
-        cfg = CompositionConfig.load_from_file(args.config)
+
+def write_outputs(
+    ly: abjad.LilyPondFile | str | None,
+    output: str | None,
+    embed_fonts: bool = False,
+    ringtones: Sequence[str] = (),
+    output_dir: str = OUTPUT_DIR
+) -> None:
+    """
+    write the requested output(s) for a prepared LilyPond file
+
+    :param ly: the LilyPond file, or its source (e.g. from
+        make_lilypond_source); showing the score needs the file
+    :type ly: abjad.LilyPondFile | str | None
+    :param ringtones: the score's RTTTL ringtones, for rtttl and all
+    :type ringtones: Sequence[str]
+    :param output_dir: directory for the flagday.* outputs
+    :type output_dir: str
+    """
+    with stage(f"output.{output}"):
+        match output:
+            case "ly" if isinstance(ly, str):
+                with open(os.path.join(output_dir, "flagday.ly"), "w") as fh:
+                    fh.write(ly)
+            case "ly":
+                abjad.persist.as_ly(ly, os.path.join(output_dir, "flagday.ly"))
+            case "midi" if isinstance(ly, str):
+                run_lilypond(ly, os.path.join(output_dir, "flagday"))
+            case "midi":  # not working
+                with stage("lilypond"):
+                    abjad.persist.as_midi(
+                        ly, os.path.join(output_dir, "flagday.midi")
+                    )
+            case "pdf":
+                make_pdf(
+                    ly,
+                    output=os.path.join(output_dir, "flagday.pdf"),
+                    embed_fonts=embed_fonts
+                )
+            case "rtttl":
+                rtttl_path = os.path.join(output_dir, "flagday.rtttl")
+                with open(rtttl_path, "w") as fh:
+                    fh.write("\n".join(ringtones))
+                    fh.write("\n")
+            case "all":
+                render_all(
+                    ly,
+                    os.path.join(output_dir, "flagday"),
+                    ringtones,
+                    embed_fonts=embed_fonts,
+                    res_dir=RES_DIR
+                )
+            case _:
+                abjad.show(ly)
+
+
+def stream_outputs(
+    cfg: CompositionConfig,
+    output: str,
+    embed_fonts: bool = False,
+    ringtones: Sequence[str] = (),
+    output_dir: str = OUTPUT_DIR
+) -> None:
+    """
+    write the requested output(s) like write_outputs, but build and format
+    the score staff by staff, streaming it into the .ly file and/or LilyPond
+    so LilyPond starts parsing before the score is finished and memory stays
+    flat as the score grows. midi and pdf both come out of one LilyPond pass.
+
+    :param cfg: the composition to render
+    :type cfg: CompositionConfig
+    :param output: one of ly, midi, pdf, rtttl or all
+    :type output: str
+    """
+    with stage(f"stream.{output}"):
+        score = abjad.Score(name="score")
+        chunks = iter_lilypond_source(
+            prepare_lilypond_file(score),
+            score,
+            iter_staff_sources(cfg.series, cfg.bpm, cfg.starting_octave)
+        )
+        output_base = os.path.join(output_dir, "flagday")
+        match output:
+            case "ly":
+                write_lilypond_stream(chunks, f"{output_base}.ly")
+            case "midi" | "pdf":
+                run_lilypond_stream(chunks, output_base)
+            case "all":
+                run_lilypond_stream(
+                    chunks, output_base, ly_path=f"{output_base}.ly"
+                )
+        if output in ("rtttl", "all"):
+            write_outputs(
+                None, "rtttl", ringtones=ringtones, output_dir=output_dir
+            )
+        if embed_fonts and output in ("pdf", "all"):
+            embed_fonts_in_pdf(f"{output_base}.pdf", RES_DIR)
+
+
+def load_config(config: str) -> CompositionConfig:
+    """
+    load the composition config, or make up a random one if there isn't one
+    """
+    if Path(config).is_file():
+        return CompositionConfig.load_from_file(config)
+    return CompositionConfig(
+        bpm=DEFAULT_BPM,
+        series=generate_random_series(),
+        starting_octave=DEFAULT_STARTING_OCTAVE
+    )
+
+
+def build(
+    cfg: CompositionConfig,
+    output: str | None,
+    embed_fonts: bool = False,
+    stream: bool = False,
+    fast: bool = False,
+    cache: BuildCache | None = None,
+    rebuild: bool = False,
+    output_dir: str = OUTPUT_DIR
+) -> None:
+    """
+    build the requested output(s) for a composition, reusing cached outputs
+    when its inputs are unchanged
+
+    :param cfg: the composition to build
+    :type cfg: CompositionConfig
+    :param output: one of ly, midi, pdf, rtttl or all, or None to show it
+    :type output: str | None
+    :param stream: use stream_outputs
+    :type stream: bool
+    :param fast: with rtttl, skip building the score (and the cache)
+    :type fast: bool
+    :param cache: the build cache, if any
+    :type cache: BuildCache | None
+    :param rebuild: build even if the outputs are cached, then cache them
+    :type rebuild: bool
+    """
+    if fast and output == "rtttl":
+        with open(os.path.join(output_dir, "flagday.rtttl"), "w") as fh:
+            fh.write("\n".join(make_ringtones(
+                cfg.series, cfg.bpm, cfg.starting_octave
+            )))
+            fh.write("\n")
+        return
+    with stage("ringtones"):
+        ringtones = make_ringtones(cfg.series, cfg.bpm, cfg.starting_octave)
+    if stream and output is not None:
+        # the source isn't formatted up front, but it's a function of the
+        # config, the flagday code and abjad, which the cache key covers
+        ly = None
+        source_key = f"abjad {abjad.__version__}"
+    elif output is not None:
+        ly = source_key = make_lilypond_source(
+            cfg.series,
+            bpm=cfg.bpm,
+            starting_octave=cfg.starting_octave
+        )
     else:
-        cfg = CompositionConfig(
-            bpm=DEFAULT_BPM,
-            series=generate_random_series(), 
-            starting_octave=DEFAULT_STARTING_OCTAVE
+        score = make_score_from_series(
+            cfg.series,
+            bpm=cfg.bpm,
+            starting_octave=cfg.starting_octave
         )
-    score = make_score_from_series(
-        cfg.series,
-        bpm=cfg.bpm,
-        starting_octave=cfg.starting_octave
+        ly = prepare_lilypond_file(score)
+        source_key = None
+    artifacts = [
+        os.path.join(output_dir, name)
+        for name in OUTPUT_ARTIFACTS.get(output, [])
+    ]
+    if not artifacts:
+        cache = None
+    if cache is not None:
+        key = cache_key(
+            output,
+            str(bool(embed_fonts)),
+            str(cfg.bpm),
+            str(list(cfg.series)),
+            str(cfg.starting_octave),
+            source_key,
+            include_files=[INCLUDES_DIR, RES_DIR] if embed_fonts
+            else [INCLUDES_DIR],
+        )
+    with stage("cache"):
+        cached = cache is not None and not rebuild \
+            and cache.fetch(key, artifacts)
+    if not cached:
+        if ly is None:
+            stream_outputs(
+                cfg,
+                output,
+                embed_fonts=embed_fonts,
+                ringtones=ringtones,
+                output_dir=output_dir
+            )
+        else:
+            write_outputs(
+                ly,
+                output,
+                embed_fonts=embed_fonts,
+                ringtones=ringtones,
+                output_dir=output_dir
+            )
+        if cache is not None:
+            with stage("cache"):
+                cache.store(key, artifacts)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.profile:
+        report_at_exit(args.profile, args.profile_output)
+    if args.cprofile:
+        cprofile_at_exit(args.cprofile)
+    cache = BuildCache(args.cache_dir, args.cache_size) if args.cache \
+        else None
+    build_args = dict(
+        output=args.output,
+        embed_fonts=args.embed_fonts,
+        stream=args.stream,
+        fast=args.fast,
+        cache=cache,
+        rebuild=args.rebuild,
     )
-    ly = prepare_lilypond_file(score)
-    match args.output:
-        case "ly":
-            abjad.persist.as_ly(ly, os.path.join(OUTPUT_DIR, "flagday.ly"))
-        case "midi":  # not working
-            abjad.persist.as_midi(ly, os.path.join(OUTPUT_DIR, "flagday.midi"))
-        case "pdf":
-            make_pdf(ly, embed_fonts=args.embed_fonts)
-        case "rtttl":
-            with open(os.path.join(OUTPUT_DIR, "flagday.rtttl"), "w") as fh:
-                fh.write("\n".join(ringtones))
-                fh.write("\n")
-        case "all":
-            abjad.persist.as_midi(ly, os.path.join(OUTPUT_DIR, "flagday.midi"))
-            abjad.persist.as_ly(ly, os.path.join(OUTPUT_DIR, "flagday.ly"))
-            make_pdf(ly, embed_fonts=args.embed_fonts)
-            with open(os.path.join(OUTPUT_DIR, "flagday.rtttl"), "w") as fh:
-                fh.write("\n".join(ringtones))
-                fh.write("\n")
-        case _:
-            abjad.show(ly)
+    build(load_config(args.config), **build_args)
+    if args.watch:
+        # the interpreter stays up, so abjad, the staff memo, etc. stay warm
+        # and a rebuild is mostly the LilyPond pass
+        watched = [args.config, INCLUDES_DIR]
+        print(f"watching {', '.join(watched)}", file=sys.stderr)
+        try:
+            for changed in watch_paths(watched, debounce=args.debounce):
+                print(f"changed: {', '.join(changed)}", file=sys.stderr)
+                try:
+                    with stage("rebuild"):
+                        build(load_config(args.config), **build_args)
+                except Exception as e:
+                    # e.g. a half-saved config; wait for the next save
+                    print(
+                        f"build failed: {type(e).__name__}: {e}",
+                        file=sys.stderr
+                    )
+                else:
+                    print("rebuilt", file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,197 @@
+"""
+flagday.composition.pool : engrave many LilyPond sources with a bounded pool
+of workers, each running one lilypond process per batch of sources so
+LilyPond's startup (Guile, fonts, the preamble) is paid per batch rather
+than per score.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from concurrent.futures import Future
+from typing import Iterable, NamedTuple, Sequence
+
+from flagday.composition import render
+from flagday.composition.profiling import stage
+
+DEFAULT_WORKERS: int = min(4, os.cpu_count() or 1)
+DEFAULT_BATCH_SIZE: int = 8
+# how long a worker waits for more jobs to fill a batch
+DEFAULT_LINGER: float = 0.05
+OUTPUT_EXTENSIONS: tuple[str, ...] = (".pdf", ".midi")
+
+
+class LilyPondJob(NamedTuple):
+    """
+    A source to engrave into {output_base}.pdf and {output_base}.midi.
+    """
+    source: str
+    output_base: str
+
+
+class LilyPondResult(NamedTuple):
+    """
+    The outcome of one job; error holds LilyPond's messages about the job's
+    source if it produced no PDF.
+    """
+    job: LilyPondJob
+    files: list[str]
+    error: str | None
+
+
+def _job_errors(log: str, name: str) -> str:
+    lines = [line for line in log.splitlines() if name in line]
+    return "\n".join(lines) or log
+
+
+def run_lilypond_batch(jobs: Sequence[LilyPondJob]) -> list[LilyPondResult]:
+    """
+    Engrave several sources with a single lilypond invocation: each source
+    is written to a scratch directory, LilyPond runs over all of them, and
+    each job's PDF and MIDI are moved to its output_base. One source failing
+    doesn't stop the others; its result carries LilyPond's messages about
+    it instead.
+
+    :param jobs: the sources to engrave
+    :type jobs: Sequence[LilyPondJob]
+    :return: one result per job, in order
+    :rtype: list[LilyPondResult]
+    """
+    with tempfile.TemporaryDirectory(prefix="flagday-") as scratch:
+        names = []
+        for i, job in enumerate(jobs):
+            names.append(f"flagday_{i}")
+            with open(os.path.join(scratch, f"{names[-1]}.ly"), "w") as fh:
+                fh.write(job.source)
+        with stage("lilypond"):
+            process = subprocess.run(
+                [
+                    render.lilypond_path(),
+                    *render.LILYPOND_FLAGS,
+                    f"--output={scratch}",
+                    *(f"{name}.ly" for name in names),
+                ],
+                cwd=scratch,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+        log = process.stdout.decode(errors="ignore")
+        results = []
+        for name, job in zip(names, jobs):
+            base = os.path.join(scratch, name)
+            if not os.path.exists(f"{base}.pdf"):
+                results.append(
+                    LilyPondResult(job, [], _job_errors(log, f"{name}.ly"))
+                )
+                continue
+            os.makedirs(os.path.dirname(job.output_base) or ".", exist_ok=True)
+            files = []
+            for extension in OUTPUT_EXTENSIONS:
+                if os.path.exists(f"{base}{extension}"):
+                    files.append(f"{job.output_base}{extension}")
+                    shutil.move(f"{base}{extension}", files[-1])
+            results.append(LilyPondResult(job, files, None))
+    return results
+
+
+class LilyPondPool:
+    """
+    A bounded pool of worker threads engraving submitted sources. Each
+    worker takes the next job plus whatever else is queued (up to
+    batch_size, waiting up to linger seconds for more) and engraves them
+    with run_lilypond_batch, so a burst of submissions becomes a few
+    lilypond processes running side by side rather than one per score.
+
+    Use it as a context manager, or call shutdown() when done.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        linger: float = DEFAULT_LINGER,
+    ) -> None:
+        if workers < 1 or batch_size < 1:
+            raise ValueError("workers and batch_size must be at least 1")
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> LilyPondPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def submit(self, source: str, output_base: str) -> Future:
+        """
+        Queue a source to be engraved into output_base.pdf/.midi.
+
+        :return: a future for the job's LilyPondResult
+        :rtype: Future
+        :raises: RuntimeError
+        """
+        if self._shutdown:
+            raise RuntimeError("the LilyPondPool has been shut down")
+        future: Future = Future()
+        self._queue.put((LilyPondJob(source, output_base), future))
+        return future
+
+    def map(self, jobs: Iterable[LilyPondJob]) -> list[LilyPondResult]:
+        futures = [self.submit(*job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the workers once the jobs already queued are done.
+        """
+        if not self._shutdown:
+            self._shutdown = True
+            for _ in self._threads:
+                self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _work(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.linger)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # finish this batch first
+                    stopping = True
+                    break
+                batch.append(item)
+            batch = [
+                (job, future) for job, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                results = run_lilypond_batch([job for job, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
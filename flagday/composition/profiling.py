@@ -0,0 +1,265 @@
+"""
+flagday.composition.profiling : opt-in stage timing for the maker pipeline,
+reporting wall time, CPU time and peak memory per stage as a table, JSON or
+folded stacks (for flamegraph.pl, speedscope, etc.), plus cProfile dumps.
+"""
+
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from typing import ContextManager, Iterator, NamedTuple
+
+PROFILE_ENV: str = "FLAGDAY_PROFILE"
+CPROFILE_ENV: str = "FLAGDAY_CPROFILE"
+REPORT_FORMATS: list[str] = ["table", "json", "folded"]
+STAGE_SEPARATOR: str = ";"
+
+
+class StageTiming(NamedTuple):
+    """
+    Totals for one stage, over every time it ran. cpu is the CPU time of the
+    thread running the stage; child_cpu is that of subprocesses which exited
+    during it (e.g. LilyPond). peak_memory is the peak Python memory traced
+    above what was allocated when the stage started, in bytes.
+    """
+    stage: str
+    calls: int
+    wall: float
+    cpu: float
+    child_cpu: float
+    peak_memory: int
+
+
+class _Frame:
+    __slots__ = ("path", "wall", "cpu", "child_cpu", "memory", "peak")
+
+    def __init__(self, path: str, trace_memory: bool) -> None:
+        self.path = path
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.child_cpu = _child_cpu_time()
+        self.memory = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+        self.peak = self.memory
+
+
+def _child_cpu_time() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class Profiler:
+    """
+    Accumulates StageTimings for named stages. Stages nest: a stage entered
+    inside another is recorded under both names, joined by STAGE_SEPARATOR,
+    e.g. "score;staff". Each thread nests its own stages.
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.trace_memory = trace_memory
+        self._totals: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+
+    def start(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = self._local.__dict__.setdefault("stack", [])
+        path = STAGE_SEPARATOR.join([stack[-1].path, name]) if stack else name
+        with self._lock:
+            # record stages in the order they're entered
+            self._totals.setdefault(path, [0, 0.0, 0.0, 0.0, 0])
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # tracemalloc has one peak, so keep the enclosing stage's peak so
+            # far before resetting it for this one
+            if stack:
+                stack[-1].peak = max(
+                    stack[-1].peak, tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+        frame = _Frame(path, tracing)
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            wall = time.perf_counter() - frame.wall
+            cpu = time.thread_time() - frame.cpu
+            child_cpu = _child_cpu_time() - frame.child_cpu
+            peak = 0
+            if tracing:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                peak = frame.peak - frame.memory
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, frame.peak)
+            with self._lock:
+                totals = self._totals[path]
+                totals[0] += 1
+                totals[1] += wall
+                totals[2] += cpu
+                totals[3] += child_cpu
+                totals[4] = max(totals[4], peak)
+
+    def timings(self) -> list[StageTiming]:
+        with self._lock:
+            return [
+                StageTiming(path, *totals)
+                for path, totals in self._totals.items()
+                if totals[0]
+            ]
+
+
+_profiler: Profiler | None = None
+
+
+def enable(trace_memory: bool = True) -> Profiler:
+    """
+    Start recording stages for the rest of the process.
+
+    :param trace_memory: trace peak memory with tracemalloc, which slows
+        allocation-heavy stages (e.g. building the score) down noticeably
+    :type trace_memory: bool
+    :return: the active profiler
+    :rtype: Profiler
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(trace_memory)
+        _profiler.start()
+    return _profiler
+
+
+def disable() -> Profiler | None:
+    """
+    Stop recording stages.
+
+    :return: the profiler that was active, if any
+    :rtype: Profiler | None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Time the enclosed block as a stage of the active profiler; this does
+    nothing unless profiling is enabled.
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.stage(name)
+
+
+def env_report_format() -> str | None:
+    """
+    The report format requested by the FLAGDAY_PROFILE environment variable:
+    one of REPORT_FORMATS, or table for any other non-empty value.
+    """
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return None
+    return value if value in REPORT_FORMATS else "table"
+
+
+def format_table(timings: list[StageTiming]) -> str:
+    lines = [
+        f"{'stage':32} {'calls':>6} {'wall ms':>10} {'cpu ms':>10} "
+        f"{'child ms':>10} {'peak KiB':>10}"
+    ]
+    for t in timings:
+        *parents, name = t.stage.split(STAGE_SEPARATOR)
+        label = "  " * len(parents) + name
+        lines.append(
+            f"{label:32} {t.calls:6} {t.wall * 1000:10.1f} "
+            f"{t.cpu * 1000:10.1f} {t.child_cpu * 1000:10.1f} "
+            f"{t.peak_memory / 1024:10.1f}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def format_json(timings: list[StageTiming]) -> str:
+    return json.dumps([t._asdict() for t in timings], indent=2) + "\n"
+
+
+def format_folded(timings: list[StageTiming]) -> str:
+    """
+    Wall time per stage in the folded stack format flamegraph.pl reads: the
+    stage path, then its self time (excluding nested stages) in
+    microseconds.
+    """
+    nested: dict[str, float] = {}
+    for t in timings:
+        parent = t.stage.rpartition(STAGE_SEPARATOR)[0]
+        if parent:
+            nested[parent] = nested.get(parent, 0.0) + t.wall
+    lines = []
+    for t in timings:
+        # stages running in other threads can outlast their parent
+        self_time = max(t.wall - nested.get(t.stage, 0.0), 0.0)
+        lines.append(f"{t.stage} {round(self_time * 1_000_000)}")
+    return "\n".join(lines) + "\n"
+
+
+def format_report(timings: list[StageTiming], report_format: str) -> str:
+    match report_format:
+        case "json":
+            return format_json(timings)
+        case "folded":
+            return format_folded(timings)
+        case _:
+            return format_table(timings)
+
+
+def write_report(
+    profiler: Profiler, report_format: str, path: str | None = None
+) -> None:
+    """
+    Write the profiler's report to path, or stderr.
+    """
+    report = format_report(profiler.timings(), report_format)
+    if path is None:
+        sys.stderr.write(report)
+    else:
+        with open(path, "w") as fh:
+            fh.write(report)
+
+
+def report_at_exit(report_format: str, path: str | None = None) -> Profiler:
+    """
+    Enable profiling and write the report when the process exits, however
+    it exits.
+    """
+    profiler = enable()
+    atexit.register(write_report, profiler, report_format, path)
+    return profiler
+
+
+def cprofile_at_exit(path: str) -> cProfile.Profile:
+    """
+    Run cProfile for the rest of the process and dump its stats to path (for
+    pstats, snakeviz, flameprof, etc.) on exit.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    atexit.register(profile.dump_stats, path)
+    return profile
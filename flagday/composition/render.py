@@ -0,0 +1,238 @@
+"""
+flagday.composition.render : LilyPond and Ghostscript output stages.
+"""
+
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+import textwrap
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+from flagday import lazy_import
+from flagday.composition.fonts import FontEmbeddingError, embed_fonts
+from flagday.composition.profiling import stage
+
+abjad = lazy_import("abjad")
+LILYPOND_FLAGS: list[str] = ["-dno-point-and-click"]
+STREAM_PLACEHOLDER: str = "flagday_stream_placeholder"
+
+
+class LilyPondError(RuntimeError):
+    """
+    Raised when LilyPond exits unsuccessfully; carries LilyPond's output.
+    """
+    pass
+
+
+def lilypond_path() -> str:
+    return abjad.io.configuration["lilypond_path"] or \
+        shutil.which("lilypond") or "lilypond"
+
+
+def format_lilypond_file(ly: abjad.LilyPondFile) -> str:
+    """
+    Format a LilyPond file exactly as abjad.persist.as_ly would write it.
+    """
+    with stage("format"):
+        return abjad.lilypond(ly, site_comments=True) + "\n"
+
+
+def run_lilypond(source: str, output_base: str) -> str:
+    """
+    Run a single LilyPond pass over .ly source piped to its stdin. Because
+    flagday scores contain both \\midi and \\layout blocks, one pass writes
+    both `{output_base}.pdf` and `{output_base}.midi`.
+
+    :param source: formatted LilyPond source
+    :type source: str
+    :param output_base: output path without an extension
+    :type output_base: str
+    :return: LilyPond's log output
+    :rtype: str
+    :raises: LilyPondError
+    """
+    with stage("lilypond"):
+        process = subprocess.run(
+            [lilypond_path(), *LILYPOND_FLAGS, f"--output={output_base}", "-"],
+            input=source.encode("utf-8"),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    log = process.stdout.decode(errors="ignore")
+    if process.returncode != 0:
+        raise LilyPondError(log)
+    return log
+
+
+def format_staff(score: abjad.Score, staff: abjad.Staff) -> str:
+    """
+    Format a staff inside an otherwise empty score, so score-level
+    indicators resolve as usual, then detach it again.
+    """
+    score.append(staff)
+    with stage("format"):
+        source = abjad.lilypond(staff, site_comments=True)
+    score.remove(staff)
+    return source
+
+
+def iter_lilypond_source(
+    ly: abjad.LilyPondFile,
+    score: abjad.Score,
+    staves: Iterable[abjad.Staff | str],
+) -> Iterator[str]:
+    """
+    Format a LilyPond file incrementally: everything up to the score's
+    staves, then each staff as the staves iterable produces it, then the
+    rest (the \\midi and \\layout blocks, etc.). Each staff is formatted
+    with format_staff, so only one staff is held at a time. The chunks join
+    to exactly what format_lilypond_file would return for the file with all
+    of the staves in the score.
+
+    :param ly: the LilyPond file, containing score
+    :type ly: abjad.LilyPondFile
+    :param score: the empty score the staves belong in
+    :type score: abjad.Score
+    :param staves: staves to format, e.g. a generator building them lazily,
+        or their source as format_staff returned it, e.g. memoized
+    :type staves: Iterable[abjad.Staff | str]
+    :return: LilyPond source chunks
+    :rtype: Iterator[str]
+    """
+    placeholder = abjad.Staff(name=STREAM_PLACEHOLDER)
+    score.append(placeholder)
+    skeleton = format_lilypond_file(ly)
+    placeholder_source = abjad.lilypond(placeholder, site_comments=True)
+    score.remove(placeholder)
+    line = next(
+        line for line in skeleton.splitlines() if STREAM_PLACEHOLDER in line
+    )
+    indent = line[:len(line) - len(line.lstrip())]
+    head, tail = skeleton.split(
+        textwrap.indent(placeholder_source, indent) + "\n"
+    )
+    yield head
+    for staff in staves:
+        if not isinstance(staff, str):
+            staff = format_staff(score, staff)
+        yield textwrap.indent(staff, indent) + "\n"
+    yield tail
+
+
+def write_lilypond_stream(chunks: Iterable[str], path: str) -> None:
+    with open(path, "w") as fh:
+        fh.writelines(chunks)
+
+
+def run_lilypond_stream(
+    chunks: Iterable[str], output_base: str, ly_path: str | None = None
+) -> str:
+    """
+    Run a single LilyPond pass, writing .ly source chunks to its stdin as
+    they are produced so LilyPond parses while the score is still being
+    generated; like run_lilypond, this writes both the PDF and the MIDI.
+
+    :param chunks: LilyPond source chunks, e.g. from iter_lilypond_source
+    :type chunks: Iterable[str]
+    :param output_base: output path without an extension
+    :type output_base: str
+    :param ly_path: if given, also write the source to this .ly file
+    :type ly_path: str | None
+    :return: LilyPond's log output
+    :rtype: str
+    :raises: LilyPondError
+    """
+    # LilyPond's log goes to a file rather than a pipe, so a chatty LilyPond
+    # can't block on a full pipe while we block writing its stdin
+    with stage("lilypond"), tempfile.TemporaryFile() as log_file:
+        process = subprocess.Popen(
+            [lilypond_path(), *LILYPOND_FLAGS, f"--output={output_base}", "-"],
+            stdin=subprocess.PIPE,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+        ly_file = open(ly_path, "w") if ly_path is not None else None
+        try:
+            for chunk in chunks:
+                if ly_file is not None:
+                    ly_file.write(chunk)
+                process.stdin.write(chunk.encode("utf-8"))
+            process.stdin.close()
+        except BrokenPipeError:
+            # LilyPond exited early; its log says why
+            with contextlib.suppress(BrokenPipeError):
+                process.stdin.close()
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            if ly_file is not None:
+                ly_file.close()
+        returncode = process.wait()
+        log_file.seek(0)
+        log = log_file.read().decode(errors="ignore")
+    if returncode != 0:
+        raise LilyPondError(log)
+    return log
+
+
+def embed_fonts_in_pdf(output: str, res_dir: str) -> None:
+    """
+    Re-embed fonts in a LilyPond PDF built with gs-never-embed-fonts, using
+    the font resources in res_dir.
+
+    :raises: FontEmbeddingError
+    """
+    error = embed_fonts([output], res_dir)[0]
+    if error is not None:
+        raise FontEmbeddingError(error)
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w") as fh:
+        fh.write(text)
+
+
+def render_all(
+    ly: abjad.LilyPondFile | str,
+    output_base: str,
+    ringtones: Iterable[str],
+    embed_fonts: bool = False,
+    res_dir: str = "",
+) -> None:
+    """
+    Write .ly, PDF, MIDI and RTTTL outputs as a small pipeline: the score is
+    formatted once and a single LilyPond pass (PDF + MIDI) runs while the .ly
+    and RTTTL files are written. Ghostscript font embedding needs the PDF, so
+    it's only submitted once LilyPond finishes.
+
+    :param ly: the LilyPond file to render, or its formatted source
+    :type ly: abjad.LilyPondFile | str
+    :param output_base: output path without an extension
+    :type output_base: str
+    :param ringtones: RTTTL ringtones, one per line in the .rtttl output
+    :type ringtones: Iterable[str]
+    :raises: LilyPondError
+    """
+    source = ly if isinstance(ly, str) else format_lilypond_file(ly)
+    rtttl = "\n".join(ringtones) + "\n"
+    os.makedirs(os.path.dirname(output_base) or ".", exist_ok=True)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        lilypond: Future = pool.submit(run_lilypond, source, output_base)
+        stages = [
+            lilypond,
+            pool.submit(_write_text, f"{output_base}.ly", source),
+            pool.submit(_write_text, f"{output_base}.rtttl", rtttl),
+        ]
+        if embed_fonts:
+            lilypond.result()
+            stages.append(pool.submit(
+                embed_fonts_in_pdf, f"{output_base}.pdf", res_dir
+            ))
+        for future in stages:
+            future.result()
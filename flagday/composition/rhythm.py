@@ -0,0 +1,226 @@
+"""
+flagday.composition.rhythm : arithmetic meter rewriting for series staves,
+reproducing abjad.Meter.rewrite on a flat staff without building notes.
+"""
+
+from fractions import Fraction
+from typing import List, Sequence, Tuple
+
+from flagday.composition.ringtone import canonic_parts
+
+MAXIMUM_DOT_COUNT: int = 1
+MEASURE: Fraction = Fraction(3, 4)
+# abjad.Meter stops halving at (and quarters below) an eighth note
+HALVING_LIMIT: Fraction = Fraction(1, 8)
+
+type OffsetInventory = List[Tuple[Fraction, ...]]
+
+
+def prime_factors(n: int) -> List[int]:
+    factors = []
+    divisor = 2
+    while divisor * divisor <= n:
+        while n % divisor == 0:
+            factors.append(divisor)
+            n //= divisor
+        divisor += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def is_assignable(duration: Fraction) -> bool:
+    """
+    Whether a duration can be written as a single (possibly dotted) note,
+    as abjad.Duration.is_assignable.
+    """
+    return (
+        0 < duration < 16
+        and duration.denominator & (duration.denominator - 1) == 0
+        and "01" not in f"{duration.numerator:b}"
+    )
+
+
+def dot_count(duration: Fraction) -> int:
+    return duration.numerator.bit_count() - 1
+
+
+def rewrite_pair(duration: Fraction) -> Tuple[int, int]:
+    """
+    The time signature pair abjad.Meter.rewrite guesses a meter from for a
+    container of the given duration.
+    """
+    if duration.numerator == 1:
+        return 4, 4 * duration.denominator
+    return duration.numerator, duration.denominator
+
+
+def _node_durations(
+    duration: Fraction, factors: Sequence[int], denominator: int
+) -> List:
+    """
+    The rhythm tree of abjad.meter.make_best_guess_rtc as nested lists of
+    (duration, children) pairs.
+    """
+    if not factors:
+        return [
+            (Fraction(1, denominator), [])
+            for _ in range(duration.numerator * denominator
+                           // duration.denominator)
+        ]
+    factor, factors = factors[0], factors[1:]
+    child = duration / factor
+
+    def children(count: int) -> List:
+        if factors:
+            return [
+                (child, _node_durations(child, factors, denominator))
+                for _ in range(count)
+            ]
+        return [(Fraction(1, denominator), []) for _ in range(count)]
+
+    if factor in (2, 3, 4):
+        return children(factor)
+    # larger primes group as 3 + 2 + 2 + ...
+    parts = [3] + [2] * ((factor - 3) // 2)
+    return [(part * child, children(part)) for part in parts]
+
+
+def best_guess_offsets(numerator: int, denominator: int) -> OffsetInventory:
+    """
+    The depthwise offset inventory of
+    abjad.Meter(abjad.meter.make_best_guess_rtc((numerator, denominator))).
+    """
+    factors = prime_factors(numerator)
+    if factors[:2] == [2, 2]:
+        factors[0:2] = [4]
+    total = Fraction(numerator, denominator)
+    offsets = {Fraction(0), total}
+    inventory = [tuple(sorted(offsets))]
+    level = [(Fraction(0), _node_durations(total, factors, denominator))]
+    while any(nodes for _, nodes in level):
+        next_level = []
+        for start, nodes in level:
+            for duration, children in nodes:
+                offsets.add(start)
+                next_level.append((start, children))
+                start += duration
+        inventory.append(tuple(sorted(offsets)))
+        level = next_level
+    return inventory
+
+
+def offsets_at_depth(
+    inventory: OffsetInventory, depth: int
+) -> Tuple[Fraction, ...]:
+    """
+    The offsets at a depth of the inventory, subdividing below its deepest
+    level the way abjad.Meter.rewrite does (extending the inventory in
+    place).
+    """
+    while len(inventory) <= depth:
+        old = inventory[-1]
+        new = []
+        for first, second in zip(old, old[1:]):
+            new.append(first)
+            half = (first + second) / 2
+            if second - first > HALVING_LIMIT:
+                new.append(half)
+            else:
+                new.extend([(first + half) / 2, half, (half + second) / 2])
+        new.append(old[-1])
+        inventory.append(tuple(new))
+    return inventory[depth]
+
+
+def split_logical_tie(
+    start: Fraction,
+    stop: Fraction,
+    inventory: OffsetInventory,
+    maximum_dot_count: int = MAXIMUM_DOT_COUNT,
+    depth: int = 0,
+) -> List[Fraction]:
+    """
+    The written durations a logical tie from start to stop is rewritten to:
+    split at the latest (if it starts on an offset) or earliest meter offset
+    inside it until each part is assignable, has few enough dots and starts
+    or stops on an offset of its depth.
+
+    :return: the durations of the tied leaves, in order
+    :rtype: List[Fraction]
+    """
+    offsets = offsets_at_depth(inventory, depth)
+    duration = stop - start
+    starts, stops = start in offsets, stop in offsets
+    if (
+        is_assignable(duration)
+        and dot_count(duration) <= maximum_dot_count
+        and (starts or stops)
+    ):
+        return [duration]
+    candidates = reversed(offsets) if starts else offsets
+    split = next((o for o in candidates if start < o < stop), None)
+    if split is None:
+        return split_logical_tie(
+            start, stop, inventory, maximum_dot_count, depth + 1
+        )
+    return (
+        split_logical_tie(start, split, inventory, maximum_dot_count, depth)
+        + split_logical_tie(split, stop, inventory, maximum_dot_count, depth)
+    )
+
+
+def logical_ties(
+    durations: Sequence[Fraction], measure: Fraction = MEASURE
+) -> List[List[List[Fraction]]]:
+    """
+    The logical ties of make_series_notes before its meter is rewritten:
+    each duration is split into canonic parts (as abjad.makers.make_notes
+    does) and the parts are tied, except that a part straddling a barline
+    loses its tie, as abjad.mutate.split leaves it when splitting measures,
+    e.g. 10/16 starting at 11/16 is 2/16 and then, untied, 8/16.
+
+    :param durations: note durations, e.g. the Babbitt timepoints
+    :type durations: Sequence[Fraction]
+    :return: for each note, the part durations of each of its logical ties
+    :rtype: List[List[List[Fraction]]]
+    """
+    notes = []
+    start = Fraction(0)
+    for duration in durations:
+        ties: List[List[Fraction]] = [[]]
+        for part in canonic_parts(duration.numerator):
+            part = Fraction(part, duration.denominator)
+            ties[-1].append(part)
+            if start // measure != (start + part) // measure and \
+                    (start + part) % measure:
+                ties.append([])
+            start += part
+        notes.append([tie for tie in ties if tie])
+    return notes
+
+
+def metered_durations(
+    ties: Sequence[Sequence[Fraction]],
+    maximum_dot_count: int = MAXIMUM_DOT_COUNT,
+) -> List[List[Fraction]]:
+    """
+    Rewrite consecutive logical ties (e.g. a staff's notes and its final
+    rest) as abjad.Meter(...).rewrite(staff, maximum_dot_count=...) does for a
+    flat staff: against the best-guess meter of the staff's total duration.
+
+    :param ties: the part durations of each logical tie
+    :type ties: Sequence[Sequence[Fraction]]
+    :return: the rewritten leaf durations of each logical tie
+    :rtype: List[List[Fraction]]
+    """
+    durations = [sum(tie, Fraction(0)) for tie in ties]
+    inventory = best_guess_offsets(*rewrite_pair(sum(durations, Fraction(0))))
+    metered = []
+    start = Fraction(0)
+    for duration in durations:
+        metered.append(split_logical_tie(
+            start, start + duration, inventory, maximum_dot_count
+        ))
+        start += duration
+    return metered
@@ -0,0 +1,331 @@
+"""
+flagday.composition.ringtone : RTTTL encoding straight from series data,
+without building or walking abjad notation.
+"""
+
+import argparse
+import sys
+
+from collections import Counter
+from typing import List, NamedTuple, Sequence, Tuple
+
+from flagday.composition.rows import (
+    normalize_series,
+    octave_numbers,
+    rotate_series,
+    staff_starting_octaves,
+    timepoint_intervals,
+)
+
+RTTTL_SHARP_NAMES: Tuple[str, ...] = (
+    "c", "c#", "d", "d#", "e", "f", "f#", "g", "g#", "a", "a#", "b"
+)
+RTTTL_REST: str = "p"
+RTTTL_DEFAULTS: str = "d=16,o=5"
+RTTTL_DEFAULT_DURATION: int = 16
+RTTTL_DEFAULT_OCTAVE: int = 5
+# what the RTTTL spec allows in the defaults section, and what a player
+# assumes if it's empty
+RTTTL_DURATIONS: Tuple[int, ...] = (1, 2, 4, 8, 16, 32)
+RTTTL_OCTAVES: Tuple[int, ...] = (4, 5, 6, 7)
+RTTTL_IMPLIED_DEFAULTS: Tuple[int, int, int] = (4, 6, 63)
+# make_series_notes ends every staff with an r2.
+FINAL_REST: Tuple[int, int] = (3, 4)
+TIMEPOINT_DENOMINATOR: int = 16
+parser = argparse.ArgumentParser(
+    prog="flagday.composition.ringtone",
+    description="builds flagday ringtones without building a score"
+)
+parser.add_argument("-c", "--config")
+parser.add_argument("-f", "--output-file")
+parser.add_argument(
+    "--compact", action="store_true",
+    help="pick each ringtone's d= and o= defaults to make it as short as "
+         "possible"
+)
+
+type DurationPair = Tuple[int, int]
+
+
+class RtttlNote(NamedTuple):
+    """
+    One RTTTL note (or rest, with no octave), before it's written out.
+    """
+    duration: int
+    pitch: str
+    octave: int | None
+    dotted: bool
+
+    def token(
+        self, duration: int | None = None, octave: int | None = None
+    ) -> str:
+        """
+        Write the note out, leaving out its duration and octave if they're
+        the given defaults.
+        """
+        return "".join((
+            "" if self.duration == duration else str(self.duration),
+            self.pitch,
+            "" if self.octave in (None, octave) else str(self.octave),
+            "." if self.dotted else "",
+        ))
+
+
+def canonic_parts(numerator: int) -> List[int]:
+    """
+    Split a duration numerator into assignable ("canonic") parts, smallest
+    first, the way abjad.makers.make_notes(..., increase_monotonic=True)
+    ties non-assignable durations: each run of consecutive 1 bits is a part,
+    e.g. 11 (0b1011) -> [3, 8].
+    """
+    parts = []
+    place = 1
+    run = 0
+    while numerator:
+        if numerator & 1:
+            run += place
+        elif run:
+            parts.append(run)
+            run = 0
+        numerator >>= 1
+        place <<= 1
+    if run:
+        parts.append(run)
+    return parts
+
+
+def reduce_pair(numerator: int, denominator: int) -> DurationPair:
+    while numerator % 2 == 0 and denominator % 2 == 0:
+        numerator //= 2
+        denominator //= 2
+    return numerator, denominator
+
+
+def duration_tokens(numerator: int, denominator: int) -> List[Tuple[int, int]]:
+    """
+    Map a duration to (RTTTL denomination, dot count) pairs, one per tied
+    leaf, e.g. 5/16 -> [(16, 0), (4, 0)] and 7/16 -> [(4, 2)].
+    """
+    tokens = []
+    for part in canonic_parts(numerator):
+        n, d = reduce_pair(part, denominator)
+        dots = n.bit_length() - 1
+        base, remainder = divmod(d, 1 << dots)
+        if remainder or base < 1:
+            raise ValueError(f"{part}/{denominator} has no RTTTL duration")
+        tokens.append((base, dots))
+    return tokens
+
+
+def encode_rtttl_notes(
+    pitch_classes: Sequence[int],
+    octaves: Sequence[int],
+    durations: Sequence[DurationPair],
+) -> List[str]:
+    """
+    Encode notes as RTTTL note tokens with sharp spellings and explicit
+    durations and octaves. Dotted notes keep a single dot; double-dotted
+    notes become a dotted note followed by the remaining quarter value,
+    matching rtttl_from_notes in flagday.composition.maker.
+
+    :param pitch_classes: pitch class numbers, 0-11
+    :type pitch_classes: Sequence[int]
+    :param octaves: octave numbers, e.g. 5 for c''
+    :type octaves: Sequence[int]
+    :param durations: (numerator, denominator) pairs, e.g. timepoints
+    :type durations: Sequence[DurationPair]
+    :return: RTTTL note tokens
+    :rtype: List[str]
+    """
+    return [
+        note.token()
+        for note in rtttl_notes(pitch_classes, octaves, durations)
+    ]
+
+
+def rtttl_notes(
+    pitch_classes: Sequence[int],
+    octaves: Sequence[int],
+    durations: Sequence[DurationPair],
+) -> List[RtttlNote]:
+    """
+    The notes encode_rtttl_notes writes out, as RtttlNotes.
+    """
+    notes = []
+    for pc, octave, (numerator, denominator) in zip(
+        pitch_classes, octaves, durations, strict=True
+    ):
+        notes.extend(_notes(
+            RTTTL_SHARP_NAMES[int(pc) % 12], octave, numerator, denominator
+        ))
+    return notes
+
+
+def _notes(
+    pitch: str, octave: int | None, numerator: int, denominator: int
+) -> List[RtttlNote]:
+    notes = []
+    for base, dots in duration_tokens(numerator, denominator):
+        notes.append(RtttlNote(base, pitch, octave, dots > 0))
+        if dots > 1:
+            notes.append(RtttlNote(base * 4, pitch, octave, False))
+    return notes
+
+
+def shortest_defaults(notes: Sequence[RtttlNote]) -> Tuple[int, int]:
+    """
+    The default duration and octave that make notes shortest to write: each
+    note at the default duration saves its digits (but the defaults section
+    spends them once), and each note at the default octave saves one. Ties
+    go to RTTTL_DEFAULT_DURATION and RTTTL_DEFAULT_OCTAVE.
+
+    :return: the default duration and octave
+    :rtype: Tuple[int, int]
+    """
+    durations = Counter(note.duration for note in notes)
+    octaves = Counter(
+        note.octave for note in notes if note.octave is not None
+    )
+    duration = min(RTTTL_DURATIONS, key=lambda d: (
+        len(str(d)) * (1 - durations[d]), d != RTTTL_DEFAULT_DURATION
+    ))
+    octave = min(RTTTL_OCTAVES, key=lambda o: (
+        -octaves[o], o != RTTTL_DEFAULT_OCTAVE
+    ))
+    return duration, octave
+
+
+def format_rtttl(
+    notes: Sequence[RtttlNote], bpm: int, compact: bool = False
+) -> str:
+    """
+    Write notes out as an untitled RTTTL string: with explicit durations and
+    octaves under RTTTL_DEFAULTS, or if compact, under the shortest_defaults,
+    leaving out every duration and octave equal to them (and the defaults
+    section itself, if it's what players assume anyway). The defaults
+    section stays whole otherwise, as flagday.config.device validates it.
+    """
+    if not compact:
+        tokens = ",".join(note.token() for note in notes)
+        return f"{RTTTL_DEFAULTS},b={bpm}:{tokens}"
+    duration, octave = shortest_defaults(notes)
+    tokens = ",".join(note.token(duration, octave) for note in notes)
+    if (duration, octave, bpm) == RTTTL_IMPLIED_DEFAULTS:
+        return f":{tokens}"
+    return f"d={duration},o={octave},b={bpm}:{tokens}"
+
+
+def encode_rtttl(
+    pitch_classes: Sequence[int],
+    octaves: Sequence[int],
+    durations: Sequence[DurationPair],
+    bpm: int,
+    compact: bool = False,
+) -> str:
+    """
+    Encode a staff's worth of series data as an untitled RTTTL string,
+    byte-identical to rtttl_from_notes(make_series_notes(...)), or if
+    compact, the shortest equivalent (see format_rtttl).
+
+    :return: the RTTTL string, without a title
+    :rtype: str
+    """
+    notes = rtttl_notes(pitch_classes, octaves, durations)
+    notes.extend(_notes(RTTTL_REST, None, *FINAL_REST))
+    return format_rtttl(notes, bpm, compact)
+
+
+def make_ringtones(
+    series: Sequence[int],
+    bpm: int,
+    starting_octave: int,
+    factor: int = 2,
+    staves: int = 6,
+    compact: bool = False,
+) -> List[str]:
+    """
+    Compute the titled P1..P6 ringtones that make_score_from_series produces,
+    from the rotations, octaves and Babbitt timepoints alone, without
+    importing abjad or constructing a score.
+
+    :param series: input series, e.g. a tone row
+    :type series: Sequence[int]
+    :param factor: multiplication factor for series rotation
+    :type factor: int
+    :param compact: make each ringtone as short as possible, rather than
+        byte-identical to the score's
+    :type compact: bool
+    :return: one "P{n}:..." RTTTL string per staff
+    :rtype: List[str]
+    """
+    series = normalize_series(series)
+    ringtones = []
+    for offset, octave in enumerate(
+        staff_starting_octaves(starting_octave, staves)
+    ):
+        current_series = rotate_series(series, offset * factor)
+        rtttl = encode_rtttl(
+            current_series,
+            octave_numbers(current_series, starting_octave=octave),
+            [
+                (n, TIMEPOINT_DENOMINATOR)
+                for n in timepoint_intervals(current_series)
+            ],
+            bpm,
+            compact
+        )
+        ringtones.append(f"P{offset + 1}:{rtttl}")
+    return ringtones
+
+
+def oversized_ringtones(
+    ringtones: Sequence[str],
+    max_bytes: int | None = None,
+) -> List[Tuple[str, int]]:
+    """
+    The titled ringtones too long to flash to a device.
+
+    :param max_bytes: defaults to the device config's ringtone limit
+    :type max_bytes: int | None
+    :return: (title, bytes) for each ringtone over max_bytes
+    :rtype: List[Tuple[str, int]]
+    """
+    if max_bytes is None:
+        # the device config pulls in yaml and friends, which the fast path
+        # doesn't otherwise need
+        from flagday.config.device import DEVICE_CONFIG_MAX_LENGTH
+        max_bytes = DEVICE_CONFIG_MAX_LENGTH["ringtone"]
+    oversized = []
+    for ringtone in ringtones:
+        size = len(ringtone.encode("utf-8"))
+        if size > max_bytes:
+            oversized.append((ringtone.partition(":")[0], size))
+    return oversized
+
+
+if __name__ == "__main__":
+    from flagday.config.composition import (
+        CompositionConfig, DEFAULT_COMPOSITION_CONFIG_FILE
+    )
+    from flagday.config.device import DEVICE_CONFIG_MAX_LENGTH
+    args = parser.parse_args()
+    cfg = CompositionConfig.load_from_file(
+        args.config or DEFAULT_COMPOSITION_CONFIG_FILE
+    )
+    ringtones = make_ringtones(
+        cfg.series, cfg.bpm, cfg.starting_octave, compact=args.compact
+    )
+    if args.output_file is not None:
+        with open(args.output_file, "w") as fh:
+            fh.write("\n".join(ringtones))
+            fh.write("\n")
+    else:
+        print("\n".join(ringtones))
+    oversized = oversized_ringtones(ringtones)
+    for title, size in oversized:
+        print(
+            f"{title} is {size} bytes, over the "
+            f"{DEVICE_CONFIG_MAX_LENGTH['ringtone']} byte ringtone limit",
+            file=sys.stderr
+        )
+    sys.exit(1 if oversized else 0)
@@ -0,0 +1,145 @@
+"""
+flagday.composition.rows : plain-integer tone row arithmetic behind
+flagday.composition.series, which adapts the results to abjad types.
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Timepoint:
+    """
+    A Babbitt timepoint duration, unreduced, e.g. Timepoint(10, 16).
+    """
+    numerator: int
+    denominator: int
+
+    def pair(self) -> Tuple[int, int]:
+        return self.numerator, self.denominator
+
+
+@dataclass(frozen=True, slots=True)
+class PitchOctave:
+    """
+    A pitch class placed in an octave, where octave 4 holds middle C (c').
+    """
+    pitch_class: int
+    octave: int
+
+    @property
+    def number(self) -> int:
+        """
+        The pitch number, as in abjad.NamedPitch(number): 0 is c'.
+        """
+        return self.pitch_class + 12 * (self.octave - 4)
+
+
+def normalize_series(series: Sequence[int]) -> List[int]:
+    """
+    Reduce a series to pitch class numbers 0-11, as abjad.PitchClassSegment
+    does.
+    """
+    return [int(pc) % 12 for pc in series]
+
+
+def rotate_series(series: Sequence[int], n: int = 0) -> List[int]:
+    """
+    Rotate a series to the right by n, like abjad.PitchClassSegment.rotate.
+    """
+    if not series:
+        return []
+    n %= len(series)
+    return list(series[-n:]) + list(series[:-n]) if n else list(series)
+
+
+def timepoint_intervals(series: Sequence[int]) -> List[int]:
+    """
+    The numerators of generate_babbitt_timepoint_set(series): the interval
+    from each pitch class to the next, mod the series length, where 0 means
+    a full cycle.
+    """
+    series = normalize_series(series)
+    max_interval = len(series)
+    intervals = []
+    for i, current_tp in enumerate(series):
+        interval = (series[(i + 1) % max_interval] - current_tp) % max_interval
+        intervals.append(interval or max_interval)
+    return intervals
+
+
+def babbitt_timepoints(
+    series: Sequence[int], denominator: int = 16
+) -> Tuple[Timepoint, ...]:
+    """
+    generate_babbitt_timepoint_set(series, denominator) as Timepoints.
+    """
+    return tuple(
+        Timepoint(n, denominator) for n in timepoint_intervals(series)
+    )
+
+
+def octave_numbers(
+    series: Sequence[int],
+    starting_octave: int = 4,
+    min_octave: int = 4,
+    max_octave: int = 7,
+) -> List[int]:
+    """
+    The octave numbers of generate_octave_series(series).
+    """
+    series = normalize_series(series)
+    current_octave = starting_octave
+    max_interval = len(series)
+    octaves = []
+    for i, current_pc in enumerate(series):
+        next_pc = series[(i + 1) % max_interval]
+        if next_pc >= current_pc:
+            interval = current_pc + next_pc
+        else:
+            interval = next_pc - current_pc
+        if interval >= max_interval:
+            if current_octave >= max_octave:
+                current_octave = min_octave
+            else:
+                current_octave += 1
+        elif interval < 0:
+            if current_octave <= min_octave:
+                current_octave = max_octave
+            else:
+                current_octave -= 1
+        octaves.append(current_octave)
+    return octaves
+
+
+def pitch_octave_series(
+    series: Sequence[int],
+    starting_octave: int = 4,
+    min_octave: int = 4,
+    max_octave: int = 7,
+) -> Tuple[PitchOctave, ...]:
+    """
+    generate_pitch_octave_series(series, ...) as PitchOctaves.
+    """
+    series = normalize_series(series)
+    return tuple(
+        PitchOctave(pc, octave) for pc, octave in zip(
+            series,
+            octave_numbers(series, starting_octave, min_octave, max_octave)
+        )
+    )
+
+
+def staff_starting_octaves(starting_octave: int, staves: int = 6) -> List[int]:
+    """
+    The starting octave of each staff in make_score_from_series: each staff
+    climbs by its index, wrapping back to 4 above octave 7.
+    """
+    octaves = []
+    current_octave = starting_octave
+    for i in range(staves):
+        current_octave += i
+        if current_octave > 7:
+            current_octave = 4
+        octaves.append(current_octave)
+    return octaves
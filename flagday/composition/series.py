@@ -5,8 +5,15 @@ flagday.composition.series : for operations on tone rows, time point sets, etc.
 from random import sample
 from typing import List, Sequence
 
-import abjad
-
+from flagday import lazy_import
+from flagday.composition.rows import (
+    babbitt_timepoints,
+    normalize_series,
+    octave_numbers,
+    pitch_octave_series,
+)
+
+abjad = lazy_import("abjad")
 type SeriesSeq = Sequence[int] | abjad.PitchClassSegment
 BASE_SERIES: List = list(range(12))
 
@@ -21,6 +28,20 @@ def generate_random_series() -> Sequence[int]:
     return sample(BASE_SERIES, len(BASE_SERIES))
 
 
+def pitch_class_numbers(series: SeriesSeq) -> List[int]:
+    """
+    The pitch class numbers of a series, unwrapping abjad segments, so the
+    integer functions in flagday.composition.rows can do the work.
+    """
+    if isinstance(series, abjad.PitchClassSegment):
+        return [pc.number() for pc in series.items]
+    return normalize_series(series)
+
+
+def _octave_number(octave: abjad.Octave | int) -> int:
+    return octave.number if isinstance(octave, abjad.Octave) else int(octave)
+
+
 def generate_babbitt_timepoint_set(
     series: SeriesSeq, denominator: int = 16
 ) -> List[abjad.Duration]:
@@ -30,25 +51,12 @@ def generate_babbitt_timepoint_set(
     `FDSDB_XXth_CT` PWGL module.
 
     @see https://github.com/JulienVincenot/PWGL-community-library/tree/main/User-library/FDSDB_XXth_CT # noqa: E501
+    @see flagday.composition.rows.babbitt_timepoints
     """
-    if not isinstance(series, abjad.PitchClassSegment):
-        series = abjad.PitchClassSegment(series)
-
-    max_interval: int = len(series.items)
-    timepoint_set: List[abjad.Duration] = []
-
-    for i, current_tp in enumerate(series):
-        next_tp: int = series.items[(i + 1) % max_interval].number()
-        interval = (next_tp - current_tp.number()) % max_interval
-
-        # Interval 0 represents a full cycle of series length, not duration 0.
-        # Negative intervals should be offset by the length of the series.
-        while interval <= 0:
-            interval += max_interval
-
-        timepoint_set.append(abjad.Duration(interval, denominator))
-
-    return timepoint_set
+    return [
+        abjad.Duration(*tp.pair())
+        for tp in babbitt_timepoints(pitch_class_numbers(series), denominator)
+    ]
 
 
 def generate_pitch_series(series: SeriesSeq) -> List[abjad.Pitch]:
@@ -56,66 +64,42 @@ def generate_pitch_series(series: SeriesSeq) -> List[abjad.Pitch]:
     Convenience method to generate a pitch series from a series of pitch
     classes. Not smart!
     """
-
-    if not isinstance(series, abjad.PitchClassSegment):
-        series = abjad.PitchClassSegment(series)
-
-    return [abjad.NamedPitch(pc) for pc in series.items]
+    return [abjad.NamedPitch(pc) for pc in pitch_class_numbers(series)]
 
 
 def generate_pitch_octave_series(
         series: SeriesSeq,
-        starting_octave: abjad.Octave = abjad.Octave(4),
-        min_octave: abjad.Octave = abjad.Octave(4),
-        max_octave: abjad.Octave = abjad.Octave(7),
+        starting_octave: abjad.Octave | int = 4,
+        min_octave: abjad.Octave | int = 4,
+        max_octave: abjad.Octave | int = 7,
         ) -> List[abjad.Pitch]:
-    if not isinstance(series, abjad.PitchClassSegment):
-        series = abjad.PitchClassSegment(series)
-
-    po_series = zip(
-        generate_pitch_series(series),
-        generate_octave_series(
-            series,
-            starting_octave=starting_octave,
-            min_octave=min_octave,
-            max_octave=max_octave
+    """
+    @see flagday.composition.rows.pitch_octave_series
+    """
+    return [
+        abjad.NamedPitch(po.number) for po in pitch_octave_series(
+            pitch_class_numbers(series),
+            starting_octave=_octave_number(starting_octave),
+            min_octave=_octave_number(min_octave),
+            max_octave=_octave_number(max_octave),
         )
-    )
-
-    return [abjad.NamedPitch(po) for po in po_series]  # type: ignore
+    ]
 
 
 def generate_octave_series(
     series: SeriesSeq,
-    starting_octave: abjad.Octave = abjad.Octave(4),
-    min_octave: abjad.Octave = abjad.Octave(4),
-    max_octave: abjad.Octave = abjad.Octave(7),
+    starting_octave: abjad.Octave | int = 4,
+    min_octave: abjad.Octave | int = 4,
+    max_octave: abjad.Octave | int = 7,
 ) -> List[abjad.Octave]:
-    if not isinstance(series, abjad.PitchClassSegment):
-        series = abjad.PitchClassSegment(series)
-
-    current_octave: abjad.Octave = starting_octave
-    max_interval: int = len(series.items)
-    octave_series: List[abjad.Octave] = []
-
-    for i, current_pc in enumerate(series):
-        next_pc: int = series.items[(i + 1) % len(series.items)].number()
-        if next_pc >= current_pc.number():
-            interval = current_pc.number() + next_pc
-        else:
-            interval = next_pc - current_pc.number()
-        if interval >= max_interval:
-            if current_octave.number >= max_octave.number:
-                current_octave = min_octave
-            else:
-                current_octave = abjad.Octave(current_octave.number + 1)
-        elif interval < 0:
-            if current_octave.number <= min_octave.number:
-                current_octave = max_octave
-            else:
-                current_octave = abjad.Octave(current_octave.number - 1)
-        else:
-            pass
-        octave_series.append(current_octave)
-
-    return octave_series
+    """
+    @see flagday.composition.rows.octave_numbers
+    """
+    numbers = octave_numbers(
+        pitch_class_numbers(series),
+        starting_octave=_octave_number(starting_octave),
+        min_octave=_octave_number(min_octave),
+        max_octave=_octave_number(max_octave),
+    )
+    octaves = {n: abjad.Octave(n) for n in set(numbers)}
+    return [octaves[n] for n in numbers]
@@ -0,0 +1,97 @@
+"""
+flagday.composition.watch : poll files for changes, debouncing bursts of
+saves, for the maker's --watch mode.
+"""
+
+import os
+import threading
+
+from typing import Iterable, Iterator
+
+DEFAULT_POLL_INTERVAL: float = 0.2
+DEFAULT_DEBOUNCE: float = 0.5
+
+type Snapshot = dict[str, tuple[int, int]]
+
+
+def snapshot(paths: Iterable[str]) -> Snapshot:
+    """
+    The modification time and size of each file at or under paths;
+    directories are walked, and missing paths are left out, so creating or
+    deleting a file shows up as a change.
+
+    :param paths: files and/or directories
+    :type paths: Iterable[str]
+    :return: (mtime in ns, size) by file path
+    :rtype: Snapshot
+    """
+    files: Snapshot = {}
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names
+            ]
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            try:
+                stat = os.stat(candidate)
+            except FileNotFoundError:
+                continue
+            files[candidate] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_files(before: Snapshot, after: Snapshot) -> list[str]:
+    return sorted(
+        path for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    )
+
+
+def watch_paths(
+    paths: Iterable[str],
+    interval: float = DEFAULT_POLL_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+    stop: threading.Event | None = None,
+) -> Iterator[list[str]]:
+    """
+    Poll paths for changes, yielding the changed files once they have been
+    quiet for debounce seconds, so a burst of saves (or an editor writing a
+    temporary file and renaming it) is a single change. Changes made while
+    the caller handles one are reported next time. Polling needs nothing
+    beyond the standard library and works the same on every platform; a
+    couple of stat calls per interval is negligible for a config file and a
+    stylesheet directory.
+
+    :param paths: files and/or directories to watch
+    :type paths: Iterable[str]
+    :param interval: seconds between polls
+    :type interval: float
+    :param debounce: seconds without changes to wait before yielding
+    :type debounce: float
+    :param stop: stops watching once set
+    :type stop: threading.Event | None
+    :return: the changed files, for each settled change
+    :rtype: Iterator[list[str]]
+    """
+    paths = list(paths)
+    stop = stop or threading.Event()
+    last = snapshot(paths)
+    while not stop.wait(interval):
+        settled = snapshot(paths)
+        if settled == last:
+            continue
+        changed = set(changed_files(last, settled))
+        while not stop.wait(debounce):
+            current = snapshot(paths)
+            if current == settled:
+                break
+            changed.update(changed_files(settled, current))
+            settled = current
+        else:
+            return
+        last = settled
+        yield sorted(changed)
@@ -3,21 +3,34 @@ Device configuration management tooling.
 """
 
 import argparse
-import copy
+import functools
 import os
+import sys
+import warnings
 
-from typing import Any, Iterable
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Iterable, NamedTuple
 
 import yaml
 
 from rtttl import parse_rtttl
 
+from flagday.mesh.budget import (
+    DEFAULT_EXPECTED_NODES,
+    MAX_CHANNEL_UTILIZATION,
+    POLITE_CHANNEL_UTILIZATION,
+    analyze_budget,
+    budget_problems,
+)
+from flagday.mesh.lora import DEFAULT_MESSAGES_PER_HOUR
+
 DEFAULT_BASE_CONFIG: str = os.path.join(os.getcwd(), "config", "base.yaml")
 DEVICE_CONFIG_MAX_LENGTH: dict[str, int] = {
     "owner": 40, "owner_short": 5, "ringtone": 230
 }
 INVALID_BASE_KEYS: Iterable[str] = DEVICE_CONFIG_MAX_LENGTH.keys()
 INVALID_BASE_SECURITY_KEYS: Iterable[str] = ["privateKey", "publicKey"]
+RINGTONE_CACHE_SIZE: int = 1024
 parser = argparse.ArgumentParser(
     prog="flagday.config.device",
     description="builds flagday device configs"
@@ -27,6 +40,56 @@ parser.add_argument("-o", "--owner", type=str)
 parser.add_argument("-s", "--owner-short", type=str)
 parser.add_argument("-r", "--ringtone", type=str)
 parser.add_argument("-f", "--output-file")
+parser.add_argument(
+    "-b", "--roster", help="CSV, JSONL or YAML roster for batch generation"
+)
+parser.add_argument(
+    "-d", "--output-dir", default="tmp", help="output directory for batches"
+)
+parser.add_argument("-j", "--jobs", type=int, help="batch worker processes")
+parser.add_argument(
+    "-x", "--export",
+    help="with a roster, write one binary fleet file instead of device YAML"
+)
+parser.add_argument(
+    "-n", "--expected-nodes", type=int,
+    help="check the base config's airtime budget for this many nodes"
+)
+subparsers = parser.add_subparsers(dest="command")
+merge_parser = subparsers.add_parser(
+    "merge",
+    help="deep-merge layered YAML configs (base → site → device)",
+    description="deep-merges layered YAML configs, lowest priority first. if "
+                "the last layer is a directory, each YAML file in it is "
+                "merged as a separate device overlay."
+)
+merge_parser.add_argument("layers", nargs="+")
+merge_parser.add_argument("-f", "--output-file")
+merge_parser.add_argument("-d", "--output-dir", default="tmp")
+budget_parser = subparsers.add_parser(
+    "budget",
+    help="project channel utilization for candidate configs",
+    description="projects the channel utilization of each config's periodic "
+                "broadcasts, text messages and rebroadcasts for a number of "
+                "nodes in earshot of each other, exiting non-zero if any "
+                "exceeds --max-utilization or its region's duty cycle."
+)
+budget_parser.add_argument("configs", nargs="+")
+budget_parser.add_argument(
+    "-n", "--nodes", type=int, nargs="+", default=[DEFAULT_EXPECTED_NODES]
+)
+budget_parser.add_argument(
+    "--moving", type=float, default=0, help="fraction of nodes on the move"
+)
+budget_parser.add_argument(
+    "--messages-per-hour", type=float, default=DEFAULT_MESSAGES_PER_HOUR
+)
+budget_parser.add_argument(
+    "--warn-utilization", type=float, default=POLITE_CHANNEL_UTILIZATION
+)
+budget_parser.add_argument(
+    "--max-utilization", type=float, default=MAX_CHANNEL_UTILIZATION
+)
 
 
 class InvalidDeviceConfiguration(Exception):
@@ -36,22 +99,182 @@ class InvalidDeviceConfiguration(Exception):
     pass
 
 
+class AirtimeBudgetWarning(RuntimeWarning):
+    """
+    Warns that a base config would push channel utilization past the
+    firmware's polite threshold.
+    """
+    pass
+
+
+class Ringtone(NamedTuple):
+    """
+    A parsed RTTTL ringtone: its title, and each note as a (frequency in Hz,
+    duration in ms) pair, with a frequency of 0 for rests.
+    """
+    title: str
+    notes: tuple[tuple[float, float], ...]
+
+
+_MISSING = object()
+_DELETED = object()
+
+
+class DeviceConfig(MutableMapping):
+    """
+    A copy-on-write overlay of per-device overrides on top of a shared base
+    config. Reads fall through to the base; writes (including writes to
+    nested mappings) only ever land in the overrides, so the base is never
+    copied or mutated. Mappings present in both deep-merge, like
+    `yq '. *= load(...)'`; anything else in the overrides replaces the base
+    value. Mutable leaves (lists) read from the base are shared, so assign
+    rather than mutate them in place.
+
+    Dumping a DeviceConfig with yaml serializes the merged view.
+    """
+
+    def __init__(
+        self,
+        base: Mapping[str, Any],
+        overrides: dict[str, Any] | None = None,
+        _parent: tuple[DeviceConfig, str] | None = None,
+    ) -> None:
+        self.base = base
+        self.overrides = overrides
+        self._parent = _parent
+
+    def _writable_overrides(self) -> dict[str, Any]:
+        if self.overrides is None:
+            if self._parent is None:
+                self.overrides = {}
+            else:
+                parent, key = self._parent
+                self.overrides = {}
+                parent._writable_overrides()[key] = self.overrides
+        return self.overrides
+
+    def __getitem__(self, key: str) -> Any:
+        value = _MISSING if self.overrides is None \
+            else self.overrides.get(key, _MISSING)
+        if value is _DELETED:
+            raise KeyError(key)
+        base_value = self.base.get(key, _MISSING)
+        if isinstance(base_value, Mapping) and (
+            value is _MISSING or isinstance(value, dict)
+        ):
+            if value is _MISSING:
+                return DeviceConfig(base_value, None, (self, key))
+            return DeviceConfig(base_value, value)
+        if value is not _MISSING:
+            return value
+        if base_value is _MISSING:
+            raise KeyError(key)
+        return base_value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._writable_overrides()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._writable_overrides()[key] = _DELETED
+
+    def __iter__(self) -> Iterator[str]:
+        overrides = self.overrides or {}
+        for key in self.base:
+            if overrides.get(key, _MISSING) is not _DELETED:
+                yield key
+        for key, value in overrides.items():
+            if key not in self.base and value is not _DELETED:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"DeviceConfig({self.to_dict()!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Materialize the merged view as plain nested dicts.
+        """
+        return {
+            k: v.to_dict() if isinstance(v, DeviceConfig)
+            else _mapping_to_dict(v) if isinstance(v, Mapping) else v
+            for k, v in self.items()
+        }
+
+
+def _mapping_to_dict(value: Mapping[str, Any]) -> dict[str, Any]:
+    return {
+        k: _mapping_to_dict(v) if isinstance(v, Mapping) else v
+        for k, v in value.items()
+    }
+
+
+def _represent_device_config(
+    dumper: yaml.BaseDumper, data: DeviceConfig
+) -> yaml.Node:
+    return dumper.represent_dict(data.to_dict())
+
+
+yaml.add_representer(DeviceConfig, _represent_device_config)
+yaml.add_representer(
+    DeviceConfig, _represent_device_config, Dumper=yaml.SafeDumper
+)
+
+
+def overlay_config(
+    base: Mapping[str, Any], *overlays: dict[str, Any]
+) -> DeviceConfig:
+    """
+    Layer any number of parsed YAML overlays (e.g. a device-specific file)
+    over a base config without copying it. Later overlays win.
+
+    :param base: a parsed base configuration
+    :type base: Mapping[str, Any]
+    :param overlays: parsed overlay configurations, lowest priority first
+    :type overlays: dict[str, Any]
+    :return: the layered configuration
+    :rtype: DeviceConfig
+    """
+    cfg = DeviceConfig(base)
+    for overlay in overlays:
+        cfg = DeviceConfig(cfg, overlay)
+    return cfg
+
+
 def load_base_config(filename: str = DEFAULT_BASE_CONFIG) -> dict[str, Any]:
     with open(filename, encoding="utf8") as file:
         base_config = yaml.safe_load(file)
     return base_config
 
 
-def validate_base_config(cfg: dict[str, Any]) -> bool:
+def validate_base_config(
+    cfg: dict[str, Any],
+    expected_nodes: int | None = None,
+    warn_utilization: float = POLITE_CHANNEL_UTILIZATION,
+    max_utilization: float = MAX_CHANNEL_UTILIZATION,
+) -> bool:
     """
     Gently validate a flagday Meshtastic device base config. In this case
     we are treating only the presence of INVALID_BASE_KEYS at the top level
-    and INVALID_BASE_SECURITY_KEYS under the `security` key as invalid.
+    and INVALID_BASE_SECURITY_KEYS under the `security` key as invalid. With
+    expected_nodes, the config's airtime budget is checked as well: past
+    max_utilization (or the region's duty cycle) it's invalid, and past
+    warn_utilization it warns.
 
     :param cfg: a parsed device configuration
     :type cfg: dict[str, Any]
+    :param expected_nodes: how many nodes will share the channel
+    :type expected_nodes: int | None
+    :param warn_utilization: channel utilization to warn above
+    :type warn_utilization: float
+    :param max_utilization: channel utilization to fail above
+    :type max_utilization: float
     :return: whether the configuration is valid
     :rtype: bool
+    :raises: InvalidDeviceConfiguration
     """
     rv = None
     security_keys = cfg.get("security")
@@ -69,55 +292,234 @@ def validate_base_config(cfg: dict[str, Any]) -> bool:
         )
     else:
         rv = True
+    if expected_nodes is not None:
+        status, problems = budget_problems(
+            analyze_budget(cfg, expected_nodes),
+            warn_utilization,
+            max_utilization,
+        )
+        if status == "fail":
+            raise InvalidDeviceConfiguration("; ".join(problems))
+        elif status == "warn":
+            warnings.warn("; ".join(problems), AirtimeBudgetWarning)
     return rv
 
 
 def generate_device_config(
-    base_config: dict[str, Any],
+    base_config: Mapping[str, Any],
     owner: str,
     owner_short: str,
-    ringtone: str
-) -> dict[str, Any]:
+    ringtone: str,
+    overrides: dict[str, Any] | None = None,
+    validate_base: bool = True
+) -> DeviceConfig:
     """
-    Generate a device configuration from a base config and other args.
+    Generate a device configuration from a base config and other args. The
+    result is an overlay sharing the base config rather than a copy of it.
 
     :param base_config: a parsed base configuration
-    :type base_config: dict[str, Any]
+    :type base_config: Mapping[str, Any]
     :param owner: Meshtastic device owner name
     :type owner: str
     :param owner_short: Meshtastic device owner shortname
     :type owner_short: str
     :param ringtone: Unparsed RTTTL ringtone string
     :type ringtone: str
+    :param overrides: other per-device settings to deep-merge over the base
+    :type overrides: dict[str, Any] | None
+    :param validate_base: skip this if the base was already validated, e.g.
+                          once for a whole batch
+    :type validate_base: bool
     :return: The merged device configuration
-    :rtype: dict[str, Any]
+    :rtype: DeviceConfig
     :raises: InvalidDeviceConfiguration, rtttl.InvalidDefaultsError,
              rtttl.InvalidElementError, rtttl.InvalidNoteError,
              rtttl.InvalidRTTTLFormatError
     """
-    device_config = copy.deepcopy(base_config)
-    validate_base_config(device_config)
-    for prop, max_length in DEVICE_CONFIG_MAX_LENGTH.items():
+    if validate_base:
+        validate_base_config(base_config)
+    device_config = DeviceConfig(base_config, dict(overrides or {}))
+    for prop in DEVICE_CONFIG_MAX_LENGTH:
         value = locals()[prop]
-        if len(value.encode("utf-8")) > max_length:
-            raise InvalidDeviceConfiguration(
-                f"{prop} \"{value}\" is > {max_length} bytes"
-            )
-        elif prop == "ringtone":
-            # rtttl will raise exceptions if it's invalid
-            try:
-                _ = parse_rtttl(ringtone, strict_note_syntax=True)
-            except Exception:
-                raise
-
+        validate_device_value(prop, value)
         device_config[prop] = value
 
     return device_config
 
 
+@functools.lru_cache(maxsize=RINGTONE_CACHE_SIZE)
+def parse_ringtone(value: str) -> Ringtone:
+    """
+    Parse and validate an RTTTL ringtone, strictly. Results are cached, so
+    validating a device's ringtone and then exporting it parses it once.
+
+    :raises: rtttl.InvalidDefaultsError, rtttl.InvalidElementError,
+             rtttl.InvalidNoteError, rtttl.InvalidRTTTLFormatError
+    """
+    parsed = parse_rtttl(value, strict_note_syntax=True)
+    return Ringtone(parsed["title"], tuple(
+        (note["frequency"], note["duration"]) for note in parsed["notes"]
+    ))
+
+
+def validate_device_value(prop: str, value: str) -> Ringtone | None:
+    """
+    Check a device-specific value against DEVICE_CONFIG_MAX_LENGTH and, for
+    ringtones, the RTTTL spec.
+
+    :return: the parsed ringtone, for ringtones
+    :rtype: Ringtone | None
+    :raises: InvalidDeviceConfiguration, rtttl.InvalidDefaultsError,
+             rtttl.InvalidElementError, rtttl.InvalidNoteError,
+             rtttl.InvalidRTTTLFormatError
+    """
+    max_length = DEVICE_CONFIG_MAX_LENGTH[prop]
+    if len(value.encode("utf-8")) > max_length:
+        raise InvalidDeviceConfiguration(
+            f"{prop} \"{value}\" is > {max_length} bytes"
+        )
+    elif prop == "ringtone":
+        # rtttl will raise exceptions if it's invalid
+        return parse_ringtone(value)
+    return None
+
+
+def merge_configs(
+    base_config: Mapping[str, Any], *layers: dict[str, Any]
+) -> DeviceConfig:
+    """
+    Deep-merge layered configs in-process, e.g. base → site → device. The
+    base layer must be a valid base config, and any device-specific values
+    in the final merged config must fit DEVICE_CONFIG_MAX_LENGTH.
+
+    :param base_config: a parsed base configuration
+    :type base_config: Mapping[str, Any]
+    :param layers: parsed overlays, lowest priority first
+    :type layers: dict[str, Any]
+    :return: The merged configuration
+    :rtype: DeviceConfig
+    :raises: InvalidDeviceConfiguration, rtttl.InvalidDefaultsError,
+             rtttl.InvalidElementError, rtttl.InvalidNoteError,
+             rtttl.InvalidRTTTLFormatError
+    """
+    validate_base_config(base_config)
+    cfg = overlay_config(base_config, *(layer or {} for layer in layers))
+    for prop in DEVICE_CONFIG_MAX_LENGTH:
+        if prop in cfg:
+            validate_device_value(prop, str(cfg[prop]))
+    return cfg
+
+
+def merge_device_overlays(
+    base_config: Mapping[str, Any],
+    layers: list[dict[str, Any]],
+    device_dir: str,
+    output_dir: str,
+) -> dict[str, str | None]:
+    """
+    Merge every YAML device overlay in a directory over the same (shared)
+    base and site layers, writing one merged config per device.
+
+    :return: a mapping of overlay filename to error message, or None if the
+             merged config was written
+    :rtype: dict[str, str | None]
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results: dict[str, str | None] = {}
+    for entry in sorted(os.scandir(device_dir), key=lambda e: e.name):
+        if not entry.name.endswith((".yaml", ".yml")):
+            continue
+        try:
+            cfg = merge_configs(
+                base_config, *layers, load_base_config(entry.path)
+            )
+            with open(os.path.join(output_dir, entry.name), "w") as of:
+                yaml.dump(cfg, of)
+        except Exception as e:
+            results[entry.name] = f"{type(e).__name__}: {e}"
+        else:
+            results[entry.name] = None
+    return results
+
+
 if __name__ == "__main__":
     args = parser.parse_args()
+    if args.command == "budget":
+        failed = False
+        print(
+            f"{'config':32} {'nodes':>6} {'hops':>4} {'pos/h':>6} "
+            f"{'ms/pos':>7} {'chan %':>7} {'tx %':>6}  status"
+        )
+        for config_file in args.configs:
+            cfg = load_base_config(config_file)
+            for nodes in args.nodes:
+                budget = analyze_budget(
+                    cfg, nodes, args.moving, args.messages_per_hour
+                )
+                status, problems = budget_problems(
+                    budget, args.warn_utilization, args.max_utilization
+                )
+                failed = failed or status == "fail"
+                print(
+                    f"{config_file:32} {nodes:6} {budget.hop_limit:4} "
+                    f"{budget.packets_per_hour['position']:6.1f} "
+                    f"{budget.airtime['position'] * 1000:7.1f} "
+                    f"{budget.channel_utilization * 100:7.1f} "
+                    f"{budget.tx_utilization * 100:6.2f}  {status}"
+                )
+                for problem in problems:
+                    print(f"  {problem}", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+    if args.command == "merge":
+        *layer_files, last = args.layers
+        if not os.path.isdir(last):
+            layer_files.append(last)
+        if not layer_files:
+            merge_parser.error("a base config layer is required")
+        base_config, *layers = [load_base_config(f) for f in layer_files]
+        if os.path.isdir(last):
+            results = merge_device_overlays(
+                base_config, layers, last, args.output_dir
+            )
+            for name, error in results.items():
+                if error is not None:
+                    print(f"{name}: {error}", file=sys.stderr)
+            sys.exit(1 if any(results.values()) else 0)
+        device_config = merge_configs(base_config, *layers)
+        if args.output_file is not None:
+            with open(args.output_file, 'w') as of:
+                yaml.dump(device_config, of)
+        else:
+            print(yaml.dump(device_config))
+        sys.exit(0)
     base_config = load_base_config(args.config)
+    if args.expected_nodes is not None:
+        validate_base_config(base_config, args.expected_nodes)
+    if args.export is not None and args.roster is None:
+        parser.error("--export requires a roster")
+    if args.roster is not None:
+        from flagday.config.fleet import generate_fleet_configs, load_roster
+        if args.export is not None:
+            from flagday.config.export import export_fleet
+            results = export_fleet(
+                base_config, load_roster(args.roster), args.export,
+                jobs=args.jobs
+            )
+        else:
+            results = generate_fleet_configs(
+                base_config,
+                load_roster(args.roster),
+                args.output_dir,
+                jobs=args.jobs
+            )
+        failures = [r for r in results if r.error is not None]
+        for r in failures:
+            print(f"{r.index}: {r.owner_short}: {r.error}", file=sys.stderr)
+        print(
+            f"{len(results) - len(failures)} written, {len(failures)} failed",
+            file=sys.stderr
+        )
+        sys.exit(1 if failures else 0)
     device_config = generate_device_config(
         base_config,
         owner=args.owner,
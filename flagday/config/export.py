@@ -0,0 +1,215 @@
+"""
+Binary fleet export: every device config and its parsed ringtone, validated
+once and packed into a single file that provisioning tools can stream to
+devices without parsing YAML or RTTTL again.
+
+A fleet file is a header (FLEET_HEADER: magic, version, device count and the
+length of the base config), the shared base config as compact JSON, then one
+record per device (DEVICE_HEADER: the lengths of its overrides, ringtone and
+notes), holding the device's overrides over the base as compact JSON, its
+RTTTL string and its notes as NOTE_FORMAT (frequency in Hz, duration in ms)
+pairs. JSON keys are Meshtastic's camelCase protobuf field names, so each
+section can go straight to google.protobuf.json_format.ParseDict.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Iterator, NamedTuple
+
+from flagday.config import fleet
+from flagday.config.device import (
+    DeviceConfig,
+    parse_ringtone,
+    validate_base_config,
+)
+from flagday.config.fleet import DeviceResult
+
+FLEET_MAGIC: bytes = b"FDFL"
+FLEET_VERSION: int = 1
+FLEET_HEADER: struct.Struct = struct.Struct("<4sBxII")
+DEVICE_HEADER: struct.Struct = struct.Struct("<IHH")
+# the firmware plays integer frequencies and durations, so nothing is lost
+NOTE_FORMAT: struct.Struct = struct.Struct("<HH")
+parser = argparse.ArgumentParser(
+    prog="flagday.config.export",
+    description="prints the devices in a flagday fleet file as JSON lines"
+)
+parser.add_argument("fleet_file")
+
+
+class InvalidFleetFile(Exception):
+    """
+    Raised when a fleet file is truncated or not a fleet file at all.
+    """
+    pass
+
+
+class FleetDevice(NamedTuple):
+    """
+    A device read back from a fleet file. config is the full device config
+    (ringtone included) as an overlay on the fleet's shared base config.
+    """
+    owner_short: str
+    config: DeviceConfig
+    ringtone: str
+    notes: tuple[tuple[int, int], ...]
+
+
+def _dump_json(value: Any) -> bytes:
+    return json.dumps(
+        value, separators=(",", ":"), sort_keys=True, ensure_ascii=False
+    ).encode("utf-8")
+
+
+def encode_device(device_config: DeviceConfig) -> bytes:
+    """
+    Pack a device config generated over a fleet's base config into a fleet
+    file record. Its ringtone has already been validated, so parsing it
+    again only hits parse_ringtone's cache.
+
+    :param device_config: e.g. from generate_device_config
+    :type device_config: DeviceConfig
+    :return: the device's record
+    :rtype: bytes
+    """
+    overrides = DeviceConfig({}, device_config.overrides).to_dict()
+    ringtone = overrides.pop("ringtone")
+    notes = b"".join(
+        NOTE_FORMAT.pack(round(frequency), round(duration))
+        for frequency, duration in parse_ringtone(ringtone).notes
+    )
+    config = _dump_json(overrides)
+    encoded_ringtone = ringtone.encode("utf-8")
+    return b"".join([
+        DEVICE_HEADER.pack(
+            len(config), len(encoded_ringtone), len(notes) // NOTE_FORMAT.size
+        ),
+        config,
+        encoded_ringtone,
+        notes,
+    ])
+
+
+def _export_device(
+    index: int, entry: dict[str, Any], path: str
+) -> tuple[DeviceResult, bytes | None]:
+    owner_short = str(entry.get("owner_short"))
+    try:
+        record = encode_device(fleet.build_worker_device(entry))
+    except Exception as e:
+        return DeviceResult(
+            index, owner_short, None, f"{type(e).__name__}: {e}"
+        ), None
+    return DeviceResult(index, owner_short, path, None), record
+
+
+def export_fleet(
+    base_config: dict[str, Any],
+    roster: list[dict[str, Any]],
+    path: str,
+    jobs: int | None = None,
+) -> list[DeviceResult]:
+    """
+    Generate every roster entry's device config, like generate_fleet_configs,
+    and write the valid ones to a single fleet file. Devices that fail are
+    left out of the file and reported in the results.
+
+    :param base_config: a parsed base configuration
+    :type base_config: dict[str, Any]
+    :param roster: roster entries, e.g. from load_roster
+    :type roster: list[dict[str, Any]]
+    :param path: the fleet file to write
+    :type path: str
+    :param jobs: number of worker processes; defaults to os.cpu_count()
+    :type jobs: int | None
+    :return: one result per roster entry, in roster order
+    :rtype: list[DeviceResult]
+    :raises: InvalidDeviceConfiguration
+    """
+    validate_base_config(base_config)
+    if jobs == 1:
+        fleet.init_worker(base_config)
+        exported = [
+            _export_device(i, entry, path) for i, entry in enumerate(roster)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=fleet.init_worker,
+            initargs=(base_config,)
+        ) as pool:
+            futures = [
+                pool.submit(_export_device, i, entry, path)
+                for i, entry in enumerate(roster)
+            ]
+            exported = [f.result() for f in futures]
+    records = [record for _, record in exported if record is not None]
+    base = _dump_json(base_config)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(FLEET_HEADER.pack(
+            FLEET_MAGIC, FLEET_VERSION, len(records), len(base)
+        ))
+        fh.write(base)
+        fh.writelines(records)
+    return [result for result, _ in exported]
+
+
+def _read_exactly(fh: BinaryIO, size: int) -> bytes:
+    data = fh.read(size)
+    if len(data) != size:
+        raise InvalidFleetFile("fleet file is truncated")
+    return data
+
+
+def iter_fleet(fh: BinaryIO) -> Iterator[FleetDevice]:
+    """
+    Read the devices in a fleet file one at a time, without validating them
+    again.
+
+    :param fh: a fleet file opened for binary reading
+    :type fh: BinaryIO
+    :return: the devices, in roster order
+    :rtype: Iterator[FleetDevice]
+    :raises: InvalidFleetFile
+    """
+    magic, version, count, base_length = FLEET_HEADER.unpack(
+        _read_exactly(fh, FLEET_HEADER.size)
+    )
+    if magic != FLEET_MAGIC:
+        raise InvalidFleetFile("not a flagday fleet file")
+    if version != FLEET_VERSION:
+        raise InvalidFleetFile(f"unsupported fleet file version {version}")
+    base = json.loads(_read_exactly(fh, base_length))
+    for _ in range(count):
+        config_length, ringtone_length, note_count = DEVICE_HEADER.unpack(
+            _read_exactly(fh, DEVICE_HEADER.size)
+        )
+        config = DeviceConfig(
+            base, json.loads(_read_exactly(fh, config_length))
+        )
+        ringtone = _read_exactly(fh, ringtone_length).decode("utf-8")
+        config["ringtone"] = ringtone
+        notes = tuple(NOTE_FORMAT.iter_unpack(
+            _read_exactly(fh, note_count * NOTE_FORMAT.size)
+        ))
+        yield FleetDevice(config["owner_short"], config, ringtone, notes)
+
+
+def read_fleet(path: str) -> list[FleetDevice]:
+    with open(path, "rb") as fh:
+        return list(iter_fleet(fh))
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    with open(args.fleet_file, "rb") as fh:
+        for device in iter_fleet(fh):
+            sys.stdout.write(json.dumps(
+                device.config.to_dict(), ensure_ascii=False
+            ) + "\n")
@@ -0,0 +1,209 @@
+"""
+Fleet (batch) device configuration tooling.
+"""
+
+import csv
+import json
+import os
+
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+import yaml
+
+from flagday.config.device import (
+    generate_device_config,
+    validate_base_config,
+)
+
+ROSTER_DEVICE_KEYS: Iterable[str] = ["owner", "owner_short", "ringtone"]
+ROSTER_FILE_KEY: str = "file"
+
+# set once per worker process by init_worker so the parsed base config is
+# only pickled once per worker rather than once per device
+_worker_base_config: dict[str, Any] = {}
+
+
+class DeviceResult(NamedTuple):
+    """
+    The outcome of generating a single device config in a batch.
+    """
+    index: int
+    owner_short: str
+    path: str | None
+    error: str | None
+
+
+def _csv_value(value: str) -> Any:
+    """
+    A CSV override cell as the YAML scalar it spells, e.g. 3 or true, so it
+    means the same as in a YAML or JSONL roster; anything YAML can't parse
+    stays a string.
+    """
+    try:
+        return yaml.safe_load(value)
+    except yaml.YAMLError:
+        return value
+
+
+def load_roster(filename: str) -> list[dict[str, Any]]:
+    """
+    Load a device roster from a CSV, JSONL or YAML file. Each entry needs an
+    owner, owner_short and ringtone; any other key (other than `file`) is a
+    per-device override, with dots for nested keys, e.g.
+    `config.security.privateKey`. CSV overrides are read as YAML scalars, as
+    the cells are all strings, and blank ones (or missing, in a short row)
+    are left out, so the base config's value stays; owner, owner_short,
+    ringtone and file are left as they are.
+
+    :param filename: path to a .csv, .jsonl or .yaml/.yml roster
+    :type filename: str
+    :return: the roster entries
+    :rtype: list[dict[str, Any]]
+    """
+    suffix = Path(filename).suffix.lower()
+    with open(filename, encoding="utf8", newline="") as file:
+        match suffix:
+            case ".csv":
+                roster = [
+                    {
+                        key: value
+                        if key in ROSTER_DEVICE_KEYS or key == ROSTER_FILE_KEY
+                        else _csv_value(value)
+                        for key, value in row.items()
+                        if value or key in ROSTER_DEVICE_KEYS
+                    }
+                    for row in csv.DictReader(file)
+                ]
+            case ".jsonl":
+                roster = [json.loads(line) for line in file if line.strip()]
+            case ".yaml" | ".yml":
+                roster = yaml.safe_load(file) or []
+            case _:
+                raise ValueError(f"unsupported roster format: {filename}")
+    if not isinstance(roster, list):
+        raise ValueError(f"roster {filename} is not a list of devices")
+    return roster
+
+
+def apply_overrides(
+    device_config: MutableMapping[str, Any], overrides: dict[str, Any]
+) -> MutableMapping[str, Any]:
+    """
+    Set dotted-path overrides (e.g. `config.security.privateKey`) on a
+    device config, creating intermediate mappings as needed.
+    """
+    for path, value in overrides.items():
+        *parents, key = path.split(".")
+        node = device_config
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return device_config
+
+
+def device_output_path(entry: dict[str, Any], output_dir: str) -> str:
+    filename = entry.get(ROSTER_FILE_KEY) or \
+        f"device_{entry.get('owner_short')}.yaml"
+    return os.path.join(output_dir, filename)
+
+
+def build_device_config(
+    base_config: dict[str, Any], entry: dict[str, Any]
+) -> MutableMapping[str, Any]:
+    """
+    Generate a roster entry's device config, with its overrides applied,
+    from an already validated base config.
+
+    :raises: InvalidDeviceConfiguration, KeyError, rtttl.InvalidDefaultsError,
+             rtttl.InvalidElementError, rtttl.InvalidNoteError,
+             rtttl.InvalidRTTTLFormatError
+    """
+    device_config = generate_device_config(
+        base_config,
+        owner=entry["owner"],
+        owner_short=entry["owner_short"],
+        ringtone=entry["ringtone"],
+        validate_base=False,
+    )
+    return apply_overrides(device_config, {
+        k: v for k, v in entry.items()
+        if k not in ROSTER_DEVICE_KEYS and k != ROSTER_FILE_KEY
+    })
+
+
+def init_worker(base_config: dict[str, Any]) -> None:
+    """
+    Set the base config build_worker_device builds from, as a process pool
+    initializer (or directly, when building in this process).
+    """
+    global _worker_base_config
+    _worker_base_config = base_config
+
+
+def build_worker_device(entry: dict[str, Any]) -> MutableMapping[str, Any]:
+    """
+    build_device_config, from the base config init_worker set.
+
+    :raises: InvalidDeviceConfiguration, KeyError, rtttl.InvalidDefaultsError,
+             rtttl.InvalidElementError, rtttl.InvalidNoteError,
+             rtttl.InvalidRTTTLFormatError
+    """
+    return build_device_config(_worker_base_config, entry)
+
+
+def _build_device(
+    index: int, entry: dict[str, Any], output_dir: str
+) -> DeviceResult:
+    owner_short = str(entry.get("owner_short"))
+    try:
+        device_config = build_worker_device(entry)
+        path = device_output_path(entry, output_dir)
+        with open(path, "w") as of:
+            yaml.dump(device_config, of)
+    except Exception as e:
+        return DeviceResult(index, owner_short, None, f"{type(e).__name__}: {e}")
+    return DeviceResult(index, owner_short, path, None)
+
+
+def generate_fleet_configs(
+    base_config: dict[str, Any],
+    roster: list[dict[str, Any]],
+    output_dir: str,
+    jobs: int | None = None,
+) -> list[DeviceResult]:
+    """
+    Generate and write a device config for every roster entry using a process
+    pool. The base config is validated once up front; failures for individual
+    devices are reported in the results rather than stopping the batch.
+
+    :param base_config: a parsed base configuration
+    :type base_config: dict[str, Any]
+    :param roster: roster entries, e.g. from load_roster
+    :type roster: list[dict[str, Any]]
+    :param output_dir: directory to write device YAML files into
+    :type output_dir: str
+    :param jobs: number of worker processes; defaults to os.cpu_count()
+    :type jobs: int | None
+    :return: one result per roster entry, in roster order
+    :rtype: list[DeviceResult]
+    :raises: InvalidDeviceConfiguration
+    """
+    validate_base_config(base_config)
+    os.makedirs(output_dir, exist_ok=True)
+    if jobs == 1:
+        init_worker(base_config)
+        return [
+            _build_device(i, entry, output_dir)
+            for i, entry in enumerate(roster)
+        ]
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(base_config,)
+    ) as pool:
+        futures = [
+            pool.submit(_build_device, i, entry, output_dir)
+            for i, entry in enumerate(roster)
+        ]
+        return [f.result() for f in futures]
@@ -0,0 +1,245 @@
+"""
+Delta config pushes: diff a device's current config (from `meshtastic
+--export-config`) against its target config and plan the fewest writes to
+get there, with every settings write in one transaction so the device
+reboots at most once.
+"""
+
+import argparse
+import subprocess
+import sys
+
+from collections.abc import Mapping
+from typing import Any, Iterator, NamedTuple
+
+import yaml
+
+from flagday.config.device import load_base_config
+
+SETTINGS_SECTIONS: list[str] = ["config", "module_config"]
+# everything else --configure sets has its own flag, none of which reboot
+DEVICE_FLAGS: dict[str, str] = {
+    "owner": "--set-owner",
+    "owner_short": "--set-owner-short",
+    "ringtone": "--set-ringtone",
+    "canned_messages": "--set-canned-message",
+    "channel_url": "--seturl",
+    "location.lat": "--setlat",
+    "location.lon": "--setlon",
+    "location.alt": "--setalt",
+}
+# export-config writes channel_url in camelCase when the CLI is in camelCase
+CURRENT_KEY_ALIASES: dict[str, str] = {"channel_url": "channelUrl"}
+parser = argparse.ArgumentParser(
+    prog="flagday.config.plan",
+    description="plans (and applies) the changes a device needs to match a "
+                "target config"
+)
+parser.add_argument("target", help="target device YAML")
+parser.add_argument(
+    "-e", "--current",
+    help="the device's current config, from meshtastic --export-config; "
+         "by default, exported from --port"
+)
+parser.add_argument("-p", "--port")
+parser.add_argument(
+    "--apply", action="store_true",
+    help="apply the plan to the device on --port, rather than a dry run"
+)
+
+_MISSING = object()
+
+
+class Change(NamedTuple):
+    """
+    A setting (a dotted path) to change; current is None if it's unset.
+    """
+    path: str
+    current: Any
+    target: Any
+
+
+class PlanStep(NamedTuple):
+    """
+    Changes written together with one set of meshtastic CLI arguments;
+    settings steps write config/module_config sections, which reboots the
+    device.
+    """
+    changes: list[Change]
+    args: list[str]
+    reboots: bool
+
+
+def iter_settings(
+    cfg: Mapping[str, Any], prefix: str = ""
+) -> Iterator[tuple[str, Any]]:
+    """
+    Every leaf setting in a config, as a dotted path and its value.
+    """
+    for key, value in cfg.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, Mapping):
+            yield from iter_settings(value, f"{path}.")
+        else:
+            yield path, value
+
+
+def _lookup(cfg: Mapping[str, Any], path: str) -> Any:
+    *parents, key = path.split(".")
+    node: Any = cfg
+    for parent in parents:
+        node = node.get(parent, {}) if isinstance(node, Mapping) else {}
+    if not isinstance(node, Mapping):
+        return _MISSING
+    if key not in node and path in CURRENT_KEY_ALIASES:
+        key = CURRENT_KEY_ALIASES[path]
+    return node.get(key, _MISSING)
+
+
+def _same(current: Any, target: Any) -> bool:
+    if current is _MISSING:
+        # export-config leaves out settings at their protobuf defaults
+        return target in (0, False, "")
+    if isinstance(target, str) and not isinstance(current, str):
+        current, target = target, current
+    if isinstance(current, str) and not isinstance(target, str):
+        # and writes 64 bit integers as strings, and booleans may be spelt
+        # out; any other string has to match exactly
+        if isinstance(target, bool):
+            return current == str(target).lower()
+        if isinstance(target, int):
+            return current == str(target)
+    return current == target
+
+
+def diff_configs(
+    current: Mapping[str, Any], target: Mapping[str, Any]
+) -> list[Change]:
+    """
+    The settings in target that differ from current. Settings target
+    doesn't mention are left alone, as --configure would leave them.
+
+    :param current: the device's config, e.g. from --export-config
+    :type current: Mapping[str, Any]
+    :param target: e.g. from generate_device_config
+    :type target: Mapping[str, Any]
+    :return: the changes, in target's order
+    :rtype: list[Change]
+    """
+    changes = []
+    for path, value in iter_settings(target):
+        current_value = _lookup(current, path)
+        if not _same(current_value, value):
+            changes.append(Change(
+                path, None if current_value is _MISSING else current_value,
+                value
+            ))
+    return changes
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def plan_changes(
+    current: Mapping[str, Any], target: Mapping[str, Any]
+) -> list[PlanStep]:
+    """
+    Plan the writes to bring a device from current to target: first each
+    changed owner, ringtone, canned message, channel URL or location with
+    its own flag, then every changed config and module config setting with
+    --set in one settings step. The meshtastic CLI writes the sections those
+    touch in a single transaction, so the device reboots once, and only if
+    its settings changed.
+
+    :param current: the device's config, e.g. from --export-config
+    :type current: Mapping[str, Any]
+    :param target: e.g. from generate_device_config
+    :type target: Mapping[str, Any]
+    :return: the steps, in order; empty if the device is up to date
+    :rtype: list[PlanStep]
+    :raises: ValueError
+    """
+    steps, settings = [], []
+    for change in diff_configs(current, target):
+        section = change.path.partition(".")[0]
+        if section in SETTINGS_SECTIONS:
+            settings.append(change)
+        elif change.path in DEVICE_FLAGS:
+            steps.append(PlanStep([change], [
+                DEVICE_FLAGS[change.path], _format_value(change.target)
+            ], False))
+        else:
+            raise ValueError(f"don't know how to set {change.path}")
+    if settings:
+        args = []
+        for change in settings:
+            # --set takes the setting without config./module_config.
+            args += [
+                "--set",
+                change.path.partition(".")[2],
+                _format_value(change.target),
+            ]
+        steps.append(PlanStep(settings, args, True))
+    return steps
+
+
+def plan_args(steps: list[PlanStep]) -> list[str]:
+    """
+    The meshtastic CLI arguments applying a plan in one invocation.
+    """
+    return [arg for step in steps for arg in step.args]
+
+
+def format_plan(steps: list[PlanStep], target: Mapping[str, Any]) -> str:
+    """
+    A dry run report of a plan: each change, and how much of the target
+    config it writes.
+    """
+    total = sum(1 for _ in iter_settings(target))
+    changes = sum(len(step.changes) for step in steps)
+    reboots = sum(step.reboots for step in steps)
+    lines = [
+        f"{changes} of {total} settings change, "
+        f"{reboots} reboot{'' if reboots == 1 else 's'}"
+    ]
+    for step in steps:
+        if step.reboots:
+            lines.append("settings (one transaction, then reboot):")
+        for change in step.changes:
+            lines.append(
+                f"  {change.path}: {change.current!r} -> {change.target!r}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _meshtastic(port: str, *args: str) -> str:
+    process = subprocess.run(
+        [sys.executable, "-m", "meshtastic", "--port", port, *args],
+        stdout=subprocess.PIPE,
+        # kept apart, so nothing it logs ends up in the exported YAML
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        sys.stderr.write(process.stdout + process.stderr)
+        sys.exit(process.returncode)
+    return process.stdout
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.current is None and args.port is None or \
+            args.apply and args.port is None:
+        parser.error("--port is required to export or apply")
+    target = load_base_config(args.target)
+    if args.current is not None:
+        current = load_base_config(args.current)
+    else:
+        current = yaml.safe_load(_meshtastic(args.port, "--export-config"))
+    steps = plan_changes(current or {}, target)
+    sys.stdout.write(format_plan(steps, target))
+    if args.apply and steps:
+        sys.stdout.write(_meshtastic(args.port, *plan_args(steps)))
@@ -0,0 +1,438 @@
+"""
+Concurrent device provisioning: push generated device configs and channel
+settings to every attached device at once, with per-device timeouts and
+retries, rather than running `meshtastic --configure` one port at a time.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from collections.abc import Callable, Sequence
+from typing import NamedTuple, Protocol
+
+import yaml
+
+from flagday.config.device import load_base_config
+from flagday.config.export import iter_fleet
+from flagday.config.plan import plan_args, plan_changes
+
+DEFAULT_CONCURRENCY: int = 8
+DEFAULT_RETRIES: int = 2
+DEFAULT_TIMEOUT: float = 120
+DEFAULT_RETRY_DELAY: float = 2
+DEFAULT_CHANNEL_INDEX: int = 0
+CHANNEL_PSK_ENV: str = "SHARED_KEY"
+parser = argparse.ArgumentParser(
+    prog="flagday.config.provision",
+    description="provisions flagday devices concurrently"
+)
+parser.add_argument(
+    "configs", nargs="*",
+    help="device YAML files, e.g. from flagday.config.device -b"
+)
+parser.add_argument(
+    "-f", "--fleet",
+    help="a fleet file, from flagday.config.device -b -x, to provision "
+         "instead of YAML files"
+)
+parser.add_argument(
+    "-p", "--port", action="append", dest="ports",
+    help="a serial port to provision, in the same order as the configs; by "
+         "default, every attached Meshtastic device"
+)
+parser.add_argument("--ch-index", type=int, default=DEFAULT_CHANNEL_INDEX)
+parser.add_argument("--ch-name", help="channel name to set, e.g. #public")
+parser.add_argument(
+    "--ch-psk", default=os.environ.get(CHANNEL_PSK_ENV),
+    help=f"channel PSK to set; defaults to ${CHANNEL_PSK_ENV}"
+)
+parser.add_argument(
+    "-j", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+    help="devices to provision at once"
+)
+parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+parser.add_argument(
+    "--timeout", type=float, default=DEFAULT_TIMEOUT,
+    help="seconds per attempt"
+)
+parser.add_argument(
+    "--fake", action="store_true",
+    help="provision fake devices, without touching any hardware"
+)
+parser.add_argument(
+    "--delta", action="store_true",
+    help="export each device's config and only push the settings that "
+         "differ, instead of the whole config"
+)
+
+
+class ProvisioningError(RuntimeError):
+    """
+    Raised when the meshtastic CLI fails; carries its output.
+    """
+    pass
+
+
+class ProvisionJob(NamedTuple):
+    """
+    A device config to push to the device on port, plus channel settings
+    (e.g. name and psk) for channel_index.
+    """
+    port: str
+    config_file: str
+    channel_index: int = DEFAULT_CHANNEL_INDEX
+    channel_settings: tuple[tuple[str, str], ...] = ()
+
+
+class ProvisionResult(NamedTuple):
+    """
+    The outcome of provisioning one device, after attempts tries.
+    """
+    job: ProvisionJob
+    attempts: int
+    elapsed: float
+    error: str | None
+
+
+class Radio(Protocol):
+    """
+    What provisioning needs from a connection to devices.
+    """
+
+    async def configure(self, port: str, config_file: str) -> None:
+        ...
+
+    async def set_channel(
+        self, port: str, index: int, settings: Sequence[tuple[str, str]]
+    ) -> None:
+        ...
+
+    async def export_config(self, port: str) -> str:
+        ...
+
+    async def apply(self, port: str, args: Sequence[str]) -> None:
+        ...
+
+
+class MeshtasticCLI:
+    """
+    Provisions devices by running the meshtastic CLI, as the README does by
+    hand, one subprocess per step.
+    """
+
+    def __init__(self, command: Sequence[str] | None = None) -> None:
+        self.command = list(command or [sys.executable, "-m", "meshtastic"])
+
+    async def _run(self, port: str, *args: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            *self.command, "--port", port, *args,
+            stdout=asyncio.subprocess.PIPE,
+            # kept apart, so nothing it logs ends up in the exported YAML
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            output, errors = await process.communicate()
+        except asyncio.CancelledError:
+            # timed out; don't leave it holding the port
+            process.kill()
+            await process.wait()
+            raise
+        log = output.decode(errors="ignore")
+        if process.returncode != 0:
+            raise ProvisioningError(log + errors.decode(errors="ignore"))
+        return log
+
+    async def configure(self, port: str, config_file: str) -> None:
+        await self._run(port, "--configure", config_file)
+
+    async def set_channel(
+        self, port: str, index: int, settings: Sequence[tuple[str, str]]
+    ) -> None:
+        args = ["--ch-index", str(index)]
+        for name, value in settings:
+            args += ["--ch-set", name, value]
+        await self._run(port, *args)
+
+    async def export_config(self, port: str) -> str:
+        return await self._run(port, "--export-config")
+
+    async def apply(self, port: str, args: Sequence[str]) -> None:
+        await self._run(port, *args)
+
+
+class FakeRadio:
+    """
+    A stand-in for MeshtasticCLI, for testing without hardware: each call
+    takes delay seconds and is recorded in calls. A port in failures fails
+    that many calls before succeeding; a port in hangs never answers.
+    export_config returns the port's YAML in exported, or an empty config.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0,
+        failures: dict[str, int] | None = None,
+        hangs: set[str] | None = None,
+        exported: dict[str, str] | None = None,
+    ) -> None:
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.hangs = set(hangs or ())
+        self.exported = dict(exported or {})
+        self.calls: list[tuple[str, ...]] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def _call(self, port: str, *call: str) -> None:
+        self.calls.append((port, *call))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if port in self.hangs:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delay)
+            if self.failures.get(port, 0) > 0:
+                self.failures[port] -= 1
+                raise ProvisioningError(f"{port}: no response from device")
+        finally:
+            self.active -= 1
+
+    async def configure(self, port: str, config_file: str) -> None:
+        await self._call(port, "configure", config_file)
+
+    async def set_channel(
+        self, port: str, index: int, settings: Sequence[tuple[str, str]]
+    ) -> None:
+        await self._call(port, "set_channel", str(index), *(
+            f"{name}={value}" for name, value in settings
+        ))
+
+    async def export_config(self, port: str) -> str:
+        await self._call(port, "export_config")
+        return self.exported.get(port, "{}")
+
+    async def apply(self, port: str, args: Sequence[str]) -> None:
+        await self._call(port, "apply", *args)
+
+
+def discover_ports() -> list[str]:
+    """
+    The serial ports of attached Meshtastic devices, as the meshtastic CLI
+    finds them.
+    """
+    # pulls in the meshtastic package (protobufs, pyserial, etc.), so only
+    # import it when actually looking for devices
+    from meshtastic.util import findPorts
+
+    return sorted(findPorts(eliminate_duplicates=True))
+
+
+def assign_jobs(
+    ports: Sequence[str],
+    config_files: Sequence[str],
+    channel_index: int = DEFAULT_CHANNEL_INDEX,
+    channel_settings: Sequence[tuple[str, str]] = (),
+) -> list[ProvisionJob]:
+    """
+    Pair ports with config files in order.
+
+    :raises: ValueError
+    """
+    if len(ports) != len(config_files):
+        raise ValueError(
+            f"{len(config_files)} configs for {len(ports)} devices"
+        )
+    return [
+        ProvisionJob(port, config_file, channel_index, tuple(channel_settings))
+        for port, config_file in zip(ports, config_files)
+    ]
+
+
+def write_fleet_configs(fleet_file: str, output_dir: str) -> list[str]:
+    """
+    Write each device in a fleet file to its own YAML file, for --configure,
+    without validating it again. The files are named after each device's
+    place in the roster as well as its owner_short, which needn't be unique.
+
+    :param fleet_file: e.g. from flagday.config.export.export_fleet
+    :type fleet_file: str
+    :param output_dir: where to write the YAML files
+    :type output_dir: str
+    :return: the files, in roster order
+    :rtype: list[str]
+    :raises: InvalidFleetFile
+    """
+    config_files = []
+    with open(fleet_file, "rb") as fh:
+        for i, device in enumerate(iter_fleet(fh)):
+            path = os.path.join(
+                output_dir, f"{i:04}_{device.owner_short}.yaml"
+            )
+            with open(path, "w") as of:
+                yaml.dump(device.config, of)
+            config_files.append(path)
+    return config_files
+
+
+async def provision_device(
+    radio: Radio,
+    job: ProvisionJob,
+    retries: int = DEFAULT_RETRIES,
+    timeout: float = DEFAULT_TIMEOUT,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+    delta: bool = False,
+) -> ProvisionResult:
+    """
+    Push a device's config, then its channel settings, retrying the whole
+    device (with a growing delay) if either step fails or takes longer than
+    timeout. With delta, the device's config is exported first and only the
+    settings that differ are pushed (see flagday.config.plan), so a device
+    that's already up to date isn't written to or rebooted at all.
+
+    :return: the outcome; errors are reported rather than raised
+    :rtype: ProvisionResult
+    """
+    started = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            async with asyncio.timeout(timeout):
+                if delta:
+                    await push_delta(radio, job.port, job.config_file)
+                else:
+                    await radio.configure(job.port, job.config_file)
+                if job.channel_settings:
+                    await radio.set_channel(
+                        job.port, job.channel_index, job.channel_settings
+                    )
+        except TimeoutError:
+            error = f"timed out after {timeout:g}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            return ProvisionResult(
+                job, attempt, time.perf_counter() - started, None
+            )
+        if attempt <= retries:
+            await asyncio.sleep(retry_delay * 2 ** (attempt - 1))
+    return ProvisionResult(
+        job, retries + 1, time.perf_counter() - started, error
+    )
+
+
+async def push_delta(radio: Radio, port: str, config_file: str) -> None:
+    """
+    Push only the settings in config_file that differ from the device's.
+    """
+    target = load_base_config(config_file)
+    current = yaml.safe_load(await radio.export_config(port))
+    steps = plan_changes(current or {}, target)
+    if steps:
+        await radio.apply(port, plan_args(steps))
+
+
+async def provision_devices(
+    radio: Radio,
+    jobs: Sequence[ProvisionJob],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    timeout: float = DEFAULT_TIMEOUT,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+    progress: Callable[[ProvisionResult, int, int], None] | None = None,
+    delta: bool = False,
+) -> list[ProvisionResult]:
+    """
+    Provision many devices concurrently, at most concurrency at a time. One
+    device failing doesn't stop the others.
+
+    :param radio: e.g. MeshtasticCLI, or FakeRadio
+    :type radio: Radio
+    :param jobs: e.g. from assign_jobs
+    :type jobs: Sequence[ProvisionJob]
+    :param concurrency: devices to provision at once
+    :type concurrency: int
+    :param retries: extra attempts per device
+    :type retries: int
+    :param timeout: seconds per attempt
+    :type timeout: float
+    :param retry_delay: seconds before the first retry, doubling after
+    :type retry_delay: float
+    :param progress: called with each result as it finishes, how many have
+        finished and how many there are
+    :type progress: Callable[[ProvisionResult, int, int], None] | None
+    :param delta: only push the settings that differ from each device's
+    :type delta: bool
+    :return: one result per job, in order
+    :rtype: list[ProvisionResult]
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def provision(job: ProvisionJob) -> ProvisionResult:
+        nonlocal finished
+        async with semaphore:
+            result = await provision_device(
+                radio, job, retries, timeout, retry_delay, delta
+            )
+        finished += 1
+        if progress is not None:
+            progress(result, finished, len(jobs))
+        return result
+
+    return list(await asyncio.gather(*(provision(job) for job in jobs)))
+
+
+def print_progress(result: ProvisionResult, finished: int, total: int) -> None:
+    status = "ok" if result.error is None else result.error
+    print(
+        f"[{finished}/{total}] {result.job.port} {result.job.config_file}: "
+        f"{status} ({result.attempts} attempts, {result.elapsed:.1f}s)",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if (args.fleet is None) == (not args.configs):
+        parser.error("pass either device YAML files or --fleet")
+    channel_settings = [
+        (name, value) for name, value in
+        [("name", args.ch_name), ("psk", args.ch_psk)] if value is not None
+    ]
+    with tempfile.TemporaryDirectory(prefix="flagday-fleet-") as config_dir:
+        config_files = args.configs
+        if args.fleet is not None:
+            config_files = write_fleet_configs(args.fleet, config_dir)
+        if args.fake:
+            radio: Radio = FakeRadio(delay=0.5)
+            ports = args.ports or [
+                f"fake{i}" for i in range(len(config_files))
+            ]
+        else:
+            radio = MeshtasticCLI()
+            ports = args.ports or discover_ports()
+        try:
+            jobs = assign_jobs(
+                ports, config_files, args.ch_index, channel_settings
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        results = asyncio.run(provision_devices(
+            radio,
+            jobs,
+            concurrency=args.concurrency,
+            retries=args.retries,
+            timeout=args.timeout,
+            progress=print_progress,
+            delta=args.delta,
+        ))
+    failures = [r for r in results if r.error is not None]
+    print(
+        f"{len(results) - len(failures)} provisioned, {len(failures)} failed",
+        file=sys.stderr
+    )
+    sys.exit(1 if failures else 0)
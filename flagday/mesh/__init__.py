@@ -0,0 +1,3 @@
+"""
+Mesh (LoRa channel) modelling for flagday device configs.
+"""
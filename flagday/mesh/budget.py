@@ -0,0 +1,137 @@
+"""
+flagday.mesh.budget : project the channel utilization a config's periodic
+broadcasts would cause for a given number of nodes, from time on air alone,
+as a quick check before reaching for the simulator.
+"""
+
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+from flagday.mesh.lora import (
+    DEFAULT_MESSAGES_PER_HOUR,
+    PACKET_BYTES,
+    broadcast_intervals,
+    lora_settings,
+    time_on_air,
+)
+
+DEFAULT_EXPECTED_NODES: int = 100
+# the firmware holds back position and telemetry broadcasts above the polite
+# threshold, and stops sending anything but priority packets above the max
+POLITE_CHANNEL_UTILIZATION: float = 0.25
+MAX_CHANNEL_UTILIZATION: float = 0.40
+# the fraction of each hour a node may transmit in regions with a duty
+# cycle limit; elsewhere it's unlimited
+REGION_DUTY_CYCLES: dict[str, float] = {
+    "EU_433": 0.10, "EU_868": 0.10, "UA_433": 0.10, "UA_868": 0.01,
+}
+BUDGET_STATUSES: list[str] = ["ok", "warn", "fail"]
+
+
+class AirtimeBudget(NamedTuple):
+    """
+    A projection of a config's load on the channel. airtime is the time on
+    air of one packet of each kind, in seconds; packets_per_hour is what
+    each node originates; channel_utilization is the fraction of time a
+    node hears the channel busy, and tx_utilization the fraction it spends
+    transmitting, both assuming every node hears every other and each packet
+    is sent once plus once per hop. duty_cycle is the region's limit on
+    tx_utilization, if it has one.
+    """
+    nodes: int
+    hop_limit: int
+    airtime: dict[str, float]
+    packets_per_hour: dict[str, float]
+    channel_utilization: float
+    tx_utilization: float
+    duty_cycle: float | None
+
+
+def analyze_budget(
+    cfg: Mapping[str, Any],
+    nodes: int = DEFAULT_EXPECTED_NODES,
+    moving: float = 0,
+    messages_per_hour: float = DEFAULT_MESSAGES_PER_HOUR,
+) -> AirtimeBudget:
+    """
+    Project the channel utilization of nodes devices sharing a config: each
+    node's node info, position and telemetry broadcasts (at the configured
+    intervals) and text messages, times the nodes, times the hop limit's
+    rebroadcasts. This is a worst case for a crowd in earshot of each other;
+    flagday.mesh.simulator models spread-out meshes.
+
+    :param cfg: a parsed (base or device) configuration
+    :type cfg: Mapping[str, Any]
+    :param nodes: the expected number of nodes
+    :type nodes: int
+    :param moving: the fraction of nodes on the move, which broadcast their
+        position more often if smart position is enabled
+    :type moving: float
+    :param messages_per_hour: text messages each node sends per hour
+    :type messages_per_hour: float
+    :return: the projection
+    :rtype: AirtimeBudget
+    :raises: ValueError
+    """
+    settings = lora_settings(cfg)
+    still, on_the_move = broadcast_intervals(cfg), \
+        broadcast_intervals(cfg, moving=True)
+    packets_per_hour = {
+        kind: 3600 * ((1 - moving) / still[kind] + moving / on_the_move[kind])
+        for kind in still
+    }
+    packets_per_hour["text"] = messages_per_hour
+    airtime = {
+        kind: time_on_air(PACKET_BYTES[kind], settings)
+        for kind in packets_per_hour
+    }
+    transmissions = 1 + settings.hop_limit
+    tx_utilization = transmissions * sum(
+        packets_per_hour[kind] * airtime[kind] for kind in airtime
+    ) / 3600
+    region = cfg.get("config", {}).get("lora", {}).get("region")
+    return AirtimeBudget(
+        nodes=nodes,
+        hop_limit=settings.hop_limit,
+        airtime=airtime,
+        packets_per_hour=packets_per_hour,
+        channel_utilization=nodes * tx_utilization,
+        tx_utilization=tx_utilization,
+        duty_cycle=REGION_DUTY_CYCLES.get(region),
+    )
+
+
+def budget_problems(
+    budget: AirtimeBudget,
+    warn_utilization: float = POLITE_CHANNEL_UTILIZATION,
+    max_utilization: float = MAX_CHANNEL_UTILIZATION,
+) -> tuple[str, list[str]]:
+    """
+    Check a budget against channel utilization thresholds and the region's
+    duty cycle.
+
+    :return: the worst of BUDGET_STATUSES, and what's wrong
+    :rtype: tuple[str, list[str]]
+    """
+    status, problems = "ok", []
+    utilization = budget.channel_utilization
+    if utilization > max_utilization:
+        status = "fail"
+        problems.append(
+            f"channel utilization {utilization:.1%} with {budget.nodes} "
+            f"nodes exceeds {max_utilization:.0%}"
+        )
+    elif utilization > warn_utilization:
+        status = "warn"
+        problems.append(
+            f"channel utilization {utilization:.1%} with {budget.nodes} "
+            f"nodes exceeds {warn_utilization:.0%}"
+        )
+    if budget.duty_cycle is not None and \
+            budget.tx_utilization > budget.duty_cycle:
+        status = "fail"
+        problems.append(
+            f"tx utilization {budget.tx_utilization:.1%} exceeds the "
+            f"region's {budget.duty_cycle:.0%} duty cycle"
+        )
+    return status, problems
@@ -0,0 +1,162 @@
+"""
+flagday.mesh.lora : LoRa radio settings and periodic broadcast intervals as
+a Meshtastic device config specifies them, and the time on air of a packet.
+"""
+
+import math
+
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+# (bandwidth in kHz, spreading factor, coding rate denominator), as the
+# firmware's RadioInterface applies them when usePreset is set
+MODEM_PRESETS: dict[str, tuple[float, int, int]] = {
+    "SHORT_TURBO": (500, 7, 5),
+    "SHORT_FAST": (250, 7, 5),
+    "SHORT_SLOW": (250, 8, 5),
+    "MEDIUM_FAST": (250, 9, 5),
+    "MEDIUM_SLOW": (250, 10, 5),
+    "LONG_FAST": (250, 11, 5),
+    "LONG_MODERATE": (125, 11, 8),
+    "LONG_SLOW": (125, 12, 8),
+    "VERY_LONG_SLOW": (62.5, 12, 8),
+}
+DEFAULT_MODEM_PRESET: str = "LONG_FAST"
+# the config's bandwidth is an integer, so a few values stand in for others
+BANDWIDTH_CODES: dict[int, float] = {
+    31: 31.25, 62: 62.5, 200: 203.125, 400: 406.25, 800: 812.5, 1600: 1625
+}
+DEFAULT_HOP_LIMIT: int = 3
+PREAMBLE_SYMBOLS: int = 16
+# the firmware sets LoRa's low data rate optimization above this
+LOW_DATA_RATE_SYMBOL_TIME: float = 0.016
+# firmware defaults (in seconds) for intervals left at 0 or unset
+DEFAULT_INTERVALS: dict[str, float] = {
+    "nodeinfo": 3 * 60 * 60,
+    "position": 15 * 60,
+    "telemetry": 30 * 60,
+}
+DEFAULT_SMART_MINIMUM_INTERVAL: float = 30
+DEFAULT_MESSAGES_PER_HOUR: float = 1
+# typical sizes on air, in bytes, including the 16 byte Meshtastic header
+PACKET_BYTES: dict[str, int] = {
+    "nodeinfo": 80,
+    "position": 50,
+    "telemetry": 45,
+    "text": 60,
+}
+
+
+class LoRaSettings(NamedTuple):
+    """
+    The LoRa modem settings a device transmits with; bandwidth is in Hz and
+    coding_rate is the denominator of 4/5..4/8.
+    """
+    bandwidth: float
+    spread_factor: int
+    coding_rate: int
+    hop_limit: int
+
+    @property
+    def symbol_time(self) -> float:
+        return 2 ** self.spread_factor / self.bandwidth
+
+
+def lora_settings(cfg: Mapping[str, Any]) -> LoRaSettings:
+    """
+    The LoRa settings of a (base or device) config: its modem preset's,
+    unless usePreset is off, in which case its own bandwidth, spreadFactor
+    and codingRate.
+
+    :param cfg: a parsed configuration
+    :type cfg: Mapping[str, Any]
+    :return: the device's LoRa settings
+    :rtype: LoRaSettings
+    :raises: ValueError
+    """
+    lora = cfg.get("config", {}).get("lora", {})
+    preset = lora.get("modemPreset", DEFAULT_MODEM_PRESET)
+    if preset not in MODEM_PRESETS:
+        raise ValueError(f"unknown modem preset {preset}")
+    bandwidth, spread_factor, coding_rate = MODEM_PRESETS[preset]
+    if not lora.get("usePreset", True):
+        bandwidth = lora.get("bandwidth") or bandwidth
+        bandwidth = BANDWIDTH_CODES.get(bandwidth, bandwidth)
+        spread_factor = lora.get("spreadFactor") or spread_factor
+        coding_rate = lora.get("codingRate") or coding_rate
+    return LoRaSettings(
+        bandwidth * 1000,
+        spread_factor,
+        coding_rate,
+        lora.get("hopLimit", DEFAULT_HOP_LIMIT),
+    )
+
+
+def time_on_air(payload_bytes: int, settings: LoRaSettings) -> float:
+    """
+    The time on air of a LoRa packet, per Semtech's formula (AN1200.13),
+    with an explicit header and CRC as Meshtastic sends them.
+
+    :param payload_bytes: the PHY payload length, e.g. from PACKET_BYTES
+    :type payload_bytes: int
+    :param settings: e.g. from lora_settings
+    :type settings: LoRaSettings
+    :return: seconds on air
+    :rtype: float
+    """
+    sf = settings.spread_factor
+    symbol_time = settings.symbol_time
+    low_data_rate = int(symbol_time > LOW_DATA_RATE_SYMBOL_TIME)
+    payload_symbols = 8 + max(
+        math.ceil(
+            (8 * payload_bytes - 4 * sf + 28 + 16)
+            / (4 * (sf - 2 * low_data_rate))
+        ) * settings.coding_rate,
+        0
+    )
+    return (PREAMBLE_SYMBOLS + 4.25 + payload_symbols) * symbol_time
+
+
+def _interval(value: Any, default: float) -> float:
+    return float(value) if value else default
+
+
+def broadcast_intervals(
+    cfg: Mapping[str, Any], moving: bool = False
+) -> dict[str, float]:
+    """
+    How often a device broadcasts each kind of periodic packet, in seconds:
+    node info, position and device telemetry. With smart position enabled,
+    a moving device broadcasts its position as often as
+    broadcastSmartMinimumIntervalSecs allows. Phones share their position
+    through the device, so this doesn't depend on gpsMode.
+
+    :param cfg: a parsed configuration
+    :type cfg: Mapping[str, Any]
+    :param moving: whether the device is on the move
+    :type moving: bool
+    :return: seconds between broadcasts, by packet kind
+    :rtype: dict[str, float]
+    """
+    config = cfg.get("config", {})
+    position = config.get("position", {})
+    position_interval = _interval(
+        position.get("positionBroadcastSecs"), DEFAULT_INTERVALS["position"]
+    )
+    if moving and position.get("positionBroadcastSmartEnabled", True):
+        position_interval = min(position_interval, _interval(
+            position.get("broadcastSmartMinimumIntervalSecs"),
+            DEFAULT_SMART_MINIMUM_INTERVAL
+        ))
+    telemetry = cfg.get("module_config", {}).get("telemetry", {})
+    return {
+        "nodeinfo": _interval(
+            config.get("device", {}).get("nodeInfoBroadcastSecs"),
+            DEFAULT_INTERVALS["nodeinfo"]
+        ),
+        "position": position_interval,
+        "telemetry": _interval(
+            telemetry.get("deviceUpdateInterval"),
+            DEFAULT_INTERVALS["telemetry"]
+        ),
+    }
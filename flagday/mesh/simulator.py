@@ -0,0 +1,606 @@
+"""
+flagday.mesh.simulator : a discrete-event simulation of a Meshtastic mesh
+flooding its periodic broadcasts and text messages, to find channel
+congestion before a room full of nodes does. Needs the `explore` extra
+(NumPy).
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import sys
+
+from collections.abc import Mapping
+from typing import Any, NamedTuple, Sequence
+
+import numpy as np
+
+from flagday.config.device import (
+    DEFAULT_BASE_CONFIG,
+    generate_device_config,
+    load_base_config,
+    validate_base_config,
+)
+from flagday.config.fleet import build_device_config, load_roster
+from flagday.mesh.lora import (
+    DEFAULT_MESSAGES_PER_HOUR,
+    PACKET_BYTES,
+    LoRaSettings,
+    broadcast_intervals,
+    lora_settings,
+    time_on_air,
+)
+
+PERIODIC_KINDS: list[str] = ["nodeinfo", "position", "telemetry"]
+PACKET_KINDS: list[str] = [*PERIODIC_KINDS, "text"]
+# generate_device_config needs a valid ringtone, but nodes never play it
+SIMULATION_RINGTONE: str = "sim:d=4,o=5,b=125:c"
+DEFAULT_NODES: int = 100
+DEFAULT_DURATION: float = 60 * 60
+DEFAULT_AREA: float = 2000
+DEFAULT_RANGE: float = 1000
+DEFAULT_MOVING: float = 0.25
+LATENCY_PERCENTILES: list[int] = [50, 90, 99]
+# the firmware's contention window sizes (as powers of two), and what it
+# adds to 2.5 symbols for a slot: propagation, turnaround and MAC delays
+CW_MIN: int = 3
+CW_MAX: int = 7
+SLOT_OVERHEAD: float = 0.0076
+NEIGHBOUR_CHUNK_SIZE: int = 512
+parser = argparse.ArgumentParser(
+    prog="flagday.mesh.simulator",
+    description="simulates a flagday mesh flooding its broadcasts"
+)
+parser.add_argument("-c", "--config", default=DEFAULT_BASE_CONFIG)
+parser.add_argument(
+    "-b", "--roster", help="simulate these devices rather than -n base nodes"
+)
+parser.add_argument("-n", "--nodes", type=int, default=DEFAULT_NODES)
+parser.add_argument(
+    "-t", "--duration", type=float, default=DEFAULT_DURATION,
+    help="seconds of event time"
+)
+parser.add_argument(
+    "--area", type=float, default=DEFAULT_AREA,
+    help="side of the square the nodes are scattered over, in metres"
+)
+parser.add_argument(
+    "--range", type=float, default=DEFAULT_RANGE, dest="radio_range",
+    help="radio range in metres"
+)
+parser.add_argument(
+    "--moving", type=float, default=DEFAULT_MOVING,
+    help="fraction of nodes on the move (for smart position)"
+)
+parser.add_argument(
+    "--messages-per-hour", type=float, default=DEFAULT_MESSAGES_PER_HOUR,
+    help="text messages each node sends per hour"
+)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--json", action="store_true", help="report as JSON")
+
+
+class SimulationReport(NamedTuple):
+    """
+    What happened on the channel. lost_receptions counts transmissions a
+    node in range missed because another overlapped them (or it was
+    transmitting itself); delivery_ratio is the fraction of (packet, other
+    node) pairs where the node received the packet; latency
+    is the time from sending a packet to each node receiving it, in seconds,
+    by percentile; utilizations are fractions of the simulated time a node
+    heard the channel busy (as the firmware's channel utilization) or spent
+    transmitting, averaged over the nodes and at the busiest node.
+    """
+    nodes: int
+    duration: float
+    packets: int
+    transmissions: int
+    lost_receptions: int
+    delivery_ratio: float
+    latency: dict[int, float]
+    channel_utilization: float
+    max_channel_utilization: float
+    tx_utilization: float
+    max_tx_utilization: float
+
+
+def node_configs(
+    base_config: dict[str, Any],
+    roster: list[dict[str, Any]] | None = None,
+    nodes: int = DEFAULT_NODES,
+) -> list[Mapping[str, Any]]:
+    """
+    The device configs to simulate: one per roster entry, or nodes copies
+    of a device config over the base config.
+
+    :raises: InvalidDeviceConfiguration, KeyError, rtttl.InvalidDefaultsError,
+             rtttl.InvalidElementError, rtttl.InvalidNoteError,
+             rtttl.InvalidRTTTLFormatError
+    """
+    validate_base_config(base_config)
+    if roster is None:
+        device_config = generate_device_config(
+            base_config, "node", "node", SIMULATION_RINGTONE,
+            validate_base=False
+        )
+        return [device_config] * nodes
+    return [build_device_config(base_config, entry) for entry in roster]
+
+
+def find_neighbours(
+    positions: np.ndarray, radio_range: float
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    The nodes within radio_range of each node, and their distances.
+    """
+    neighbours, distances = [], []
+    for start in range(0, len(positions), NEIGHBOUR_CHUNK_SIZE):
+        block = positions[start:start + NEIGHBOUR_CHUNK_SIZE]
+        d = np.hypot(
+            block[:, None, 0] - positions[None, :, 0],
+            block[:, None, 1] - positions[None, :, 1],
+        )
+        for row, node in enumerate(range(start, start + len(block))):
+            in_range = d[row] <= radio_range
+            in_range[node] = False
+            indices = np.flatnonzero(in_range)
+            neighbours.append(indices)
+            distances.append(d[row, indices])
+    return neighbours, distances
+
+
+def periodic_traffic(
+    intervals: np.ndarray, duration: float, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every periodic broadcast in [0, duration), each node starting each kind
+    at a random phase of its interval.
+
+    :param intervals: seconds between broadcasts, by node and kind
+    :type intervals: np.ndarray
+    :return: times, nodes and kinds of the broadcasts
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    nodes, kinds = np.indices(intervals.shape)
+    nodes, kinds, intervals = nodes.ravel(), kinds.ravel(), intervals.ravel()
+    phases = rng.uniform(0, 1, len(intervals)) * intervals
+    counts = np.maximum(np.ceil((duration - phases) / intervals), 0)
+    counts = counts.astype(np.int64)
+    series = np.repeat(np.arange(len(intervals)), counts)
+    offsets = np.arange(len(series)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    times = phases[series] + offsets * intervals[series]
+    return times, nodes[series], kinds[series]
+
+
+class _Packet:
+    """
+    A packet's flood, kept to the nodes it has reached: the nodes that have
+    seen it, and when and with how many hops left each node still holding a
+    relay (or, for its sender, its first broadcast) will send it.
+    """
+    __slots__ = ("time", "airtime", "seen", "pending", "in_flight")
+
+    def __init__(
+        self, node: int, time: float, airtime: float, hop_limit: int
+    ) -> None:
+        self.time = time
+        self.airtime = airtime
+        self.seen = np.array([node])
+        self.pending = {node: (time, hop_limit)}
+        self.in_flight = 0
+
+
+class _Simulation:
+    """
+    Managed flooding as the firmware does it: a node hearing a packet for
+    the first time waits a contention window (longer the stronger the
+    signal, so distant nodes relay first) and rebroadcasts it with one hop
+    less, unless it hears someone else rebroadcast it first. Nodes defer
+    while they hear the channel busy. A node receives a packet if nothing
+    else it can hear overlaps it and it isn't transmitting itself; there is
+    no capture effect.
+
+    attempt holds when each node next tries the channel, for the packet in
+    attempt_pid, and holding how many relays it has; a node holding several
+    only looks for the next (among the packets in held, some of whose
+    relays may since have been cancelled) once it's sent (or lost) the
+    first. A transmission pushes back the attempts of everyone who hears it
+    in one go, so nodes waiting out a busy channel cost nothing until it
+    clears.
+    """
+
+    def __init__(
+        self,
+        settings: LoRaSettings,
+        neighbours: list[np.ndarray],
+        distances: list[np.ndarray],
+        radio_range: float,
+        rng: np.random.Generator,
+    ) -> None:
+        n = len(neighbours)
+        self.neighbours = neighbours
+        # the contention window each node relays what it hears from each
+        # neighbour in, in slots
+        self.windows = [
+            2 ** (CW_MIN + np.rint(
+                (CW_MAX - CW_MIN) * (1 - np.clip(d / radio_range, 0, 1))
+            ).astype(np.int64))
+            for d in distances
+        ]
+        self.rng = rng
+        self.slot = 2.5 * settings.symbol_time + SLOT_OVERHEAD
+        self.heard_until = np.zeros(n)
+        self.busy = np.zeros(n)
+        self.tx_airtime = np.zeros(n)
+        self.rx_tx = np.full(n, -1, dtype=np.int64)
+        self.rx_ok = np.zeros(n, dtype=bool)
+        self.attempt = np.full(n, np.inf)
+        self.attempt_pid = np.full(n, -1, dtype=np.int64)
+        self.holding = np.zeros(n, dtype=np.int64)
+        self.held: list[list[int]] = [[] for _ in range(n)]
+        # scratch space for looking up who's seen a packet
+        self.seen = np.zeros(n, dtype=bool)
+        self.tx_ends: list[tuple[float, int]] = []
+        self.packets: dict[int, _Packet] = {}
+        self.txs: dict[int, tuple[int, int, int]] = {}
+        self.latencies: list[tuple[float, int]] = []
+        self.packet_count = 0
+        self.transmissions = 0
+        self.lost = 0
+        self.delivered = 0
+        self.now = 0.0
+
+    def originate(
+        self, time: float, node: int, airtime: float, hop_limit: int
+    ) -> None:
+        pid = self.packet_count
+        self.packet_count += 1
+        # the sender's own first broadcast goes through the same channel
+        # access as relays
+        self.packets[pid] = _Packet(node, time, airtime, hop_limit)
+        if not self.holding[node]:
+            self.held[node] = []
+        self.held[node].append(pid)
+        self.holding[node] += 1
+        if time < self.attempt[node]:
+            self.attempt[node] = time
+            self.attempt_pid[node] = pid
+
+    def next_relay(self, node: int) -> None:
+        """
+        Point the node's next attempt at the earliest relay it still holds.
+        """
+        due, pid = np.inf, -1
+        if self.holding[node]:
+            packets = self.packets
+            held = self.held[node] = [
+                pid for pid in self.held[node]
+                if pid in packets and node in packets[pid].pending
+            ]
+            due, pid = min(
+                (packets[pid].pending[node][0], pid) for pid in held
+            )
+        self.attempt[node] = due
+        self.attempt_pid[node] = pid
+
+    def send(self, now: float, node: int) -> None:
+        pid = int(self.attempt_pid[node])
+        packet = self.packets.get(pid)
+        if packet is None or node not in packet.pending:
+            # its relay was cancelled
+            self.next_relay(node)
+        elif self.heard_until[node] > now:
+            # heard_until covers the node's own transmissions too
+            self.attempt[node] = self.heard_until[node] + self.rng.integers(
+                0, 2 ** CW_MIN
+            ) * self.slot
+        else:
+            _, hops = packet.pending.pop(node)
+            self.holding[node] -= 1
+            self.transmit(now, node, pid, packet, hops)
+            self.next_relay(node)
+
+    def relay_delay(self, windows: np.ndarray) -> np.ndarray:
+        slots = self.rng.integers(0, windows)
+        return (2 * CW_MAX + slots) * self.slot
+
+    def transmit(
+        self, now: float, node: int, pid: int, packet: _Packet, hops: int
+    ) -> None:
+        end = now + packet.airtime
+        tid = self.transmissions
+        self.transmissions += 1
+        self.tx_airtime[node] += packet.airtime
+        self.busy[node] += max(end - max(self.heard_until[node], now), 0)
+        self.heard_until[node] = max(self.heard_until[node], end)
+        if self.rx_tx[node] >= 0:
+            self.rx_ok[node] = False
+        receivers = self.neighbours[node]
+        heard = self.heard_until[receivers]
+        self.busy[receivers] += np.maximum(end - np.maximum(heard, now), 0)
+        free = heard <= now
+        heard = np.maximum(heard, end)
+        self.heard_until[receivers] = heard
+        # whoever was about to try the channel hears it busy, so waits for
+        # it to clear and backs off
+        blocked = self.attempt[receivers] < heard
+        if blocked.any():
+            self.attempt[receivers[blocked]] = heard[blocked] + \
+                self.rng.integers(0, 2 ** CW_MIN, int(blocked.sum())) * \
+                self.slot
+        if free.all():
+            locked = receivers
+        else:
+            # anything else on the air at a receiver collides with this
+            self.rx_ok[receivers[~free]] = False
+            self.lost += len(receivers) - int(free.sum())
+            locked = receivers[free]
+        self.rx_tx[locked] = tid
+        self.rx_ok[locked] = True
+        self.txs[tid] = (pid, node, hops)
+        packet.in_flight += 1
+        heapq.heappush(self.tx_ends, (end, tid))
+
+    def tx_end(self, now: float, tid: int) -> None:
+        pid, node, hops = self.txs.pop(tid)
+        packet = self.packets[pid]
+        packet.in_flight -= 1
+        receivers = self.neighbours[node]
+        locked = self.rx_tx[receivers] == tid
+        got = receivers[locked]
+        ok = self.rx_ok[got]
+        self.rx_tx[got] = -1
+        heard = got[ok]
+        self.lost += len(got) - len(heard)
+        if len(heard):
+            if packet.pending:
+                self.cancel(packet, heard)
+            seen = self.seen
+            seen[packet.seen] = True
+            first = ~seen[heard]
+            seen[packet.seen] = False
+            new = heard[first]
+            if len(new):
+                packet.seen = np.concatenate([packet.seen, new])
+                self.delivered += len(new)
+                self.latencies.append((now - packet.time, len(new)))
+                if hops > 0:
+                    self.hold(
+                        pid, packet, new, hops - 1,
+                        self.windows[node][locked][ok][first], now
+                    )
+        if not packet.pending and not packet.in_flight:
+            del self.packets[pid]
+
+    def cancel(self, packet: _Packet, heard: np.ndarray) -> None:
+        """
+        Someone else relayed the packet, so whoever heard it doesn't; a
+        node left with nothing to send stops trying, and one with more finds
+        its next when it next tries.
+        """
+        pending = packet.pending
+        cancelled = [
+            relay for relay in heard[self.holding[heard] > 0].tolist()
+            if pending.pop(relay, None) is not None
+        ]
+        if cancelled:
+            idle = np.array(cancelled)
+            self.holding[idle] -= 1
+            idle = idle[self.holding[idle] == 0]
+            self.attempt[idle] = np.inf
+            self.attempt_pid[idle] = -1
+
+    def hold(
+        self,
+        pid: int,
+        packet: _Packet,
+        relays: np.ndarray,
+        hops: int,
+        windows: np.ndarray,
+        now: float,
+    ) -> None:
+        """
+        Hand relays of a packet to the nodes that just heard it first.
+        """
+        dues = now + self.relay_delay(windows)
+        sooner = dues < self.attempt[relays]
+        self.attempt[relays[sooner]] = dues[sooner]
+        self.attempt_pid[relays[sooner]] = pid
+        relay_list = relays.tolist()
+        # a node with no relays left forgets the packets it held
+        held = self.held
+        for relay, idle in zip(
+            relay_list, (self.holding[relays] == 0).tolist()
+        ):
+            if idle:
+                held[relay] = [pid]
+            else:
+                held[relay].append(pid)
+        self.holding[relays] += 1
+        packet.pending.update(zip(
+            relay_list, zip(dues.tolist(), itertools.repeat(hops))
+        ))
+
+    def run(
+        self,
+        times: np.ndarray,
+        nodes: np.ndarray,
+        airtimes: np.ndarray,
+        hop_limits: np.ndarray,
+    ) -> None:
+        times, nodes = times.tolist(), nodes.tolist()
+        airtimes, hop_limits = airtimes.tolist(), hop_limits.tolist()
+        times.append(np.inf)
+        tx_ends, attempt = self.tx_ends, self.attempt
+        i = 0
+        while True:
+            node = int(attempt.argmin())
+            next_send = attempt[node]
+            next_end = tx_ends[0][0] if tx_ends else np.inf
+            # packets originate before anything else at the same time, and
+            # transmissions end before new ones start
+            if times[i] <= next_end and times[i] <= next_send:
+                if times[i] == np.inf:
+                    break
+                self.originate(
+                    times[i], nodes[i], airtimes[i], hop_limits[nodes[i]]
+                )
+                i += 1
+            elif next_end <= next_send:
+                self.now, tid = heapq.heappop(tx_ends)
+                self.tx_end(self.now, tid)
+            else:
+                self.now = float(next_send)
+                self.send(self.now, node)
+
+
+def _percentiles(
+    latencies: list[tuple[float, int]], percentiles: Sequence[int]
+) -> dict[int, float]:
+    if not latencies:
+        return {p: float("nan") for p in percentiles}
+    values, counts = np.array(latencies).T
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(counts[order])
+    return {
+        p: float(values[np.searchsorted(cumulative, p / 100 * cumulative[-1])])
+        for p in percentiles
+    }
+
+
+def simulate(
+    configs: Sequence[Mapping[str, Any]],
+    duration: float = DEFAULT_DURATION,
+    area: float = DEFAULT_AREA,
+    radio_range: float = DEFAULT_RANGE,
+    moving: float = DEFAULT_MOVING,
+    messages_per_hour: float = DEFAULT_MESSAGES_PER_HOUR,
+    seed: int = 0,
+) -> SimulationReport:
+    """
+    Simulate a mesh of nodes, one per config, scattered at random over a
+    square area: each sends its periodic broadcasts at the intervals its
+    config sets and text messages at random, and every packet floods the
+    mesh up to its sender's hop limit. Time on air comes from the nodes'
+    LoRa settings, which must match, as they share the channel.
+
+    :param configs: device configs, e.g. from node_configs
+    :type configs: Sequence[Mapping[str, Any]]
+    :param duration: seconds of event time to send packets over
+    :type duration: float
+    :param area: side of the square, in metres
+    :type area: float
+    :param radio_range: how far a node is heard, in metres
+    :type radio_range: float
+    :param moving: the fraction of nodes on the move, which broadcast their
+        position more often if smart position is enabled
+    :type moving: float
+    :param messages_per_hour: text messages each node sends per hour
+    :type messages_per_hour: float
+    :param seed: for the random number generator
+    :type seed: int
+    :return: the channel's statistics
+    :rtype: SimulationReport
+    :raises: ValueError
+    """
+    n = len(configs)
+    if n < 2:
+        raise ValueError("simulating a mesh needs at least two nodes")
+    rng = np.random.default_rng(seed)
+    settings = [lora_settings(cfg) for cfg in configs]
+    if len({s._replace(hop_limit=0) for s in settings}) > 1:
+        raise ValueError("all nodes must share the same LoRa settings")
+    is_moving = rng.random(n) < moving
+    # configs are often shared, e.g. by every node from node_configs
+    node_intervals: dict[tuple[int, bool], list[float]] = {}
+    for cfg, m in zip(configs, is_moving.tolist()):
+        if (id(cfg), m) not in node_intervals:
+            cfg_intervals = broadcast_intervals(cfg, m)
+            node_intervals[id(cfg), m] = [
+                cfg_intervals[kind] for kind in PERIODIC_KINDS
+            ]
+    intervals = np.array([
+        node_intervals[id(cfg), m]
+        for cfg, m in zip(configs, is_moving.tolist())
+    ])
+    times, nodes, kinds = periodic_traffic(intervals, duration, rng)
+    messages = rng.poisson(n * messages_per_hour * duration / 3600)
+    times = np.concatenate([times, rng.uniform(0, duration, messages)])
+    nodes = np.concatenate([nodes, rng.integers(0, n, messages)])
+    kinds = np.concatenate([
+        kinds, np.full(messages, PACKET_KINDS.index("text"))
+    ])
+    order = np.argsort(times, kind="stable")
+    kind_airtimes = np.array([
+        time_on_air(PACKET_BYTES[kind], settings[0]) for kind in PACKET_KINDS
+    ])
+    positions = rng.uniform(0, area, (n, 2))
+    neighbours, distances = find_neighbours(positions, radio_range)
+    simulation = _Simulation(
+        settings[0], neighbours, distances, radio_range, rng
+    )
+    simulation.run(
+        times[order],
+        nodes[order],
+        kind_airtimes[kinds[order]],
+        np.array([s.hop_limit for s in settings]),
+    )
+    elapsed = max(duration, simulation.now)
+    channel = simulation.busy / elapsed
+    tx = simulation.tx_airtime / elapsed
+    packets = simulation.packet_count
+    return SimulationReport(
+        nodes=n,
+        duration=elapsed,
+        packets=packets,
+        transmissions=simulation.transmissions,
+        lost_receptions=simulation.lost,
+        delivery_ratio=simulation.delivered / (packets * (n - 1))
+        if packets else float("nan"),
+        latency=_percentiles(simulation.latencies, LATENCY_PERCENTILES),
+        channel_utilization=float(channel.mean()),
+        max_channel_utilization=float(channel.max()),
+        tx_utilization=float(tx.mean()),
+        max_tx_utilization=float(tx.max()),
+    )
+
+
+def format_report(report: SimulationReport) -> str:
+    latency = ", ".join(
+        f"p{p} {seconds:.2f}s" for p, seconds in report.latency.items()
+    )
+    return "\n".join([
+        f"nodes                {report.nodes}",
+        f"duration             {report.duration:.0f}s",
+        f"packets              {report.packets}",
+        f"transmissions        {report.transmissions}",
+        f"lost receptions      {report.lost_receptions}",
+        f"delivery ratio       {report.delivery_ratio:.1%}",
+        f"latency              {latency}",
+        f"channel utilization  {report.channel_utilization:.1%} mean, "
+        f"{report.max_channel_utilization:.1%} max",
+        f"tx utilization       {report.tx_utilization:.1%} mean, "
+        f"{report.max_tx_utilization:.1%} max",
+    ]) + "\n"
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    base_config = load_base_config(args.config)
+    roster = load_roster(args.roster) if args.roster is not None else None
+    report = simulate(
+        node_configs(base_config, roster, args.nodes),
+        duration=args.duration,
+        area=args.area,
+        radio_range=args.radio_range,
+        moving=args.moving,
+        messages_per_hour=args.messages_per_hour,
+        seed=args.seed,
+    )
+    if args.json:
+        sys.stdout.write(json.dumps(report._asdict(), indent=2) + "\n")
+    else:
+        sys.stdout.write(format_report(report))
@@ -0,0 +1,66 @@
+"""
+Test multi-variant score batches.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from flagday.composition import batch
+from flagday.composition.ringtone import make_ringtones
+from flagday.config.composition import CompositionConfig
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cfg = CompositionConfig(
+            bpm=160,
+            series=[1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0],
+            starting_octave=5
+        )
+
+    def test_sweep_variants(self) -> None:
+        variants = batch.sweep_variants(
+            self.cfg, bpms=[120, 160], factors=[1, 2, 3]
+        )
+        self.assertEqual(len(variants), 6)
+        self.assertEqual(variants[0].name, "b120-o5-f1")
+        self.assertEqual(variants[-1].series, tuple(self.cfg.series))
+        self.assertEqual(
+            batch.sweep_variants(self.cfg)[0].name, "b160-o5-f2"
+        )
+
+    def test_load_variants(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "variants.jsonl")
+            with open(path, "w") as fh:
+                fh.write('{"series": [0, 1, 2], "bpm": 100, '
+                         '"starting_octave": 4}\n')
+                fh.write('{"series": [2, 1, 0], "bpm": 90, '
+                         '"starting_octave": 6, "factor": 1, "name": "x"}\n')
+            variants = batch.load_variants(path)
+        self.assertEqual(
+            variants,
+            [
+                batch.Variant("variant_0", (0, 1, 2), 100, 4, 2),
+                batch.Variant("x", (2, 1, 0), 90, 6, 1),
+            ]
+        )
+
+    def test_render_variants(self) -> None:
+        variants = batch.sweep_variants(self.cfg, factors=[1, 2])
+        with tempfile.TemporaryDirectory() as tmp:
+            results = batch.render_variants(
+                variants, output="rtttl", output_dir=tmp, jobs=1
+            )
+            with open(os.path.join(tmp, batch.MANIFEST_FILE)) as fh:
+                manifest = json.load(fh)
+            with open(results[0].files[0]) as fh:
+                rtttl = fh.read().splitlines()
+        self.assertEqual([r.error for r in results], [None, None])
+        self.assertEqual([m["name"] for m in manifest], ["b160-o5-f1",
+                                                        "b160-o5-f2"])
+        self.assertEqual(rtttl, make_ringtones(self.cfg.series, 160, 5, 1))
+        with self.assertRaises(ValueError):
+            batch.render_variants(variants * 2, output="rtttl", jobs=1)
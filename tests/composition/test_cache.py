@@ -0,0 +1,53 @@
+"""
+Test the maker build cache.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from flagday.composition.cache import BuildCache, cache_key
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.output = os.path.join(self.tmpdir.name, "flagday.rtttl")
+
+    def write_output(self, content: str) -> None:
+        with open(self.output, "w") as fh:
+            fh.write(content)
+
+    def test_cache_key(self) -> None:
+        include = os.path.join(self.tmpdir.name, "preamble.ily")
+        with open(include, "w") as fh:
+            fh.write("% one")
+        key = cache_key("160", "ly", include_files=[include])
+        self.assertEqual(key, cache_key("160", "ly", include_files=[include]))
+        self.assertNotEqual(key, cache_key("180", "ly", include_files=[include]))
+        with open(include, "w") as fh:
+            fh.write("% two")
+        self.assertNotEqual(key, cache_key("160", "ly", include_files=[include]))
+
+    def test_fetch_and_store(self) -> None:
+        cache = BuildCache(self.cache_dir)
+        self.assertFalse(cache.fetch("abc", [self.output]))
+        self.write_output("P1:d=16,o=5,b=160:8c5\n")
+        cache.store("abc", [self.output])
+        os.remove(self.output)
+        self.assertTrue(cache.fetch("abc", [self.output]))
+        with open(self.output) as fh:
+            self.assertEqual(fh.read(), "P1:d=16,o=5,b=160:8c5\n")
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = BuildCache(self.cache_dir, max_bytes=25)
+        for key in ("one", "two", "three"):
+            self.write_output(key * 3)
+            cache.store(key, [self.output])
+            time.sleep(0.01)
+        self.assertFalse(cache.fetch("one", [self.output]))
+        self.assertTrue(cache.fetch("two", [self.output]))
+        self.assertTrue(cache.fetch("three", [self.output]))
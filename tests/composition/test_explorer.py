@@ -0,0 +1,58 @@
+"""
+Test the vectorized tone row explorer against the scalar row arithmetic.
+"""
+
+import itertools
+import unittest
+
+from importlib.util import find_spec
+
+from flagday.composition import ringtone, rows
+
+HAS_NUMPY: bool = find_spec("numpy") is not None
+if HAS_NUMPY:
+    import numpy as np
+
+    from flagday.composition import explorer
+
+
+@unittest.skipUnless(HAS_NUMPY, "needs the explore extra")
+class TestExplorer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_series = [
+            [1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0],
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
+            [5, 7, 1, 3, 10, 11, 0, 2, 9, 6, 4, 8],
+        ]
+        self.rows = np.array(self.test_series, dtype=np.int8)
+
+    def test_unrank_permutations(self) -> None:
+        self.assertEqual(
+            [tuple(r) for r in explorer.unrank_permutations(0, 120, 5).tolist()],
+            list(itertools.permutations(range(5)))
+        )
+        self.assertEqual(
+            explorer.unrank_permutations(479001599, 479001600)[0].tolist(),
+            list(range(11, -1, -1))
+        )
+
+    def test_batch_matches_rows(self) -> None:
+        intervals = explorer.batch_timepoint_intervals(self.rows).tolist()
+        octaves = explorer.batch_octave_numbers(self.rows, 6).tolist()
+        for i, series in enumerate(self.test_series):
+            self.assertEqual(intervals[i], rows.timepoint_intervals(series))
+            self.assertEqual(octaves[i], rows.octave_numbers(series, 6))
+
+    def test_batch_rtttl_bytes(self) -> None:
+        lengths = explorer.batch_rtttl_bytes(self.rows, 160).tolist()
+        for length, series in zip(lengths, self.test_series):
+            for rtttl in ringtone.make_ringtones(series, 160, 5):
+                self.assertEqual(len(rtttl), length)
+
+    def test_constraints(self) -> None:
+        metrics = explorer.row_metrics(self.rows)
+        self.assertEqual(metrics.interval_classes.tolist(), [6, 1, 6])
+        mask = explorer.constraint_mask(
+            metrics, explorer.RowConstraints(min_interval_classes=6)
+        )
+        self.assertEqual(mask.tolist(), [True, False, True])
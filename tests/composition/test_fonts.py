@@ -0,0 +1,131 @@
+"""
+Test in-process Ghostscript font embedding.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import types
+import unittest
+
+from unittest import mock
+
+from flagday.composition import fonts, render
+
+
+class FakeGhostscript:
+    """
+    Stands in for ghostscript.Ghostscript: "runs" the PDF after -f by
+    copying it to -sOutputFile with a marker, failing on PDFs saying
+    "broken". Like Ghostscript, it refuses to change the OutputFile in SAFER
+    mode.
+    """
+    instances: list["FakeGhostscript"] = []
+
+    def __init__(self, *args: str) -> None:
+        self.args = args
+        self.strings: list[str] = []
+        self.exited = False
+        FakeGhostscript.instances.append(self)
+        self.output = next(
+            arg.split("=", 1)[1] for arg in args
+            if arg.startswith("-sOutputFile=")
+        )
+        if "-c" in args:
+            self.run_string(args[args.index("-c") + 1])
+        if "-f" in args:
+            with open(args[args.index("-f") + 1]) as fh:
+                content = fh.read()
+            if "broken" in content:
+                self.exit()
+                raise RuntimeError("Ghostscript error: -100")
+            with open(self.output, "w") as fh:
+                fh.write(content + "% fonts embedded\n")
+
+    def run_string(self, string: str) -> None:
+        self.strings.append(string)
+        if "/OutputFile" in string and "-dSAFER" in self.args:
+            raise RuntimeError("Ghostscript error: -7 (invalidaccess)")
+
+    def exit(self) -> None:
+        self.exited = True
+
+
+class TestFonts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.res_dir = os.path.join(self.tmp.name, "resdir")
+        os.makedirs(os.path.join(self.res_dir, "Font"))
+        for name in ("DINish-Regular", "CascadiaCode-Italic"):
+            with open(os.path.join(self.res_dir, "Font", name), "w") as fh:
+                fh.write("%!PS-AdobeFont-1.0\n")
+        FakeGhostscript.instances = []
+        patcher = mock.patch.dict(sys.modules, {
+            "ghostscript": types.SimpleNamespace(Ghostscript=FakeGhostscript)
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_pdfs(self, *contents: str) -> list[str]:
+        pdfs = []
+        for i, content in enumerate(contents):
+            pdfs.append(os.path.join(self.tmp.name, f"flagday {i}.pdf"))
+            with open(pdfs[-1], "w") as fh:
+                fh.write(content)
+        return pdfs
+
+    def read(self, path: str) -> str:
+        with open(path) as fh:
+            return fh.read()
+
+    def test_embed_fonts(self) -> None:
+        pdfs = self.make_pdfs("% one\n", "% broken\n", "% three\n")
+        errors = fonts.embed_fonts(pdfs, self.res_dir)
+        self.assertIsNone(errors[0])
+        self.assertIn("Ghostscript error", errors[1])
+        self.assertIsNone(errors[2])
+        self.assertEqual(self.read(pdfs[0]), "% one\n% fonts embedded\n")
+        self.assertEqual(self.read(pdfs[1]), "% broken\n")
+        self.assertEqual(self.read(pdfs[2]), "% three\n% fonts embedded\n")
+        # SAFER locks the OutputFile, so one instance per PDF
+        self.assertEqual(len(FakeGhostscript.instances), 3)
+        first = FakeGhostscript.instances[0]
+        self.assertIn(f"-I{self.res_dir}", first.args)
+        self.assertIn("-dSAFER", first.args)
+        self.assertIn(f"-sOutputFile={pdfs[0]}", first.args)
+        self.assertIn(f"--permit-file-read={self.res_dir}/", first.args)
+        self.assertIn(f"--permit-file-read={self.tmp.name}/", first.args)
+        self.assertIn(f"--permit-file-write={self.tmp.name}/", first.args)
+        self.assertEqual(
+            first.strings[0],
+            "currentglobal true setglobal /CascadiaCode-Italic findfont pop "
+            "/DINish-Regular findfont pop setglobal"
+        )
+        self.assertTrue(all(gs.exited for gs in FakeGhostscript.instances))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), sorted(
+            ["resdir"] + [os.path.basename(pdf) for pdf in pdfs]
+        ))
+
+    def test_embed_fonts_in_pdf(self) -> None:
+        pdf, broken = self.make_pdfs("% one\n", "% broken\n")
+        render.embed_fonts_in_pdf(pdf, self.res_dir)
+        self.assertEqual(self.read(pdf), "% one\n% fonts embedded\n")
+        with self.assertRaises(fonts.FontEmbeddingError):
+            render.embed_fonts_in_pdf(broken, self.res_dir)
+
+    def test_font_embedder(self) -> None:
+        pdfs = self.make_pdfs("% one\n", "% two\n", "% broken\n")
+        with fonts.FontEmbedder(self.res_dir, linger=0.5) as embedder:
+            futures = [embedder.submit(pdf) for pdf in pdfs]
+            self.assertEqual(futures[0].result(), pdfs[0])
+            self.assertEqual(futures[1].result(), pdfs[1])
+            with self.assertRaises(fonts.FontEmbeddingError):
+                futures[2].result()
+        self.assertEqual(self.read(pdfs[1]), "% two\n% fonts embedded\n")
+        self.assertEqual(len(FakeGhostscript.instances), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
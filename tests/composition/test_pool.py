@@ -0,0 +1,134 @@
+"""
+Test engraving with a pool of batched LilyPond workers.
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from flagday.composition import batch, render
+from flagday.composition.pool import (
+    LilyPondJob,
+    LilyPondPool,
+    run_lilypond_batch,
+)
+from flagday.config.composition import CompositionConfig
+
+# stands in for lilypond: "engraves" each .ly argument into --output, failing
+# on sources containing "error", and logs each invocation to runs.log
+FAKE_LILYPOND: str = f"""#!{sys.executable}
+import os, sys
+output = next(a for a in sys.argv if a.startswith("--output="))
+output = output.split("=", 1)[1]
+with open(os.path.join(os.path.dirname(sys.argv[0]), "runs.log"), "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+status = 0
+for name in [a for a in sys.argv[1:] if a.endswith(".ly")]:
+    with open(name) as fh:
+        source = fh.read()
+    if "error" in source:
+        print(f"{{name}}:1:1: error: syntax error")
+        status = 1
+        continue
+    base = os.path.join(output, name[:-3])
+    for extension in (".pdf", ".midi"):
+        with open(base + extension, "w") as fh:
+            fh.write(source)
+print("Success: compilation successfully completed")
+sys.exit(status)
+"""
+
+
+class TestPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.bin = os.path.join(self.tmp.name, "bin")
+        os.mkdir(self.bin)
+        fake_lilypond = os.path.join(self.bin, "lilypond")
+        with open(fake_lilypond, "w") as fh:
+            fh.write(FAKE_LILYPOND)
+        os.chmod(fake_lilypond, stat.S_IRWXU)
+        patcher = mock.patch.object(
+            render, "lilypond_path", return_value=fake_lilypond
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def runs(self) -> list[str]:
+        with open(os.path.join(self.bin, "runs.log")) as fh:
+            return fh.read().splitlines()
+
+    def test_run_lilypond_batch(self) -> None:
+        jobs = [
+            LilyPondJob("% one\n", os.path.join(self.tmp.name, "a", "one")),
+            LilyPondJob("% error\n", os.path.join(self.tmp.name, "b", "two")),
+            LilyPondJob("% three\n", os.path.join(self.tmp.name, "three")),
+        ]
+        results = run_lilypond_batch(jobs)
+        self.assertEqual(len(self.runs()), 1)
+        self.assertEqual(
+            results[0].files,
+            [f"{jobs[0].output_base}.pdf", f"{jobs[0].output_base}.midi"]
+        )
+        with open(results[2].files[0]) as fh:
+            self.assertEqual(fh.read(), "% three\n")
+        self.assertEqual(results[1].files, [])
+        self.assertIn("flagday_1.ly:1:1: error", results[1].error)
+        self.assertNotIn("flagday_0.ly", results[1].error)
+        self.assertIsNone(results[0].error)
+
+    def test_pool(self) -> None:
+        jobs = [
+            LilyPondJob(f"% {i}\n", os.path.join(self.tmp.name, f"score_{i}"))
+            for i in range(10)
+        ]
+        with LilyPondPool(workers=2, batch_size=4, linger=0.5) as pool:
+            results = pool.map(jobs)
+        self.assertEqual([r.job for r in results], jobs)
+        self.assertTrue(all(r.error is None for r in results))
+        # every run engraves several scores, and none more than batch_size
+        runs = [run.count(".ly") for run in self.runs()]
+        self.assertEqual(sum(runs), 10)
+        self.assertLess(len(runs), 10)
+        self.assertLessEqual(max(runs), 4)
+        with self.assertRaises(RuntimeError):
+            pool.submit("% late\n", os.path.join(self.tmp.name, "late"))
+
+    @unittest.skipUnless(shutil.which("lilypond"), "needs lilypond --version")
+    def test_engrave_variants(self) -> None:
+        cfg = CompositionConfig(
+            bpm=160,
+            series=[1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0],
+            starting_octave=5
+        )
+        variants = batch.sweep_variants(cfg, factors=[1, 2, 3])
+        output_dir = os.path.join(self.tmp.name, "batch")
+        results = batch.render_variants(
+            variants,
+            output="all",
+            output_dir=output_dir,
+            lilypond_workers=1,
+            lilypond_batch_size=8,
+        )
+        self.assertTrue(all(r.error is None for r in results))
+        # how the variants batch up depends on how fast they're built
+        runs = [run.count(".ly") for run in self.runs()]
+        self.assertEqual(sum(runs), 3)
+        for result in results:
+            self.assertEqual(len(result.files), 4)
+            with open(os.path.join(
+                output_dir, result.variant.name, "flagday.ly"
+            )) as ly, open(os.path.join(
+                output_dir, result.variant.name, "flagday.pdf"
+            )) as pdf:
+                self.assertEqual(ly.read(), pdf.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Test maker stage profiling.
+"""
+
+import json
+import os
+import unittest
+
+from unittest import mock
+
+from flagday.composition import profiling
+from flagday.composition.profiling import (
+    PROFILE_ENV,
+    Profiler,
+    StageTiming,
+    env_report_format,
+    format_folded,
+    format_report,
+    stage,
+)
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stages(self) -> None:
+        profiler = Profiler(trace_memory=False)
+        with profiler.stage("score"):
+            for _ in range(3):
+                with profiler.stage("staff"):
+                    pass
+        with profiler.stage("format"):
+            pass
+        timings = profiler.timings()
+        self.assertEqual(
+            [(t.stage, t.calls) for t in timings],
+            [("score", 1), ("score;staff", 3), ("format", 1)]
+        )
+        score, staves, _ = timings
+        self.assertGreaterEqual(score.wall, staves.wall)
+
+    def test_peak_memory(self) -> None:
+        profiler = Profiler()
+        profiler.start()
+        self.addCleanup(profiler.stop)
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                data = bytearray(1 << 20)
+                del data
+            with profiler.stage("empty"):
+                pass
+        peaks = {t.stage: t.peak_memory for t in profiler.timings()}
+        self.assertGreaterEqual(peaks["outer;inner"], 1 << 20)
+        self.assertGreaterEqual(peaks["outer"], 1 << 20)
+        self.assertLess(peaks["outer;empty"], 1 << 20)
+
+    def test_stage_is_a_no_op_unless_enabled(self) -> None:
+        self.assertIsNone(profiling.disable())
+        with stage("score"):
+            pass
+        profiler = profiling.enable(trace_memory=False)
+        self.addCleanup(profiling.disable)
+        with stage("score"):
+            pass
+        self.assertEqual([t.stage for t in profiler.timings()], ["score"])
+
+
+class TestReports(unittest.TestCase):
+    timings = [
+        StageTiming("score", 1, 0.5, 0.4, 0.0, 2048),
+        StageTiming("score;staff", 6, 0.3, 0.3, 0.0, 1024),
+        StageTiming("lilypond", 1, 2.0, 0.01, 1.9, 0),
+    ]
+
+    def test_folded(self) -> None:
+        self.assertEqual(
+            format_folded(self.timings),
+            "score 200000\nscore;staff 300000\nlilypond 2000000\n"
+        )
+
+    def test_json(self) -> None:
+        report = json.loads(format_report(self.timings, "json"))
+        self.assertEqual(report[1]["stage"], "score;staff")
+        self.assertEqual(report[1]["calls"], 6)
+
+    def test_table(self) -> None:
+        lines = format_report(self.timings, "table").splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith("  staff "))
+
+    def test_env_report_format(self) -> None:
+        for value, expected in [
+            ("", None), ("0", None), ("json", "json"), ("1", "table")
+        ]:
+            with mock.patch.dict(os.environ, {PROFILE_ENV: value}):
+                self.assertEqual(env_report_format(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
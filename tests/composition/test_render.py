@@ -0,0 +1,92 @@
+"""
+Test streaming LilyPond output.
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+from flagday.composition import maker, render
+
+# stands in for lilypond: copies the source on stdin to {output}.pdf
+FAKE_LILYPOND: str = f"""#!{sys.executable}
+import sys
+output = next(a for a in sys.argv if a.startswith("--output="))
+with open(output.split("=", 1)[1] + ".pdf", "w") as fh:
+    fh.write(sys.stdin.read())
+print("Success: compilation successfully completed")
+"""
+TEST_SERIES: list[int] = [1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0]
+
+
+class TestRender(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake_lilypond = os.path.join(self.tmp.name, "lilypond")
+        with open(self.fake_lilypond, "w") as fh:
+            fh.write(FAKE_LILYPOND)
+        os.chmod(self.fake_lilypond, stat.S_IRWXU)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_run_lilypond_stream(self) -> None:
+        output_base = os.path.join(self.tmp.name, "flagday")
+        chunks = (f"% chunk {i}\n" for i in range(1000))
+        with mock.patch.object(
+            render, "lilypond_path", return_value=self.fake_lilypond
+        ):
+            log = render.run_lilypond_stream(
+                chunks, output_base, ly_path=f"{output_base}.ly"
+            )
+        self.assertIn("Success", log)
+        with open(f"{output_base}.pdf") as pdf, open(f"{output_base}.ly") as ly:
+            source = pdf.read()
+            self.assertEqual(source, ly.read())
+        self.assertTrue(source.endswith("% chunk 999\n"))
+
+    def test_run_lilypond_stream_failure(self) -> None:
+        with mock.patch.object(render, "lilypond_path", return_value="false"):
+            with self.assertRaises(render.LilyPondError):
+                render.run_lilypond_stream(
+                    ("%\n" for _ in range(100_000)),
+                    os.path.join(self.tmp.name, "flagday")
+                )
+
+    @unittest.skipUnless(shutil.which("lilypond"), "needs lilypond --version")
+    def test_iter_lilypond_source(self) -> None:
+        expected = render.format_lilypond_file(maker.prepare_lilypond_file(
+            maker.make_score_from_series(TEST_SERIES)
+        ))
+        score = render.abjad.Score(name="score")
+        chunks = list(render.iter_lilypond_source(
+            maker.prepare_lilypond_file(score),
+            score,
+            maker.iter_score_staves(TEST_SERIES)
+        ))
+        self.assertEqual(len(chunks), 8)
+        self.assertEqual("".join(chunks), expected)
+        self.assertEqual(len(score), 0)
+
+    @unittest.skipUnless(shutil.which("lilypond"), "needs lilypond --version")
+    def test_make_lilypond_source(self) -> None:
+        maker.staff_source.cache_clear()
+        self.addCleanup(maker.staff_source.cache_clear)
+        for bpm in (160, 120):
+            expected = render.format_lilypond_file(
+                maker.prepare_lilypond_file(
+                    maker.make_score_from_series(TEST_SERIES, bpm=bpm)
+                )
+            )
+            self.assertEqual(
+                maker.make_lilypond_source(TEST_SERIES, bpm=bpm), expected
+            )
+        # a new tempo only changes the first staff's metronome mark
+        self.assertEqual(maker.staff_source.cache_info().misses, 7)
+        maker.make_lilypond_source(TEST_SERIES, bpm=120)
+        self.assertEqual(maker.staff_source.cache_info().misses, 7)
@@ -0,0 +1,71 @@
+"""
+Test arithmetic meter rewriting against abjad.Meter.rewrite.
+"""
+
+import unittest
+
+from fractions import Fraction
+
+import abjad
+
+from flagday.composition import maker, rhythm
+
+
+class TestRhythm(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_series = [1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0]
+
+    def test_best_guess_offsets(self) -> None:
+        for pair in [(3, 4), (21, 4), (6, 1), (15, 2), (9, 16)]:
+            with self.subTest(pair=pair):
+                meter = abjad.Meter(abjad.meter.make_best_guess_rtc(pair))
+                self.assertEqual(
+                    rhythm.best_guess_offsets(*pair),
+                    [
+                        tuple(offset.fraction for offset in offsets)
+                        for offsets in meter.depthwise_offset_inventory()
+                    ]
+                )
+
+    def test_split_logical_tie(self) -> None:
+        inventory = rhythm.best_guess_offsets(21, 4)
+        self.assertEqual(
+            rhythm.split_logical_tie(
+                Fraction(0), Fraction(10, 16), inventory
+            ),
+            [Fraction(1, 2), Fraction(1, 8)]
+        )
+        self.assertEqual(
+            rhythm.split_logical_tie(
+                Fraction(10, 16), Fraction(13, 16), inventory
+            ),
+            [Fraction(1, 8), Fraction(1, 16)]
+        )
+
+    def test_logical_ties(self) -> None:
+        sixteenths = [Fraction(n, 16) for n in [5, 6, 10, 5]]
+        self.assertEqual(
+            rhythm.logical_ties(sixteenths),
+            [
+                [[Fraction(1, 16), Fraction(4, 16)]],
+                [[Fraction(6, 16)]],
+                [[Fraction(2, 16)], [Fraction(8, 16)]],
+                [[Fraction(1, 16), Fraction(4, 16)]],
+            ]
+        )
+
+    def test_metered_score_matches_meter_rewrite(self) -> None:
+        for series, factor in [
+            (self.test_series, 2),
+            ([2, 8, 10, 3, 4, 7, 1, 6, 0, 5, 11, 9], 2),
+            ([0, 4, 4, 9, 1], 1),
+        ]:
+            with self.subTest(series=series):
+                self.assertEqual(
+                    abjad.lilypond(maker.make_score_from_series(
+                        series, factor=factor
+                    )),
+                    abjad.lilypond(maker.make_score_from_series(
+                        series, factor=factor, rewrite_meter=True
+                    ))
+                )
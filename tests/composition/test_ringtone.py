@@ -0,0 +1,120 @@
+"""
+Test RTTTL encoding from series data.
+"""
+
+import unittest
+
+from rtttl import parse_rtttl
+
+from flagday.composition import ringtone
+
+
+class TestRingtoneEncoding(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_series = [1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0]
+        self.octave_series = [5, 4, 5, 4, 5, 4, 5, 4, 5, 4, 7, 7]
+        self.timepoint_set = [
+            (10, 16), (3, 16), (8, 16), (5, 16), (6, 16), (7, 16),
+            (4, 16), (9, 16), (2, 16), (11, 16), (6, 16), (1, 16),
+        ]
+        # rtttl_from_notes(make_series_notes(self.test_series, 4), 160)
+        self.expected_rtttl = (
+            "d=16,o=5,b=160:8c#5,2c#5,8b4.,2d5,16a#4,4a#4,4d#5.,4a4.,16a4,"
+            "4e5,16g#4,2g#4,8f5,8g4.,2g4,4f#7.,16c7,2p."
+        )
+
+    def test_canonic_parts(self) -> None:
+        self.assertEqual(ringtone.canonic_parts(5), [1, 4])
+        self.assertEqual(ringtone.canonic_parts(7), [7])
+        self.assertEqual(ringtone.canonic_parts(10), [2, 8])
+        self.assertEqual(ringtone.canonic_parts(11), [3, 8])
+        self.assertEqual(ringtone.canonic_parts(12), [12])
+
+    def test_duration_tokens(self) -> None:
+        self.assertEqual(ringtone.duration_tokens(1, 16), [(16, 0)])
+        self.assertEqual(ringtone.duration_tokens(6, 16), [(4, 1)])
+        self.assertEqual(ringtone.duration_tokens(7, 16), [(4, 2)])
+        self.assertEqual(ringtone.duration_tokens(9, 16), [(16, 0), (2, 0)])
+        self.assertEqual(ringtone.duration_tokens(3, 4), [(2, 1)])
+
+    def test_encode_rtttl(self) -> None:
+        self.assertEqual(
+            ringtone.encode_rtttl(
+                self.test_series,
+                self.octave_series,
+                self.timepoint_set,
+                160
+            ),
+            self.expected_rtttl
+        )
+
+    def test_make_ringtones(self) -> None:
+        ringtones = ringtone.make_ringtones(
+            [2, 8, 10, 3, 4, 7, 1, 6, 0, 5, 11, 9], 160, 5
+        )
+        self.assertEqual(len(ringtones), 6)
+        self.assertEqual(
+            ringtones[0],
+            "P1:d=16,o=5,b=160:4d5.,8g#6,16a#5,4a#5,16d#5,8e5.,4g4.,16c#4,"
+            "4c#4,4f#7.,16c7,4c7,4f4.,8b7,2b7,16a6,4a6,2p."
+        )
+        self.assertEqual(
+            ringtones[5],
+            "P6:d=16,o=5,b=160:16a#7,4a#7,16d#7,8e7.,4g6.,16c#6,4c#6,4f#5.,"
+            "16c5,4c5,4f6.,8b5,2b5,16a4,4a4,4d4.,8g#5,2p."
+        )
+
+    def test_shortest_defaults(self) -> None:
+        notes = [
+            ringtone.RtttlNote(8, "c", 6, False),
+            ringtone.RtttlNote(8, "d", 6, True),
+            ringtone.RtttlNote(16, "e", 4, False),
+            ringtone.RtttlNote(2, "p", None, True),
+        ]
+        self.assertEqual(ringtone.shortest_defaults(notes), (8, 6))
+        self.assertEqual(
+            ringtone.format_rtttl(notes, 160, compact=True),
+            "d=8,o=6,b=160:c,d.,16e4,2p."
+        )
+        self.assertEqual(ringtone.shortest_defaults(notes[2:3]), (16, 4))
+        # the 2p. rest matches d=2, which is a digit shorter than d=16 too
+        self.assertEqual(ringtone.shortest_defaults(notes[3:]), (2, 5))
+        # a player assumes d=4,o=6,b=63 already
+        self.assertEqual(
+            ringtone.format_rtttl(
+                [ringtone.RtttlNote(4, "c", 6, False)], 63, compact=True
+            ),
+            ":c"
+        )
+
+    def test_compact_rtttl(self) -> None:
+        rtttl = ringtone.encode_rtttl(
+            self.test_series,
+            self.octave_series,
+            self.timepoint_set,
+            160,
+            compact=True
+        )
+        self.assertEqual(
+            rtttl,
+            "d=16,o=4,b=160:8c#5,2c#5,8b.,2d5,a#,4a#,4d#5.,4a.,a,4e5,g#,"
+            "2g#,8f5,8g.,2g,4f#7.,c7,2p."
+        )
+        self.assertEqual(
+            parse_rtttl(f"P1:{rtttl}"),
+            parse_rtttl(f"P1:{self.expected_rtttl}")
+        )
+        for full, compact in zip(
+            ringtone.make_ringtones(self.test_series, 125, 6),
+            ringtone.make_ringtones(self.test_series, 125, 6, compact=True)
+        ):
+            self.assertLess(len(compact), len(full))
+            self.assertEqual(parse_rtttl(compact), parse_rtttl(full))
+
+    def test_oversized_ringtones(self) -> None:
+        ringtones = ["P1:" + "c" * 10, "P2:" + "c" * 20]
+        self.assertEqual(
+            ringtone.oversized_ringtones(ringtones, max_bytes=20),
+            [("P2", 23)]
+        )
+        self.assertEqual(ringtone.oversized_ringtones(ringtones), [])
@@ -0,0 +1,56 @@
+"""
+Test plain-integer tone row arithmetic.
+"""
+
+import unittest
+
+from flagday.composition import rows
+
+
+class TestRows(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_series = [1, 11, 2, 10, 3, 9, 4, 8, 5, 7, 6, 0]
+
+    def test_rotate_series(self) -> None:
+        self.assertEqual(
+            rows.rotate_series(self.test_series, 2),
+            [6, 0, 1, 11, 2, 10, 3, 9, 4, 8, 5, 7]
+        )
+        self.assertEqual(
+            rows.rotate_series([0, 1, 2, 3, 4], 7), [3, 4, 0, 1, 2]
+        )
+
+    def test_timepoint_intervals(self) -> None:
+        self.assertEqual(
+            rows.timepoint_intervals(self.test_series),
+            [10, 3, 8, 5, 6, 7, 4, 9, 2, 11, 6, 1]
+        )
+        self.assertEqual(rows.timepoint_intervals([0, 0, 13]), [3, 1, 2])
+
+    def test_octave_numbers(self) -> None:
+        self.assertEqual(
+            rows.octave_numbers(self.test_series),
+            [5, 4, 5, 4, 5, 4, 5, 4, 5, 4, 7, 7]
+        )
+
+    def test_staff_starting_octaves(self) -> None:
+        self.assertEqual(
+            rows.staff_starting_octaves(5), [5, 6, 4, 7, 4, 4]
+        )
+
+    def test_babbitt_timepoints(self) -> None:
+        timepoints = rows.babbitt_timepoints(self.test_series)
+        self.assertEqual(timepoints[0], rows.Timepoint(10, 16))
+        self.assertEqual(
+            [tp.pair() for tp in timepoints[-2:]], [(6, 16), (1, 16)]
+        )
+        with self.assertRaises(AttributeError):
+            timepoints[0].numerator = 5
+
+    def test_pitch_octave_series(self) -> None:
+        pitches = rows.pitch_octave_series(self.test_series)
+        self.assertEqual(pitches[0], rows.PitchOctave(1, 5))
+        self.assertEqual(
+            [po.number for po in pitches[-3:]], [7, 42, 36]
+        )
+        self.assertFalse(hasattr(pitches[0], "__dict__"))
@@ -89,3 +89,15 @@ class TestSeriesGeneration(unittest.TestCase):
             series.generate_octave_series(self.test_series),
             self.expected_octave_series
         )
+
+    def test_generate_pitch_octave_series(self) -> None:
+        self.assertEqual(
+            series.generate_pitch_octave_series(
+                abjad.TwelveToneRow(self.test_series), starting_octave=5
+            )[:3],
+            [
+                abjad.NamedPitch("cs'''"),
+                abjad.NamedPitch("b''"),
+                abjad.NamedPitch("d'''"),
+            ]
+        )
@@ -0,0 +1,62 @@
+"""
+Test watching files for the maker's --watch mode.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from flagday.composition.watch import changed_files, snapshot, watch_paths
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.config = os.path.join(self.tmp.name, "composition.yaml")
+        self.stylesheets = os.path.join(self.tmp.name, "stylesheets")
+        os.mkdir(self.stylesheets)
+        self.preamble = os.path.join(self.stylesheets, "preamble.ily")
+        self.write(self.config, "bpm: 160\n")
+        self.write(self.preamble, "% preamble\n")
+
+    def write(self, path: str, content: str) -> None:
+        with open(path, "w") as fh:
+            fh.write(content)
+
+    def test_snapshot(self) -> None:
+        missing = os.path.join(self.tmp.name, "missing.yaml")
+        before = snapshot([self.config, self.stylesheets, missing])
+        self.assertEqual(sorted(before), [self.config, self.preamble])
+        self.write(self.preamble, "% preamble, edited\n")
+        self.write(missing, "bpm: 120\n")
+        after = snapshot([self.config, self.stylesheets, missing])
+        self.assertEqual(
+            changed_files(before, after), sorted([self.preamble, missing])
+        )
+
+    def test_watch_paths_debounces(self) -> None:
+        stop = threading.Event()
+        changes = watch_paths(
+            [self.config, self.stylesheets],
+            interval=0.01,
+            debounce=0.2,
+            stop=stop
+        )
+
+        def save_repeatedly() -> None:
+            for i in range(3):
+                self.write(self.config, f"bpm: {120 + i * 10}\n" * (i + 1))
+                time.sleep(0.02)
+            self.write(self.preamble, "% preamble, edited\n")
+
+        threading.Timer(0.05, save_repeatedly).start()
+        self.assertEqual(next(changes), sorted([self.config, self.preamble]))
+        stop.set()
+        self.assertEqual(list(changes), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,14 +3,24 @@ Test device configuration methods.
 """
 
 import copy
+import os
+import tempfile
 import unittest
+import warnings
 
 from pathlib import Path
 
 import yaml
 
 from flagday.config.device import (
-    generate_device_config, validate_base_config, InvalidDeviceConfiguration
+    DeviceConfig,
+    generate_device_config,
+    merge_configs,
+    merge_device_overlays,
+    overlay_config,
+    validate_base_config,
+    AirtimeBudgetWarning,
+    InvalidDeviceConfiguration
 )
 
 
@@ -50,6 +60,15 @@ class TestDeviceConfiguration(unittest.TestCase):
             with self.assertRaises(InvalidDeviceConfiguration):
                 validate_base_config(c)
 
+    def test_validate_base_config_budget(self) -> None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertTrue(validate_base_config(self.base_good, 2))
+        with self.assertWarns(AirtimeBudgetWarning):
+            self.assertTrue(validate_base_config(self.base_good, 100))
+        with self.assertRaises(InvalidDeviceConfiguration):
+            validate_base_config(self.base_good, 500)
+
     def test_generate_device_config(self) -> None:
         cfg = generate_device_config(
             self.base_good,
@@ -72,3 +91,75 @@ class TestDeviceConfiguration(unittest.TestCase):
                 owner_short=self.owner_short_good,
                 ringtone="Invalid:d=4,o=5,b=90:F#6.,8F#.6,f#"
             )
+
+    def test_device_config_shares_base(self) -> None:
+        base = copy.deepcopy(self.base_good)
+        cfg = generate_device_config(
+            base,
+            owner=self.owner_good,
+            owner_short=self.owner_short_good,
+            ringtone=self.ringtone_good,
+            overrides={"config": {"lora": {"hopLimit": 2}}}
+        )
+        cfg["config"]["security"]["privateKey"] = "foo"
+        del cfg["canned_messages"]
+        self.assertEqual(base, self.base_good)
+        self.assertIs(cfg["config"]["network"].base,
+                      base["config"]["network"])
+        self.assertEqual(cfg["config"]["lora"]["hopLimit"], 2)
+        self.assertEqual(cfg["config"]["lora"]["region"], "US")
+        self.assertEqual(cfg["config"]["security"], {
+            "serialEnabled": True, "privateKey": "foo"
+        })
+        self.assertNotIn("canned_messages", cfg)
+        dumped = yaml.safe_load(yaml.dump(cfg))
+        self.assertEqual(dumped, cfg.to_dict())
+        self.assertEqual(dumped["owner"], self.owner_good)
+
+    def test_overlay_config(self) -> None:
+        cfg = overlay_config(
+            self.base_good,
+            {"config": {"lora": {"hopLimit": 5}}, "canned_messages": "a|b"},
+            {"config": {"lora": {"txPower": 20}, "device": "replaced"}}
+        )
+        self.assertIsInstance(cfg, DeviceConfig)
+        self.assertEqual(cfg["canned_messages"], "a|b")
+        self.assertEqual(cfg["config"]["lora"]["hopLimit"], 5)
+        self.assertEqual(cfg["config"]["lora"]["txPower"], 20)
+        self.assertEqual(cfg["config"]["device"], "replaced")
+        self.assertEqual(
+            cfg["config"]["position"], self.base_good["config"]["position"]
+        )
+
+    def test_merge_configs(self) -> None:
+        site = {"config": {"lora": {"hopLimit": 4}}}
+        device = {"owner": self.owner_good, "owner_short": "g420"}
+        cfg = merge_configs(self.base_good, site, device)
+        self.assertEqual(cfg["config"]["lora"]["hopLimit"], 4)
+        self.assertEqual(cfg["owner"], self.owner_good)
+        with self.assertRaises(InvalidDeviceConfiguration):
+            merge_configs(self.device_good, site)
+        with self.assertRaises(InvalidDeviceConfiguration):
+            merge_configs(self.base_good, {"owner_short": "toolong"})
+
+    def test_merge_device_overlays(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            device_dir = os.path.join(tmpdir, "devices")
+            output_dir = os.path.join(tmpdir, "out")
+            os.mkdir(device_dir)
+            overlays = {
+                "good.yaml": {"owner": "good", "owner_short": "good"},
+                "bad.yaml": {"owner": "bad", "owner_short": "bad" * 3},
+            }
+            for name, overlay in overlays.items():
+                with open(os.path.join(device_dir, name), "w") as fh:
+                    yaml.dump(overlay, fh)
+            results = merge_device_overlays(
+                self.base_good, [], device_dir, output_dir
+            )
+            self.assertIsNone(results["good.yaml"])
+            self.assertIn("InvalidDeviceConfiguration", results["bad.yaml"])
+            with open(os.path.join(output_dir, "good.yaml")) as fh:
+                merged = yaml.safe_load(fh)
+            self.assertEqual(merged["owner"], "good")
+            self.assertEqual(merged["config"], self.base_good["config"])
@@ -0,0 +1,88 @@
+"""
+Test binary fleet export.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+from flagday.config.device import parse_ringtone
+from flagday.config.export import (
+    InvalidFleetFile, export_fleet, iter_fleet, read_fleet
+)
+
+
+FIXTURE_PATH: Path = Path(__file__).parent / 'example_base_good.yaml'
+
+
+class TestFleetExport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "fleet.bin")
+        self.ringtone_good = "smbdeath:d=4,o=5,b=90:32c6,32c6,32c6,8p,16b"
+        with open(FIXTURE_PATH, encoding="utf8") as file:
+            self.base_good = yaml.safe_load(file)
+
+    def test_export_fleet_round_trip(self) -> None:
+        roster = [
+            {"owner": "one 📵", "owner_short": "one",
+             "ringtone": self.ringtone_good},
+            {"owner": "x" * 41, "owner_short": "bad",
+             "ringtone": self.ringtone_good},
+            {"owner": "two", "owner_short": "two",
+             "ringtone": self.ringtone_good,
+             "config.security.privateKey": "abc"},
+        ]
+        results = export_fleet(self.base_good, roster, self.path, jobs=1)
+        self.assertEqual([r.error is None for r in results], [True, False, True])
+        devices = read_fleet(self.path)
+        self.assertEqual([d.owner_short for d in devices], ["one", "two"])
+        self.assertEqual(devices[0].config["owner"], "one 📵")
+        self.assertEqual(devices[0].config["ringtone"], self.ringtone_good)
+        self.assertEqual(
+            devices[1].config["config"]["security"]["privateKey"], "abc"
+        )
+        merged = devices[1].config.to_dict()
+        self.assertEqual(
+            merged["config"]["lora"], self.base_good["config"]["lora"]
+        )
+        notes = parse_ringtone(self.ringtone_good).notes
+        self.assertEqual(len(devices[0].notes), len(notes))
+        self.assertEqual(devices[0].notes[0], (1046, 83))
+        self.assertEqual(devices[0].notes[3], (0, 333))
+
+    def test_export_fleet_is_compact(self) -> None:
+        roster = [
+            {"owner": f"device {i}", "owner_short": f"d{i}",
+             "ringtone": self.ringtone_good}
+            for i in range(20)
+        ]
+        export_fleet(self.base_good, roster, self.path, jobs=2)
+        yaml_size = sum(
+            len(yaml.dump({**self.base_good, **entry}).encode("utf-8"))
+            for entry in roster
+        )
+        self.assertLess(os.path.getsize(self.path), yaml_size / 4)
+        self.assertEqual(len(read_fleet(self.path)), 20)
+
+    def test_iter_fleet_rejects_bad_files(self) -> None:
+        with self.assertRaises(InvalidFleetFile):
+            list(iter_fleet(io.BytesIO(b"not a fleet file at all")))
+        export_fleet(self.base_good, [
+            {"owner": "one", "owner_short": "one",
+             "ringtone": self.ringtone_good},
+        ], self.path, jobs=1)
+        with open(self.path, "rb") as fh:
+            data = fh.read()
+        with self.assertRaises(InvalidFleetFile):
+            list(iter_fleet(io.BytesIO(data[:-1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
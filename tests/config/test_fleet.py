@@ -0,0 +1,93 @@
+"""
+Test fleet (batch) configuration methods.
+"""
+
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+from flagday.config.fleet import (
+    apply_overrides, generate_fleet_configs, load_roster
+)
+
+
+FIXTURE_PATH: Path = Path(__file__).parent / 'example_base_good.yaml'
+
+
+class TestFleetConfiguration(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.ringtone_good = "smbdeath:d=4,o=5,b=90:32c6,32c6,32c6,8p,16b"
+        with open(FIXTURE_PATH, encoding="utf8") as file:
+            self.base_good = yaml.safe_load(file)
+
+    def test_load_roster_csv(self) -> None:
+        path = os.path.join(self.tmpdir.name, "roster.csv")
+        with open(path, "w", encoding="utf8") as fh:
+            fh.write("owner,owner_short,ringtone,config.security.privateKey\n")
+            fh.write(f"girlscout420,g420,\"{self.ringtone_good}\",abc\n")
+        roster = load_roster(path)
+        self.assertEqual(roster[0]["owner_short"], "g420")
+        self.assertEqual(roster[0]["ringtone"], self.ringtone_good)
+        self.assertEqual(roster[0]["config.security.privateKey"], "abc")
+
+    def test_load_roster_csv_types(self) -> None:
+        path = os.path.join(self.tmpdir.name, "roster.csv")
+        with open(path, "w", encoding="utf8") as fh:
+            fh.write(
+                "owner,owner_short,ringtone,config.lora.hopLimit,"
+                "config.bluetooth.enabled,config.security.privateKey\n"
+            )
+            fh.write(f"true,1234,\"{self.ringtone_good}\",3,false,\n")
+            # a short row, missing its last two cells
+            fh.write(f"two,2,\"{self.ringtone_good}\",2\n")
+        entry, short = load_roster(path)
+        # overrides mean what they would in YAML; the device keys don't
+        self.assertEqual(entry["owner"], "true")
+        self.assertEqual(entry["owner_short"], "1234")
+        self.assertIs(type(entry["config.lora.hopLimit"]), int)
+        self.assertEqual(entry["config.lora.hopLimit"], 3)
+        self.assertIs(entry["config.bluetooth.enabled"], False)
+        # blank and missing cells leave the base config's value alone
+        self.assertNotIn("config.security.privateKey", entry)
+        self.assertEqual(short["config.lora.hopLimit"], 2)
+        self.assertNotIn("config.bluetooth.enabled", short)
+        self.assertNotIn("config.security.privateKey", short)
+        results = generate_fleet_configs(
+            self.base_good, [entry], self.tmpdir.name, jobs=1
+        )
+        with open(results[0].path, encoding="utf8") as fh:
+            config = yaml.safe_load(fh)["config"]
+        self.assertEqual(config["lora"]["hopLimit"], 3)
+        self.assertEqual(config["security"], {"serialEnabled": True})
+
+    def test_apply_overrides(self) -> None:
+        cfg = apply_overrides({"config": {"lora": {}}}, {
+            "config.security.privateKey": "abc", "config.lora.hopLimit": 2
+        })
+        self.assertEqual(cfg, {"config": {
+            "lora": {"hopLimit": 2}, "security": {"privateKey": "abc"}
+        }})
+
+    def test_generate_fleet_configs_reports_failures(self) -> None:
+        roster = [
+            {"owner": "one", "owner_short": "one", "ringtone": self.ringtone_good},
+            {"owner": "x" * 41, "owner_short": "bad", "ringtone": self.ringtone_good},
+            {"owner": "two", "owner_short": "two", "ringtone": self.ringtone_good,
+             "config.security.privateKey": "abc"},
+        ]
+        results = generate_fleet_configs(
+            self.base_good, roster, self.tmpdir.name, jobs=2
+        )
+        self.assertEqual([r.error is None for r in results], [True, False, True])
+        self.assertIn("InvalidDeviceConfiguration", results[1].error)
+        with open(results[2].path, encoding="utf8") as fh:
+            cfg = yaml.safe_load(fh)
+        self.assertEqual(cfg["owner"], "two")
+        self.assertEqual(cfg["config"]["security"]["privateKey"], "abc")
+        self.assertEqual(cfg["config"]["lora"], self.base_good["config"]["lora"])
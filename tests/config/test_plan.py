@@ -0,0 +1,91 @@
+"""
+Test planning delta config pushes.
+"""
+
+import copy
+import unittest
+
+from flagday.config.device import load_base_config
+from flagday.config.plan import (
+    diff_configs,
+    format_plan,
+    plan_args,
+    plan_changes,
+)
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self) -> None:
+        self.target = load_base_config()
+        self.target["owner"] = "flagday 1"
+        self.target["owner_short"] = "fd1"
+
+    def test_up_to_date(self) -> None:
+        current = copy.deepcopy(self.target)
+        self.assertEqual(plan_changes(current, self.target), [])
+        self.assertTrue(
+            format_plan([], self.target).startswith("0 of ")
+        )
+
+    def test_export_quirks(self) -> None:
+        current = copy.deepcopy(self.target)
+        # camelCase export, defaults left out, 64 bit integers as strings
+        current["channelUrl"] = current.pop("channel_url")
+        current["config"]["lora"]["txEnabled"] = "true"
+        current["config"]["lora"]["channelNum"] = "12"
+        self.target["config"]["lora"]["ignoreMqtt"] = False
+        self.assertEqual(diff_configs(current, self.target), [])
+
+    def test_strings_match_exactly(self) -> None:
+        current = copy.deepcopy(self.target)
+        current["owner"] = "Flagday 1"
+        current["config"]["lora"]["txEnabled"] = "True"
+        current["config"]["lora"]["channelNum"] = "12.0"
+        self.target["config"]["lora"]["channelNum"] = 12
+        self.assertCountEqual(
+            [change.path for change in diff_configs(current, self.target)],
+            ["owner", "config.lora.txEnabled", "config.lora.channelNum"]
+        )
+
+    def test_plan_changes(self) -> None:
+        current = copy.deepcopy(self.target)
+        current["owner_short"] = "old"
+        current["config"]["lora"]["hopLimit"] = 7
+        current["config"]["display"]["screenOnSecs"] = 60
+        del current["module_config"]["telemetry"]
+        steps = plan_changes(current, self.target)
+        # the owner first and without a reboot, then every setting at once
+        self.assertEqual(len(steps), 2)
+        self.assertEqual(steps[0].args, ["--set-owner-short", "fd1"])
+        self.assertFalse(steps[0].reboots)
+        self.assertTrue(steps[1].reboots)
+        paths = [change.path for change in steps[1].changes]
+        self.assertIn("config.lora.hopLimit", paths)
+        self.assertIn("config.display.screenOnSecs", paths)
+        self.assertTrue(all(
+            path.startswith("module_config.telemetry.")
+            for path in paths[2:]
+        ))
+        args = plan_args(steps)
+        self.assertEqual(args[:2], ["--set-owner-short", "fd1"])
+        self.assertIn("lora.hopLimit", args)
+        self.assertEqual(args.count("--set"), len(paths))
+        report = format_plan(steps, self.target)
+        self.assertIn(f"{len(paths) + 1} of ", report)
+        self.assertIn(", 1 reboot\n", report)
+        self.assertIn("config.lora.hopLimit: 7 -> 3", report)
+
+    def test_booleans(self) -> None:
+        current = copy.deepcopy(self.target)
+        current["config"]["bluetooth"]["enabled"] = False
+        args = plan_args(plan_changes(current, self.target))
+        self.assertEqual(args, ["--set", "bluetooth.enabled", "true"])
+
+    def test_unknown_setting(self) -> None:
+        self.target["mystery"] = 1
+        with self.assertRaises(ValueError):
+            plan_changes({}, self.target)
+
+
+if __name__ == '__main__':
+    unittest.main()
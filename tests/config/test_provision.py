@@ -0,0 +1,138 @@
+"""
+Test concurrent device provisioning against a fake radio.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+from flagday.config.device import load_base_config
+from flagday.config.export import export_fleet
+from flagday.config.provision import (
+    FakeRadio,
+    MeshtasticCLI,
+    ProvisioningError,
+    assign_jobs,
+    provision_devices,
+    write_fleet_configs,
+)
+
+
+class TestProvisioning(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ports = [f"fake{i}" for i in range(6)]
+        self.jobs = assign_jobs(
+            self.ports,
+            [f"device_{i}.yaml" for i in range(6)],
+            channel_settings=[("name", "#public"), ("psk", "abc")],
+        )
+
+    def provision(self, radio: FakeRadio, **kwargs) -> list:
+        kwargs.setdefault("retry_delay", 0)
+        return asyncio.run(provision_devices(radio, self.jobs, **kwargs))
+
+    def test_assign_jobs(self) -> None:
+        self.assertEqual(self.jobs[2].port, "fake2")
+        self.assertEqual(self.jobs[2].config_file, "device_2.yaml")
+        with self.assertRaises(ValueError):
+            assign_jobs(self.ports, ["device_0.yaml"])
+
+    def test_provision_devices_concurrently(self) -> None:
+        radio = FakeRadio(delay=0.02)
+        progress = []
+        results = self.provision(
+            radio, concurrency=3,
+            progress=lambda r, done, total: progress.append((done, total))
+        )
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertEqual([r.job for r in results], self.jobs)
+        self.assertEqual(radio.max_active, 3)
+        self.assertEqual(progress, [(i, 6) for i in range(1, 7)])
+        self.assertIn(
+            ("fake0", "configure", "device_0.yaml"), radio.calls
+        )
+        self.assertIn(
+            ("fake0", "set_channel", "0", "name=#public", "psk=abc"),
+            radio.calls
+        )
+
+    def test_provision_devices_retries_and_timeouts(self) -> None:
+        radio = FakeRadio(
+            failures={"fake1": 1, "fake2": 5}, hangs={"fake3"}
+        )
+        results = self.provision(radio, retries=1, timeout=0.05)
+        self.assertEqual(
+            [r.error is None for r in results],
+            [True, True, False, False, True, True]
+        )
+        self.assertEqual(results[1].attempts, 2)
+        self.assertIn("no response", results[2].error)
+        self.assertIn("timed out", results[3].error)
+        self.assertEqual(radio.active, 0)
+
+    def test_provision_delta(self) -> None:
+        target = {"owner_short": "fd1", "config": {"lora": {"hopLimit": 3}}}
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = os.path.join(tmp, "device.yaml")
+            with open(config_file, "w", encoding="utf8") as file:
+                yaml.safe_dump(target, file)
+            self.jobs = assign_jobs(["fake0", "fake1"], [config_file] * 2)
+            radio = FakeRadio(exported={
+                "fake0": yaml.safe_dump(target),
+                "fake1": "owner_short: old\nconfig:\n  lora:\n"
+                         "    hopLimit: 7\n",
+            })
+            results = self.provision(radio, delta=True)
+        self.assertTrue(all(r.error is None for r in results))
+        # fake0 is up to date, so it's only read, and fake1 gets one push
+        self.assertEqual(radio.calls, [
+            ("fake0", "export_config"),
+            ("fake1", "export_config"),
+            ("fake1", "apply", "--set-owner-short", "fd1",
+             "--set", "lora.hopLimit", "3"),
+        ])
+
+    def test_write_fleet_configs(self) -> None:
+        ringtone = "P1:d=16,o=5,b=160:8c#5,2c#5,8b4.,2d5,2p."
+        # owner_short needn't be unique, so it doesn't name the files alone
+        roster = [
+            {"owner": f"flagday {i}", "owner_short": "fd",
+             "ringtone": ringtone}
+            for i in range(2)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            fleet_file = os.path.join(tmp, "fleet.bin")
+            export_fleet(load_base_config(), roster, fleet_file, jobs=1)
+            config_files = write_fleet_configs(fleet_file, tmp)
+            self.assertEqual(
+                [os.path.basename(path) for path in config_files],
+                ["0000_fd.yaml", "0001_fd.yaml"]
+            )
+            config = load_base_config(config_files[1])
+        self.assertEqual(config["owner"], "flagday 1")
+        self.assertEqual(config["ringtone"], ringtone)
+        self.assertIn("lora", config["config"])
+
+    def test_meshtastic_cli(self) -> None:
+        script = (
+            "import sys; print(' '.join(sys.argv[1:])); "
+            "print('connected', file=sys.stderr); "
+            "sys.exit('fail' in sys.argv)"
+        )
+        cli = MeshtasticCLI([sys.executable, "-c", script])
+        # only stdout, e.g. export-config's YAML, is returned
+        self.assertEqual(
+            asyncio.run(cli._run("p0", "--ch-set", "name", "x")).strip(),
+            "--port p0 --ch-set name x"
+        )
+        asyncio.run(cli.set_channel("p0", 1, [("psk", "abc")]))
+        with self.assertRaisesRegex(ProvisioningError, "connected"):
+            asyncio.run(cli.configure("p0", "fail"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Test the airtime budget projection.
+"""
+
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+from flagday.mesh.budget import analyze_budget, budget_problems
+
+
+FIXTURE_PATH: Path = Path(__file__).parent.parent / 'config' / \
+    'example_base_good.yaml'
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self) -> None:
+        with open(FIXTURE_PATH, encoding="utf8") as file:
+            self.base_good = yaml.safe_load(file)
+
+    def test_analyze_budget(self) -> None:
+        budget = analyze_budget(self.base_good, nodes=10, messages_per_hour=0)
+        self.assertEqual(budget.packets_per_hour, {
+            "nodeinfo": 1 / 3, "position": 1, "telemetry": 2, "text": 0
+        })
+        self.assertIsNone(budget.duty_cycle)
+        per_node = 4 * sum(
+            budget.packets_per_hour[kind] * budget.airtime[kind]
+            for kind in budget.airtime
+        ) / 3600
+        self.assertAlmostEqual(budget.tx_utilization, per_node)
+        self.assertAlmostEqual(budget.channel_utilization, 10 * per_node)
+        self.assertGreater(
+            analyze_budget(self.base_good, nodes=10, moving=0.5)
+            .packets_per_hour["position"],
+            budget.packets_per_hour["position"]
+        )
+        self.base_good["config"]["lora"]["hopLimit"] = 1
+        self.assertAlmostEqual(
+            analyze_budget(self.base_good, 10, messages_per_hour=0)
+            .channel_utilization,
+            budget.channel_utilization / 2
+        )
+
+    def test_budget_problems(self) -> None:
+        self.assertEqual(
+            budget_problems(analyze_budget(self.base_good, nodes=2)),
+            ("ok", [])
+        )
+        status, problems = budget_problems(
+            analyze_budget(self.base_good, nodes=100)
+        )
+        self.assertEqual(status, "warn")
+        self.assertIn("100 nodes", problems[0])
+        self.assertEqual(
+            budget_problems(analyze_budget(self.base_good, nodes=500))[0],
+            "fail"
+        )
+        # UA_868 limits each node to 1% of the hour
+        self.base_good["config"]["lora"].update(
+            region="UA_868", modemPreset="VERY_LONG_SLOW"
+        )
+        status, problems = budget_problems(
+            analyze_budget(self.base_good, nodes=2), max_utilization=100
+        )
+        self.assertEqual(status, "fail")
+        self.assertIn("duty cycle", problems[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
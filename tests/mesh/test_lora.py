@@ -0,0 +1,76 @@
+"""
+Test LoRa settings, time on air and broadcast intervals.
+"""
+
+import unittest
+
+from pathlib import Path
+
+import yaml
+
+from flagday.mesh.lora import (
+    DEFAULT_INTERVALS,
+    LoRaSettings,
+    broadcast_intervals,
+    lora_settings,
+    time_on_air,
+)
+
+
+FIXTURE_PATH: Path = Path(__file__).parent.parent / 'config' / \
+    'example_base_good.yaml'
+
+
+class TestLoRa(unittest.TestCase):
+    def setUp(self) -> None:
+        with open(FIXTURE_PATH, encoding="utf8") as file:
+            self.base_good = yaml.safe_load(file)
+
+    def test_lora_settings(self) -> None:
+        # no modemPreset means the firmware default, LONG_FAST
+        self.assertEqual(
+            lora_settings(self.base_good), LoRaSettings(250_000, 11, 5, 3)
+        )
+        lora = self.base_good["config"]["lora"]
+        lora["modemPreset"] = "SHORT_TURBO"
+        lora["spreadFactor"] = 12
+        self.assertEqual(lora_settings(self.base_good).spread_factor, 7)
+        lora.update(usePreset=False, bandwidth=62, codingRate=8)
+        self.assertEqual(
+            lora_settings(self.base_good), LoRaSettings(62_500, 12, 8, 3)
+        )
+        lora["modemPreset"] = "VERY_FAST"
+        with self.assertRaises(ValueError):
+            lora_settings(self.base_good)
+
+    def test_time_on_air(self) -> None:
+        long_fast = LoRaSettings(250_000, 11, 5, 3)
+        self.assertAlmostEqual(time_on_air(50, long_fast), 0.641, places=3)
+        self.assertAlmostEqual(
+            time_on_air(50, LoRaSettings(500_000, 7, 5, 3)), 0.026, places=3
+        )
+        # low data rate optimization kicks in at SF12/125 kHz
+        self.assertAlmostEqual(
+            time_on_air(50, LoRaSettings(125_000, 12, 8, 3)), 3.547, places=3
+        )
+        self.assertLess(time_on_air(10, long_fast), time_on_air(50, long_fast))
+
+    def test_broadcast_intervals(self) -> None:
+        self.assertEqual(broadcast_intervals(self.base_good), {
+            "nodeinfo": 10800,
+            "position": 3600,
+            "telemetry": DEFAULT_INTERVALS["telemetry"],
+        })
+        self.assertEqual(
+            broadcast_intervals(self.base_good, moving=True)["position"], 300
+        )
+        self.base_good["config"]["position"][
+            "positionBroadcastSmartEnabled"
+        ] = False
+        self.assertEqual(
+            broadcast_intervals(self.base_good, moving=True)["position"], 3600
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Test the discrete-event mesh simulator.
+"""
+
+import copy
+import unittest
+
+from importlib.util import find_spec
+from pathlib import Path
+
+import yaml
+
+HAS_NUMPY: bool = find_spec("numpy") is not None
+if HAS_NUMPY:
+    import numpy as np
+
+    from flagday.mesh import simulator
+
+
+FIXTURE_PATH: Path = Path(__file__).parent.parent / 'config' / \
+    'example_base_good.yaml'
+
+
+@unittest.skipUnless(HAS_NUMPY, "needs the explore extra")
+class TestSimulator(unittest.TestCase):
+    def setUp(self) -> None:
+        with open(FIXTURE_PATH, encoding="utf8") as file:
+            self.base_good = yaml.safe_load(file)
+
+    def test_periodic_traffic(self) -> None:
+        times, nodes, kinds = simulator.periodic_traffic(
+            np.array([[100.0, 1e9], [250.0, 1e9]]), 1000,
+            np.random.default_rng(0)
+        )
+        self.assertEqual(list(np.bincount(nodes)), [10, 4])
+        self.assertEqual(set(kinds.tolist()), {0})
+        self.assertTrue(((times >= 0) & (times < 1000)).all())
+        self.assertTrue(np.allclose(np.diff(times[nodes == 0]), 100))
+
+    def test_find_neighbours(self) -> None:
+        neighbours, distances = simulator.find_neighbours(
+            np.array([[0.0, 0.0], [3.0, 4.0], [100.0, 0.0]]), 10
+        )
+        self.assertEqual([list(n) for n in neighbours], [[1], [0], []])
+        self.assertEqual(list(distances[0]), [5.0])
+
+    def test_node_configs(self) -> None:
+        configs = simulator.node_configs(self.base_good, nodes=3)
+        self.assertEqual(len(configs), 3)
+        configs = simulator.node_configs(self.base_good, [
+            {"owner": "one", "owner_short": "one",
+             "ringtone": simulator.SIMULATION_RINGTONE,
+             "config.lora.hopLimit": 1},
+        ])
+        self.assertEqual(configs[0]["config"]["lora"]["hopLimit"], 1)
+
+    def test_simulate_room(self) -> None:
+        # everyone hears everyone, so one relay reaches nobody new, and
+        # everyone else cancels theirs
+        report = simulator.simulate(
+            simulator.node_configs(self.base_good, nodes=30),
+            duration=1800, area=100, seed=1
+        )
+        self.assertEqual(report.nodes, 30)
+        self.assertGreater(report.packets, 30)
+        self.assertEqual(report.delivery_ratio, 1.0)
+        self.assertEqual(report.transmissions, 2 * report.packets)
+        # nodes in a room all hear the same channel
+        self.assertGreater(report.channel_utilization, 0)
+        self.assertAlmostEqual(
+            report.channel_utilization, report.max_channel_utilization
+        )
+        self.assertLessEqual(report.latency[50], report.latency[99])
+
+    def test_simulate_hop_limit(self) -> None:
+        def delivery_ratio(hop_limit: int) -> float:
+            self.base_good["config"]["lora"]["hopLimit"] = hop_limit
+            return simulator.simulate(
+                simulator.node_configs(self.base_good, nodes=60),
+                duration=1800, area=5000, radio_range=1000, seed=2
+            ).delivery_ratio
+
+        self.assertLess(delivery_ratio(0), delivery_ratio(3))
+
+    def test_simulate_at_scale(self) -> None:
+        # per-packet state grows with the nodes a packet reaches rather than
+        # the mesh, so a thousand nodes floods in seconds
+        report = simulator.simulate(
+            simulator.node_configs(self.base_good, nodes=1000),
+            duration=120, seed=3
+        )
+        self.assertEqual(report.nodes, 1000)
+        self.assertGreater(report.packets, 0)
+        self.assertGreater(report.transmissions, report.packets)
+        self.assertGreater(report.delivery_ratio, 0)
+
+    def test_simulate_needs_shared_lora_settings(self) -> None:
+        configs = simulator.node_configs(self.base_good, nodes=2)
+        other_base = copy.deepcopy(self.base_good)
+        other_base["config"]["lora"]["modemPreset"] = "SHORT_FAST"
+        configs += simulator.node_configs(other_base, nodes=2)
+        with self.assertRaises(ValueError):
+            simulator.simulate(configs, duration=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""
+Test benchmark result comparison.
+"""
+
+import unittest
+
+from benchmarks import suite
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare_results(self) -> None:
+        baseline = {"results": {
+            "a[1]": {"median": 1.0},
+            "b[1]": {"median": 2.0},
+            "c[1]": {"median": 1.0},
+        }}
+        current = {"results": {
+            "a[1]": {"median": 1.2},
+            "b[1]": {"median": 3.0},
+            "d[1]": {"median": 1.0},
+        }}
+        comparisons = suite.compare_results(baseline, current, threshold=0.25)
+        self.assertEqual([c.key for c in comparisons], ["a[1]", "b[1]"])
+        self.assertEqual([c.regressed for c in comparisons], [False, True])
+        self.assertAlmostEqual(comparisons[1].ratio, 1.5)
+
+    def test_benchmarks_run(self) -> None:
+        result = suite.time_benchmark(
+            suite.BENCHMARKS["rtttl.make_ringtones"], 1, repeat=2
+        )
+        self.assertEqual(result["runs"], 2)
+        self.assertLessEqual(result["min"], result["median"])
@@ -0,0 +1,61 @@
+"""
+Benchmark CLI entry point import time with `python -X importtime`.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).parent.parent
+HEAVY_MODULES: list[str] = ["abjad", "ghostscript", "meshtastic"]
+# cumulative import time budgets in microseconds; set
+# FLAGDAY_IMPORT_BUDGET_SCALE to loosen (or tighten) them on slow machines
+IMPORT_TIME_BUDGETS: dict[str, int] = {
+    "flagday.config.composition": 100_000,
+    "flagday.config.device": 100_000,
+    "flagday.config.fleet": 150_000,
+    "flagday.composition.maker": 150_000,
+    "flagday.composition.ringtone": 100_000,
+}
+IMPORT_TIME_RUNS: int = 3
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import a module in a fresh interpreter and return the cumulative import
+    time of every module it loaded, in microseconds.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [str(REPO_ROOT), env.get("PYTHONPATH")] if p
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_entry_points_import_lazily(self) -> None:
+        scale = float(os.environ.get("FLAGDAY_IMPORT_BUDGET_SCALE", 1))
+        for module, budget in IMPORT_TIME_BUDGETS.items():
+            with self.subTest(module=module):
+                runs = [import_times(module) for _ in range(IMPORT_TIME_RUNS)]
+                for heavy in HEAVY_MODULES:
+                    self.assertNotIn(heavy, runs[0])
+                best = min(times[module] for times in runs)
+                self.assertLessEqual(
+                    best, budget * scale,
+                    f"importing {module} took {best}us"
+                )